@@ -0,0 +1,133 @@
+"""Micro-benchmarks of the client overhead, without a network.
+
+Run with ``python benchmarks.py``.
+"""
+from __future__ import absolute_import, print_function, unicode_literals
+
+import hashlib
+import hmac
+import json
+import logging
+import timeit
+
+from quadriga import QuadrigaClient
+from quadriga.protocol import Protocol
+from quadriga.transport import FakeTransport
+
+# Number of calls timed per benchmark
+number = 100000
+
+
+class EncodingTransport(FakeTransport):
+    """Fake transport encoding the request payloads like the transports
+    sending them over the network."""
+
+    def send(self, request):
+        if request.body is None and request.json is not None:
+            json.dumps(request.json).encode('utf-8')
+        response = super(EncodingTransport, self).send(request)
+        del self.requests[:]
+        return response
+
+
+def report(name, seconds):
+    """Print the time per call of a benchmark.
+
+    :param name: the name of the benchmark
+    :type name: str | unicode
+    :param seconds: the best total time of the calls
+    :type seconds: float
+    """
+    print('{:<40} {:>8.3f} us'.format(name, seconds / number * 1e6))
+
+
+def bench(name, func):
+    """Time a function and print the time per call.
+
+    :param name: the name of the benchmark
+    :type name: str | unicode
+    :param func: the function to time
+    :type func: callable
+    """
+    report(name, min(timeit.repeat(func, number=number, repeat=5)))
+
+
+def bench_logging():
+    """Time a log call with the ``quadriga`` logger at INFO level."""
+    client = QuadrigaClient(client_id='77889')
+    logger = client._logger
+    logger.setLevel(logging.INFO)
+
+    def eager():
+        # The formatting done on each call before lazy logging
+        logger.debug('[client: {}] {}'.format(
+            '77889', 'buy {} at price of {} for {}'.format(
+                '0.5', '1234.50', 'btc_cad'
+            )
+        ))
+
+    def lazy():
+        client._log(
+            'buy %(amount)s at price of %(price)s for %(book)s',
+            endpoint='/buy',
+            book='btc_cad',
+            amount='0.5',
+            price='1234.50'
+        )
+
+    bench('log disabled (eager format)', eager)
+    bench('log disabled (lazy)', lazy)
+
+
+def bench_signing():
+    """Time signing a request with a new and with a copied HMAC."""
+    protocol = Protocol('key', 'secret', '77889')
+    secret = 'secret'.encode('utf-8')
+
+    def new():
+        hmac.new(
+            key=secret,
+            msg='{}{}{}'.format(1, '77889', 'key').encode('utf-8'),
+            digestmod=hashlib.sha256
+        ).hexdigest()
+
+    bench('signature (new HMAC)', new)
+    bench('signature (copied HMAC)', lambda: protocol.compute_signature(1))
+
+
+def bench_orders():
+    """Time placing a limit order, including encoding its payload."""
+    logging.getLogger('quadriga').setLevel(logging.INFO)
+    for fast_orders in (False, True):
+        client = QuadrigaClient(
+            api_key='key',
+            api_secret='secret',
+            client_id='77889',
+            transport=EncodingTransport({('POST', '/buy'): {'id': '1'}}),
+            fast_orders=fast_orders
+        )
+        bench(
+            'buy_limit_order (fast_orders={})'.format(fast_orders),
+            lambda: client.buy_limit_order('0.5', '1234.50', book='btc_cad')
+        )
+        protocol = client._rest_client._protocol
+        if fast_orders:
+            template = client._order_templates['/buy', 'btc_cad']
+            bench(
+                'build order request (template)',
+                lambda: protocol.build_order(template, '0.5', '1234.50')
+            )
+        else:
+            payload = {'book': 'btc_cad', 'amount': '0.5', 'price': '1234.50'}
+            bench(
+                'build order request (payload)',
+                lambda: json.dumps(
+                    protocol.build_post('/buy', payload).json
+                ).encode('utf-8')
+            )
+
+
+if __name__ == '__main__':
+    bench_logging()
+    bench_signing()
+    bench_orders()
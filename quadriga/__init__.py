@@ -1,11 +1,41 @@
 from __future__ import absolute_import, unicode_literals
 
 import logging
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 
+from quadriga.archive import TradeArchive, TradeArchiver  # noqa: F401
+from quadriga.arrays import order_arrays, trade_arrays  # noqa: F401
+from quadriga.cache import ResponseCache  # noqa: F401
+from quadriga.candles import CandleAggregator  # noqa: F401
+from quadriga.decoder import JsonDecoder  # noqa: F401
+from quadriga.fixed import FixedPoint
+from quadriga.metrics import MetricsCollector  # noqa: F401
+from quadriga import fixed
+from quadriga.nonce import NonceGenerator, FileNonceGenerator  # noqa: F401
+from quadriga.orderbook import OrderBook  # noqa: F401
+from quadriga.models import (  # noqa: F401
+    Balance,
+    OpenOrder,
+    PublicTrade,
+    Ticker,
+    UserTrade
+)
+from quadriga.ratelimit import RateLimiter, TokenBucket  # noqa: F401
 from quadriga.rest_client import RestClient
-from quadriga.exceptions import (
+from quadriga.retry import RetryPolicy  # noqa: F401
+from quadriga.rules import BookRules
+from quadriga.scheduler import PriorityScheduler  # noqa: F401
+from quadriga.session import PooledSession  # noqa: F401
+from quadriga.store import TradeStore  # noqa: F401
+from quadriga.tracing import convert
+from quadriga.exceptions import (  # noqa: F401
     InvalidCurrencyError,
-    InvalidOrderBookError
+    InvalidOrderBookError,
+    InvalidOrderError
 )
 
 
@@ -23,6 +53,58 @@ class QuadrigaClient(object):
     :type client_id: str | unicode
     :param default_book: the default order book
     :type default_book: str | unicode
+    :param session: the HTTP session to send requests with, which can be
+        shared between clients to reuse the same connection pool
+    :type session: requests.Session
+    :param nonce_generator: the generator of nonces for signed requests,
+        which should be shared by all clients using the same API key
+    :type nonce_generator: quadriga.nonce.NonceGenerator
+    :param coalesce: share the outcome of identical public requests in flight
+        instead of sending them again
+    :type coalesce: bool
+    :param rate_limiter: the client-side limiter of the request rate
+        (``None`` == unlimited)
+    :type rate_limiter: quadriga.ratelimit.RateLimiter
+    :param scheduler: the scheduler admitting requests by priority class
+        (``None`` == requests are sent right away)
+    :type scheduler: quadriga.scheduler.PriorityScheduler
+    :param retry_policy: the policy for retrying and hedging idempotent API
+        calls (``None`` == no retries)
+    :type retry_policy: quadriga.retry.RetryPolicy
+    :param max_workers: the maximum number of threads used to send requests
+        for multiple order books concurrently
+    :type max_workers: int
+    :param cache: the cache for public market data responses (``None`` ==
+        no caching)
+    :type cache: quadriga.cache.ResponseCache
+    :param models: return compact typed models (e.g.
+        :class:`quadriga.models.Ticker`) instead of dictionaries
+    :type models: bool
+    :param decoder: the decoder of JSON response bodies (``None`` == the
+        decoder of the HTTP library)
+    :type decoder: quadriga.decoder.JsonDecoder
+    :param fixed_point: return prices and amounts as integer units (e.g.
+        satoshis and cents for ``btc_cad``), and format integer prices and
+        amounts of orders from the same units
+    :type fixed_point: bool
+    :param round_prices: snap order prices to the price tick of the order
+        book (see :attr:`book_rules`) rather than rejecting them
+    :type round_prices: bool
+    :param transport: the transport sending requests, e.g.
+        :class:`quadriga.transport.Urllib3Transport` (``None`` == requests
+        with **session**)
+    :type transport: quadriga.transport.Transport
+    :param hooks: the request hooks, whose ``before_request`` and
+        ``after_request`` methods are called around each request sent, e.g.
+        a :class:`quadriga.MetricsCollector`
+    :type hooks: [object]
+    :param trace: measure the time spent in each phase of the requests, and
+        attach the :class:`quadriga.tracing.RequestTrace` to the responses
+        (as their ``trace`` attribute), errors and request events
+    :type trace: bool
+    :param fast_orders: prepare the signed requests of limit orders for all
+        order books ahead of time, to spend less time placing each order
+    :type fast_orders: bool
     """
 
     # Order books in QuadrigaCX
@@ -34,6 +116,15 @@ class QuadrigaClient(object):
         'ltc_cad',
     }
 
+    # Trading rules of the order books, checked before orders are sent
+    book_rules = {
+        'btc_cad': BookRules('0.01', 8, '0.00000001'),
+        'btc_usd': BookRules('0.01', 8, '0.00000001'),
+        'eth_cad': BookRules('0.01', 8, '0.00000001'),
+        'eth_btc': BookRules('0.00000001', 8, '0.00000001'),
+        'ltc_cad': BookRules('0.01', 8, '0.00000001'),
+    }
+
     # Major currencies in QuadrigaCX
     crypto_currencies = {'bitcoin', 'ether', 'litecoin'}
 
@@ -41,7 +132,23 @@ class QuadrigaClient(object):
                  api_key=None,
                  api_secret=None,
                  client_id=None,
-                 default_book='eth_cad'):
+                 default_book='eth_cad',
+                 session=None,
+                 nonce_generator=None,
+                 coalesce=True,
+                 rate_limiter=None,
+                 scheduler=None,
+                 retry_policy=None,
+                 max_workers=5,
+                 cache=None,
+                 models=False,
+                 decoder=None,
+                 fixed_point=False,
+                 round_prices=False,
+                 transport=None,
+                 hooks=None,
+                 trace=False,
+                 fast_orders=False):
         """Initialize the client.
 
         :param api_key: QuadrigaCX API key
@@ -52,23 +159,111 @@ class QuadrigaClient(object):
         :type client_id: str | unicode
         :param default_book: the default order book
         :type default_book: str | unicode
+        :param session: the HTTP session to send requests with
+        :type session: requests.Session
+        :param nonce_generator: the generator of nonces for signed requests
+        :type nonce_generator: quadriga.nonce.NonceGenerator
+        :param coalesce: share the outcome of identical public requests in
+            flight instead of sending them again
+        :type coalesce: bool
+        :param rate_limiter: the client-side limiter of the request rate
+        :type rate_limiter: quadriga.ratelimit.RateLimiter
+        :param scheduler: the scheduler admitting requests by priority class
+        :type scheduler: quadriga.scheduler.PriorityScheduler
+        :param retry_policy: the policy for retrying and hedging idempotent
+            API calls
+        :type retry_policy: quadriga.retry.RetryPolicy
+        :param max_workers: the maximum number of threads used to send
+            requests for multiple order books concurrently
+        :type max_workers: int
+        :param cache: the cache for public market data responses
+        :type cache: quadriga.cache.ResponseCache
+        :param models: return compact typed models instead of dictionaries
+        :type models: bool
+        :param decoder: the decoder of JSON response bodies
+        :type decoder: quadriga.decoder.JsonDecoder
+        :param fixed_point: return prices and amounts as integer units, and
+            format integer prices and amounts of orders
+        :type fixed_point: bool
+        :param round_prices: snap order prices to the price tick of the order
+            book rather than rejecting them
+        :type round_prices: bool
+        :param transport: the transport sending requests
+        :type transport: quadriga.transport.Transport
+        :param hooks: the request hooks
+        :type hooks: [object]
+        :param trace: measure the time spent in each phase of the requests
+        :type trace: bool
+        :param fast_orders: prepare the signed requests of limit orders ahead
+            of time
+        :type fast_orders: bool
+        :raises ValueError: if **fixed_point** is used with a decoder
+            parsing numbers with :func:`quadriga.decoder.scaled_int`
         """
         self._logger = logging.getLogger('quadriga')
-        self._rest_client = RestClient(
+        self._rest_client = self._create_rest_client(
             api_key=api_key,
             api_secret=api_secret,
-            client_id=client_id
+            client_id=client_id,
+            session=session,
+            nonce_generator=nonce_generator,
+            coalesce=coalesce,
+            rate_limiter=rate_limiter,
+            scheduler=scheduler,
+            retry_policy=retry_policy,
+            decoder=decoder,
+            transport=transport,
+            hooks=hooks,
+            trace=trace
         )
         self._client_id = client_id
         self._default_book = self._verify_book(default_book)
+        self._max_workers = max_workers
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._cache = cache
+        self._models = models
+        self._fixed_point = (
+            self._create_fixed_point(decoder) if fixed_point else None
+        )
+        self._round_prices = round_prices
+        self._order_templates = (
+            self._create_order_templates() if fast_orders else None
+        )
+
+    def _create_rest_client(self, **kwargs):
+        """Create the REST client sending the API calls.
+
+        :param kwargs: the parameters of the REST client
+        :returns: the REST client
+        :rtype: quadriga.rest_client.RestClient
+        """
+        return RestClient(**kwargs)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def _log(self, message, **fields):
+        """Log a debug record, or nothing if debug logging is disabled.
 
-    def _log(self, message):
-        """Log a debug message.
+        The message is only formatted if the record is emitted. The fields
+        (and the client ID) are passed both as the arguments of the message
+        and as attributes of the record, for structured log handlers.
 
-        :param message: the message to log
+        :param message: the message, formatted with the fields, e.g.
+            ``"buy %(amount)s for %(book)s"``
         :type message: str | unicode
+        :param fields: the fields of the record, e.g. ``book`` or ``amount``
         """
-        self._logger.debug('[client: {}] {}'.format(self._client_id, message))
+        if not self._logger.isEnabledFor(logging.DEBUG):
+            return
+        fields['client_id'] = self._client_id
+        self._logger.debug(
+            '[client: %(client_id)s] ' + message, fields, extra=fields
+        )
 
     def _verify_book(self, book):
         """Verify if the order book is valid and return it (or the default).
@@ -102,6 +297,255 @@ class QuadrigaClient(object):
                 .format(currency, list(self.crypto_currencies))
             )
 
+    @property
+    def session(self):
+        """Return the HTTP session, which can be shared with other clients.
+
+        :returns: the HTTP session (``None`` == not sent with requests)
+        :rtype: requests.Session
+        """
+        return self._rest_client.session
+
+    @property
+    def client_id(self):
+        """Return the QuadrigaCX client ID.
+
+        :returns: the client ID
+        :rtype: str | unicode
+        """
+        return self._client_id
+
+    def close(self):
+        """Close the pooled connections owned by the client.
+
+        A session passed in during initialization is not closed, as it may
+        still be in use by other clients.
+        """
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+        self._rest_client.close()
+
+    def _get(self, endpoint, params, refresh=False, depth=None):
+        """Send an HTTP GET request, going through the cache if enabled.
+
+        Depth-limited responses are not cached.
+
+        :param endpoint: the API endpoint/path
+        :type endpoint: str | unicode
+        :param params: the request parameters
+        :type params: dict
+        :param refresh: bypass the cache and store the new response
+        :type refresh: bool
+        :param depth: the maximum number of order book levels per side
+            parsed from the response (``None`` == all)
+        :type depth: int
+        :returns: the JSON response body from QuadrigaCX
+        :rtype: dict
+        """
+        if depth is not None:
+            return self._rest_client.get(
+                endpoint=endpoint, params=params, depth=depth
+            )
+        if self._cache is None or not self._cache.caches(endpoint):
+            return self._rest_client.get(endpoint=endpoint, params=params)
+        if not refresh:
+            hit, response = self._cache.lookup(endpoint, params)
+            if hit:
+                return response
+        response = self._rest_client.get(endpoint=endpoint, params=params)
+        self._cache.store(endpoint, params, response)
+        return response
+
+    def _create_fixed_point(self, decoder):
+        """Create the fixed-point representation of each order book.
+
+        :param decoder: the decoder of JSON response bodies
+        :type decoder: quadriga.decoder.JsonDecoder
+        :returns: the fixed-point representations by order book
+        :rtype: dict
+        :raises ValueError: if the decoder already scales numbers into
+            integers, which would then be scaled twice
+        """
+        parse_number = getattr(decoder, 'parse_number', None)
+        if getattr(parse_number, 'places', None) is not None:
+            raise ValueError(
+                'fixed_point cannot be used with a scaled_int decoder'
+            )
+        return {book: FixedPoint(book) for book in self.order_books}
+
+    def _then(self, response, func):
+        """Apply the function to the response, keeping its trace if any.
+
+        :param response: the JSON response body from QuadrigaCX
+        :type response: dict | list
+        :param func: the function converting the response
+        :type func: callable
+        :returns: the converted response
+        :rtype: dict | list
+        """
+        return convert(response, func)
+
+    def _fix(self, response, kind, book=None):
+        """Convert the prices and amounts into integer units if enabled.
+
+        :param response: the JSON response body from QuadrigaCX
+        :type response: dict | list
+        :param kind: the name of the :class:`quadriga.fixed.FixedPoint`
+            conversion (``None`` == account balance)
+        :type kind: str | unicode
+        :param book: the name of the order book
+        :type book: str | unicode
+        :returns: the response, converted if fixed-point mode is enabled
+        :rtype: dict | list
+        """
+        if self._fixed_point is None:
+            return response
+        if kind is None:
+            return self._then(response, fixed.balance)
+        return self._then(response, getattr(self._fixed_point[book], kind))
+
+    def _format(self, book, amount, price=None):
+        """Format integer amounts and prices of orders if enabled.
+
+        :param book: the name of the order book
+        :type book: str | unicode
+        :param amount: the amount of major currency
+        :type amount: int | float | str | unicode
+        :param price: the price
+        :type price: int | float | str | unicode
+        :returns: the amount and price to send
+        :rtype: (int | float | str | unicode, int | float | str | unicode)
+        """
+        if self._fixed_point is None:
+            return amount, price
+        fixed_point = self._fixed_point[book]
+        if isinstance(amount, int):
+            amount = fixed_point.format_amount(amount)
+        if isinstance(price, int):
+            price = fixed_point.format_price(price)
+        return amount, price
+
+    def _create_order_templates(self):
+        """Prepare the signed limit order requests of all order books.
+
+        :returns: the order templates by API endpoint and order book
+        :rtype: dict
+        """
+        return {
+            (endpoint, book): self._rest_client.order_template(endpoint, book)
+            for endpoint in ('/buy', '/sell')
+            for book in self.order_books
+        }
+
+    def _check_order(self, book, amount, price=None, side='buy'):
+        """Check an order against the rules of its order book.
+
+        :param book: the name of the order book
+        :type book: str | unicode
+        :param amount: the amount of major currency
+        :type amount: int | float | str | unicode
+        :param price: the limit price (``None`` == market order)
+        :type price: int | float | str | unicode
+        :param side: the side of the order (``"buy"`` or ``"sell"``)
+        :type side: str | unicode
+        :returns: the price to send, snapped to the price tick if enabled
+        :rtype: int | float | str | unicode
+        :raises InvalidOrderError: if the order breaks the rules
+        """
+        rules = self.book_rules.get(book)
+        if rules is None:
+            return price
+        return rules.check_order(amount, price, side, self._round_prices)
+
+    def _build(self, response, model, many=False, **kwargs):
+        """Build the typed models of the response if enabled.
+
+        :param response: the JSON response body from QuadrigaCX
+        :type response: dict | list
+        :param model: the model class
+        :type model: type
+        :param many: whether the response is a list of objects
+        :type many: bool
+        :returns: the model(s), or the response if models are disabled
+        :rtype: quadriga.models.Model | [quadriga.models.Model] | dict | list
+        """
+        if not self._models:
+            return response
+        if many:
+            return self._then(response, lambda items: [
+                model.from_json(item, **kwargs) for item in items
+            ])
+        return self._then(
+            response, lambda item: model.from_json(item, **kwargs)
+        )
+
+    def _verify_books(self, books):
+        """Verify if the order books are valid and return them (or all).
+
+        :param books: the names of the order books
+        :type books: [str | unicode]
+        :returns: the sorted names of the order books to use
+        :rtype: [str | unicode]
+        :raises InvalidOrderBookError: on invalid order book name
+        """
+        if books is None:
+            return sorted(self.order_books)
+        return sorted({self._verify_book(book) for book in books})
+
+    @staticmethod
+    def _capture(method, **kwargs):
+        """Call the method and capture its result or error with a timestamp.
+
+        :param method: the client method to call
+        :type method: callable
+        :returns: the capture timestamp, and the result or the error raised
+        :rtype: dict
+        """
+        try:
+            result, error = method(**kwargs), None
+        except Exception as err:
+            result, error = None, err
+        return {'timestamp': time.time(), 'result': result, 'error': error}
+
+    def _get_executor(self):
+        """Return the thread pool, creating it first if necessary.
+
+        The pool is created under a lock, so that concurrent callers share
+        the same one.
+
+        :returns: the thread pool used to send requests concurrently
+        :rtype: concurrent.futures.ThreadPoolExecutor
+        """
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._max_workers
+                )
+            return self._executor
+
+    def _fan_out(self, method, books, **kwargs):
+        """Call the method for each order book concurrently.
+
+        :param method: the client method to call
+        :type method: callable
+        :param books: the names of the order books (``None`` == all)
+        :type books: [str | unicode]
+        :returns: the captured result or error of each order book
+        :rtype: dict
+        :raises InvalidOrderBookError: on invalid order book name
+        """
+        books = self._verify_books(books)
+        executor = self._get_executor()
+        futures = {
+            book: executor.submit(
+                self._capture, method, book=book, **kwargs
+            )
+            for book in books
+        }
+        return {book: future.result() for book, future in futures.items()}
+
     def set_default_book(self, book):
         """Update the default order book of the client.
 
@@ -110,73 +554,175 @@ class QuadrigaClient(object):
         """
         self._default_book = self._verify_book(book)
 
-    def get_summary(self, book=None):
+    def get_summary(self, book=None, refresh=False):
         """Return the latest trading summary.
 
         :param book: the name of the order book
         :type book: str | unicode
+        :param refresh: bypass the response cache
+        :type refresh: bool
         :returns: the trading summary
-        :rtype: dict
+        :rtype: dict | quadriga.models.Ticker
         """
         book = self._verify_book(book)
-        self._log('get trading summary for ' + book)
+        self._log(
+            'get trading summary for %(book)s', endpoint='/ticker', book=book
+        )
 
-        return self._rest_client.get(
+        response = self._get(
             endpoint='/ticker',
-            params={'book': book}
+            params={'book': book},
+            refresh=refresh
         )
+        return self._build(self._fix(response, 'ticker', book), Ticker)
 
-    def get_public_orders(self, group=True, book=None):
+    def get_public_orders(self, group=True, book=None, refresh=False,
+                          depth=None):
         """Return all public open orders.
 
+        With **depth**, the response is parsed as it is received and only up
+        to that number of price levels per side, which bounds the memory and
+        time spent on large (e.g. ungrouped) order books. Such responses
+        bypass the response cache.
+
         :param group: group orders with the same price
         :type group: bool
         :param book: the name of the order book
         :type book: str | unicode
-        :returns: all public open orders
+        :param refresh: bypass the response cache
+        :type refresh: bool
+        :param depth: the maximum number of price levels per side
+            (``None`` == all)
+        :type depth: int
+        :returns: all public open orders (up to the depth)
         :rtype: dict
+        :raises ValueError: if the depth is less than 1
         """
         book = self._verify_book(book)
-        self._log('get public orders for ' + book)
+        response = self._get_public_orders(group, book, refresh, depth)
+        return self._fix(response, 'levels', book)
 
-        return self._rest_client.get(
+    def _get_public_orders(self, group, book, refresh=False, depth=None):
+        """Return all public open orders, without conversions.
+
+        :param group: group orders with the same price
+        :type group: bool
+        :param book: the name of the order book (verified)
+        :type book: str | unicode
+        :param refresh: bypass the response cache
+        :type refresh: bool
+        :param depth: the maximum number of price levels per side
+            (``None`` == all)
+        :type depth: int
+        :returns: the JSON response body from QuadrigaCX
+        :rtype: dict
+        :raises ValueError: if the depth is less than 1
+        """
+        if depth is not None and depth < 1:
+            raise ValueError('invalid depth: {}'.format(depth))
+        self._log(
+            'get public orders for %(book)s', endpoint='/order_book', book=book
+        )
+        return self._get(
             endpoint='/order_book',
-            params={'book': book, 'group': 1 if group else 0}
+            params={'book': book, 'group': 1 if group else 0},
+            refresh=refresh,
+            depth=depth
         )
 
-    def get_public_trades(self, time='hour', book=None):
+    def get_public_trades(self, time='hour', book=None, refresh=False):
         """Return recently completed public trades.
 
         :param time: the time frame (``"minute"`` or ``"hour"``)
         :type time: str | unicode
         :param book: the name of the order book
         :type book: str | unicode
+        :param refresh: bypass the response cache
+        :type refresh: bool
         :returns: a list of recent trades
-        :rtype: [dict]
+        :rtype: [dict] | [quadriga.models.PublicTrade]
         """
         book = self._verify_book(book)
-        self._log('get recent public trades for ' + book)
+        response = self._get_public_trades(time, book, refresh)
+        response = self._fix(response, 'trades', book)
+        return self._build(response, PublicTrade, many=True)
 
-        return self._rest_client.get(
+    def _get_public_trades(self, time, book, refresh=False):
+        """Return recently completed public trades, without conversions.
+
+        :param time: the time frame (``"minute"`` or ``"hour"``)
+        :type time: str | unicode
+        :param book: the name of the order book (verified)
+        :type book: str | unicode
+        :param refresh: bypass the response cache
+        :type refresh: bool
+        :returns: the JSON response body from QuadrigaCX
+        :rtype: [dict]
+        """
+        self._log(
+            'get recent public trades for %(book)s',
+            endpoint='/transactions',
+            book=book
+        )
+        return self._get(
             endpoint='/transactions',
-            params={'book': book, 'time': time}
+            params={'book': book, 'time': time},
+            refresh=refresh
         )
 
+    def get_summaries(self, books=None):
+        """Return the latest trading summaries of multiple order books.
+
+        The requests are sent concurrently. A failed request does not fail
+        the others: its exception is returned under ``"error"`` instead.
+
+        :param books: the names of the order books (``None`` == all)
+        :type books: [str | unicode]
+        :returns: the capture ``"timestamp"``, the trading summary under
+            ``"result"`` and the ``"error"`` raised (if any) by order book
+        :rtype: dict
+        :raises InvalidOrderBookError: on invalid order book name
+        """
+        return self._fan_out(self.get_summary, books)
+
+    def get_all_public_orders(self, group=True, books=None):
+        """Return all public open orders of multiple order books.
+
+        The requests are sent concurrently. A failed request does not fail
+        the others: its exception is returned under ``"error"`` instead.
+
+        :param group: group orders with the same price
+        :type group: bool
+        :param books: the names of the order books (``None`` == all)
+        :type books: [str | unicode]
+        :returns: the capture ``"timestamp"``, the public open orders under
+            ``"result"`` and the ``"error"`` raised (if any) by order book
+        :rtype: dict
+        :raises InvalidOrderBookError: on invalid order book name
+        """
+        return self._fan_out(self.get_public_orders, books, group=group)
+
     def get_orders(self, book=None):
         """Return a list of user's open orders.
 
         :param book: the name of the order book
         :type book: str | unicode
         :returns: a list of user's open orders
-        :rtype: [dict]
+        :rtype: [dict] | [quadriga.models.OpenOrder]
         """
         book = self._verify_book(book)
-        self._log("get user's open orders for " + book)
+        self._log(
+            "get user's open orders for %(book)s",
+            endpoint='/open_orders',
+            book=book
+        )
 
-        return self._rest_client.post(
+        response = self._rest_client.post(
             endpoint='/open_orders',
             payload={'book': book}
         )
+        response = self._fix(response, 'trades', book)
+        return self._build(response, OpenOrder, many=True)
 
     def get_trades(self, limit=100, offset=0, sort='desc', book=None):
         """Return a list of user's completed trades.
@@ -190,11 +736,32 @@ class QuadrigaClient(object):
         :param book: the name of the order book
         :type book: str | unicode
         :returns: a list of user's completed trades
-        :rtype: [dict]
+        :rtype: [dict] | [quadriga.models.UserTrade]
         """
         book = self._verify_book(book)
-        self._log("get user's completed trades for " + book)
+        response = self._get_trades(limit, offset, sort, book)
+        response = self._fix(response, 'user_trades', book)
+        return self._build(response, UserTrade, many=True, book=book)
 
+    def _get_trades(self, limit, offset, sort, book):
+        """Return a list of user's completed trades, without conversions.
+
+        :param limit: the maximum number of trades to return (0 == all)
+        :type limit: int
+        :param offset: the number of trades to skip
+        :type offset: int
+        :param sort: sort by date and time (``"desc"`` or ``"asc"``)
+        :type sort: str | unicode
+        :param book: the name of the order book (verified)
+        :type book: str | unicode
+        :returns: the JSON response body from QuadrigaCX
+        :rtype: [dict]
+        """
+        self._log(
+            "get user's completed trades for %(book)s",
+            endpoint='/user_transactions',
+            book=book
+        )
         return self._rest_client.post(
             endpoint='/user_transactions',
             payload={
@@ -205,14 +772,115 @@ class QuadrigaClient(object):
             }
         )
 
+    @staticmethod
+    def _find_stop(page, since, since_id):
+        """Return the position in the page where the iteration should stop.
+
+        :param page: the user's completed trades, latest first
+        :type page: [dict]
+        :param since: the date and time to stop at (exclusive)
+        :type since: str | unicode
+        :param since_id: the transaction ID to stop at (exclusive)
+        :type since_id: str | unicode | int
+        :returns: the index of the first trade not to return (``None`` ==
+            the iteration goes on past the page)
+        :rtype: int
+        """
+        if since_id is not None:
+            since_id = str(since_id)
+        for index, trade in enumerate(page):
+            if since_id is not None and str(trade['id']) == since_id:
+                return index
+            if since is not None and trade['datetime'] <= since:
+                return index
+        return None
+
+    def iter_trades(self, book=None, page_size=100, since=None,
+                    since_id=None):
+        """Iterate over the user's completed trades, latest first.
+
+        Trades are fetched one page at a time, and the next page is fetched
+        in the background while the current one is being consumed, so memory
+        usage stays constant however long the history is. No page is fetched
+        past the trade to stop at. Trades shifted onto the next page by new
+        trades are not returned twice.
+
+        :param book: the name of the order book
+        :type book: str | unicode
+        :param page_size: the number of trades fetched per request
+        :type page_size: int
+        :param since: stop at trades completed at or before this date and
+            time (e.g. ``"2017-04-12 11:09:33"``)
+        :type since: str | unicode | datetime.datetime
+        :param since_id: stop at the trade with this transaction ID
+        :type since_id: str | unicode | int
+        :returns: an iterator over the user's completed trades
+        :rtype: collections.Iterator
+        :raises InvalidOrderBookError: on invalid order book name
+        """
+        book = self._verify_book(book)
+        if isinstance(since, datetime):
+            since = since.strftime('%Y-%m-%d %H:%M:%S')
+        return self._iter_trades(book, page_size, since, since_id)
+
+    def _iter_trades(self, book, page_size, since, since_id, raw=False):
+        """Generate the user's completed trades page by page.
+
+        :param book: the name of the order book
+        :type book: str | unicode
+        :param page_size: the number of trades fetched per request
+        :type page_size: int
+        :param since: the date and time to stop at (exclusive)
+        :type since: str | unicode
+        :param since_id: the transaction ID to stop at (exclusive)
+        :type since_id: str | unicode | int
+        :param raw: return the trades without conversions
+        :type raw: bool
+        :returns: a generator of the user's completed trades
+        :rtype: collections.Iterator
+        """
+        executor = self._get_executor()
+
+        def fetch(offset):
+            if raw:
+                return self._get_trades(page_size, offset, 'desc', book)
+            return self.get_trades(
+                limit=page_size, offset=offset, sort='desc', book=book
+            )
+
+        offset = 0
+        next_page = executor.submit(fetch, offset)
+        last_ids = set()
+        try:
+            while next_page is not None:
+                page = next_page.result()
+                offset += len(page)
+                next_page = None
+                # The next page is only fetched if the history goes on past
+                # this one, so that stopping costs no extra signed request
+                stop = self._find_stop(page, since, since_id)
+                if stop is None and len(page) == page_size:
+                    next_page = executor.submit(fetch, offset)
+
+                page_ids = set()
+                for trade in page[:stop]:
+                    page_ids.add(trade['id'])
+                    if trade['id'] not in last_ids:
+                        yield trade
+                last_ids = page_ids
+        finally:
+            if next_page is not None:
+                next_page.cancel()
+
     def get_balance(self):
         """Return the user's account balance.
 
         :returns: the user's account balance
-        :rtype: dict
+        :rtype: dict | quadriga.models.Balance
         """
-        self._log("get user's account balance")
-        return self._rest_client.post(endpoint='/balance')
+        self._log("get user's account balance", endpoint='/balance')
+        response = self._rest_client.post(endpoint='/balance')
+        return self._build(self._fix(response, None), Balance)
 
     def buy_market_order(self, amount, book=None):
         """Buy market order.
@@ -224,9 +892,17 @@ class QuadrigaClient(object):
         :returns: the total amount of major currency purchased and a set of
             amount/price pairs, one for each order matched in the trade
         :rtype: dict
+        :raises InvalidOrderError: if the order breaks the rules of the book
         """
         book = self._verify_book(book)
-        self._log("buy {} at market price for {}".format(amount, book))
+        self._log(
+            'buy %(amount)s at market price for %(book)s',
+            endpoint='/buy',
+            book=book,
+            amount=amount
+        )
+        amount, _ = self._format(book, amount)
+        self._check_order(book, amount, side='buy')
 
         return self._rest_client.post(
             endpoint='/buy',
@@ -244,10 +920,23 @@ class QuadrigaClient(object):
         :type book: str | unicode
         :returns: the details of the order placed
         :rtype: dict
+        :raises InvalidOrderError: if the order breaks the rules of the book
         """
         book = self._verify_book(book)
-        self._log("buy {} at price of {} for {}".format(amount, price, book))
+        self._log(
+            'buy %(amount)s at price of %(price)s for %(book)s',
+            endpoint='/buy',
+            book=book,
+            amount=amount,
+            price=price
+        )
+        amount, price = self._format(book, amount, price)
+        price = self._check_order(book, amount, price, 'buy')
 
+        if self._order_templates is not None:
+            return self._rest_client.post_order(
+                self._order_templates['/buy', book], amount, price
+            )
         return self._rest_client.post(
             endpoint='/buy',
             payload={'book': book, 'amount': amount, 'price': price}
@@ -263,9 +952,17 @@ class QuadrigaClient(object):
         :returns: te total amount of minor currency acquired in sale and a set
             of amount/price pairs, one for each matched in the trade
         :rtype: dict
+        :raises InvalidOrderError: if the order breaks the rules of the book
         """
         book = self._verify_book(book)
-        self._log("sell {} at market price for {}".format(amount, book))
+        self._log(
+            'sell %(amount)s at market price for %(book)s',
+            endpoint='/sell',
+            book=book,
+            amount=amount
+        )
+        amount, _ = self._format(book, amount)
+        self._check_order(book, amount, side='sell')
 
         return self._rest_client.post(
             endpoint='/sell',
@@ -283,10 +980,23 @@ class QuadrigaClient(object):
         :type book: str | unicode
         :returns: the details of the order placed
         :rtype: dict
+        :raises InvalidOrderError: if the order breaks the rules of the book
         """
         book = self._verify_book(book)
-        self._log("sell {} at price of {} for {}".format(amount, price, book))
+        self._log(
+            'sell %(amount)s at price of %(price)s for %(book)s',
+            endpoint='/sell',
+            book=book,
+            amount=amount,
+            price=price
+        )
+        amount, price = self._format(book, amount, price)
+        price = self._check_order(book, amount, price, 'sell')
 
+        if self._order_templates is not None:
+            return self._rest_client.post_order(
+                self._order_templates['/sell', book], amount, price
+            )
         return self._rest_client.post(
             endpoint='/sell',
             payload={'book': book, 'amount': amount, 'price': price}
@@ -300,7 +1010,11 @@ class QuadrigaClient(object):
         :returns: ``True`` if order has been found and cancelled
         :rtype: bool
         """
-        self._log('look up order {}'.format(order_id))
+        self._log(
+            'look up order %(order_id)s',
+            endpoint='/lookup_order',
+            order_id=order_id
+        )
 
         return self._rest_client.post(
             endpoint='/lookup_order',
@@ -315,7 +1029,11 @@ class QuadrigaClient(object):
         :returns: ``True`` if order has been found and cancelled
         :rtype: bool
         """
-        self._log('cancel order {}'.format(order_id))
+        self._log(
+            'cancel order %(order_id)s',
+            endpoint='/cancel_order',
+            order_id=order_id
+        )
 
         return self._rest_client.post(
             endpoint='/cancel_order',
@@ -333,7 +1051,11 @@ class QuadrigaClient(object):
         :raises InvalidCurrencyError: on unknown currency
         """
         self._verify_currency(currency)
-        self._log('get deposit address for {}'.format(currency))
+        self._log(
+            'get deposit address for %(currency)s',
+            endpoint='/{}_deposit_address'.format(currency),
+            currency=currency
+        )
 
         return self._rest_client.post(
             endpoint='/{}_deposit_address'.format(currency)
@@ -352,7 +1074,13 @@ class QuadrigaClient(object):
         :raises InvalidCurrencyError: on unknown currency
         """
         self._verify_currency(currency)
-        self._log('withdraw {} {}s to {}'.format(amount, currency, address))
+        self._log(
+            'withdraw %(amount)s %(currency)ss to %(address)s',
+            endpoint='/{}_withdrawal'.format(currency),
+            currency=currency,
+            amount=amount,
+            address=address
+        )
 
         payload = {'address': address, 'amount': amount}
 
@@ -360,3 +1088,8 @@ class QuadrigaClient(object):
             endpoint='/{}_withdrawal'.format(currency),
             payload=payload
         )
+
+
+if sys.version_info >= (3, 5):  # pragma: no cover
+    from quadriga.async_client import AsyncQuadrigaClient  # noqa
+    from quadriga.async_rest_client import AsyncPriorityScheduler  # noqa
@@ -0,0 +1,331 @@
+from __future__ import absolute_import, unicode_literals
+
+import mmap
+import os
+import struct
+from collections import deque
+
+# Columns of a public trades archive, each stored in its own file of
+# fixed-width little-endian values: trade ID, Unix timestamp, price, amount
+# and side (1 == buy, -1 == sell, 0 == unknown). Each file can be
+# memory-mapped as a NumPy array with the dtype of its column.
+columns = ('tid', 'timestamp', 'price', 'amount', 'side')
+column_dtypes = {
+    'tid': '<i8',
+    'timestamp': '<i8',
+    'price': '<f8',
+    'amount': '<f8',
+    'side': 'i1',
+}
+_column_codes = dict(zip(columns, 'qqddb'))
+_column_formats = {
+    name: struct.Struct('<' + code) for name, code in _column_codes.items()
+}
+
+_sides = {'buy': 1, 'sell': -1}
+
+
+class RecentIds(object):
+    """Bounded index of the most recently added trade IDs, kept in a set
+    with the order they were added in, so that both lookups and additions
+    take constant time.
+
+    Once IDs have been evicted, IDs up to the highest one evicted are treated
+    as seen. It is used to drop duplicate trades by
+    :class:`quadriga.TradeArchiver` and :class:`quadriga.CandleAggregator`.
+
+    :param size: the maximum number of trade IDs kept
+    :type size: int
+    """
+
+    __slots__ = ('_size', '_ids', '_order', '_evicted')
+
+    def __init__(self, size):
+        self._size = size
+        self._ids = set()
+        self._order = deque()
+        self._evicted = None
+
+    def __contains__(self, tid):
+        if self._evicted is not None and tid <= self._evicted:
+            return True
+        return tid in self._ids
+
+    def add(self, tid):
+        if tid in self._ids:
+            return
+        self._ids.add(tid)
+        self._order.append(tid)
+        if len(self._order) > self._size:
+            oldest = self._order.popleft()
+            self._ids.discard(oldest)
+            if self._evicted is None or oldest > self._evicted:
+                self._evicted = oldest
+
+
+def column_path(path, name):
+    """Return the path of a column file of an archive.
+
+    :param path: the path of the archive directory
+    :type path: str | unicode
+    :param name: the name of the column (see :data:`columns`)
+    :type name: str | unicode
+    :returns: the path of the column file
+    :rtype: str | unicode
+    """
+    return os.path.join(path, '{}.col'.format(name))
+
+
+class TradeArchiver(object):
+    """Archiver of public trades, which appends new ones to a columnar
+    archive per order book.
+
+    Each poll fetches the public trades of the last hour, drops the ones
+    already archived by trade ID and appends the rest in trade ID order to
+    ``<directory>/<book>.trades/``, one fixed-width file per column (see
+    :data:`columns`). The IDs of the most recent trades are kept in a compact
+    in-memory index, which is rebuilt from the end of the trade ID column on
+    initialization so that archiving can resume after a restart.
+
+    :param client: the QuadrigaCX client
+    :type client: quadriga.QuadrigaClient
+    :param directory: the directory of the archive files (created if missing)
+    :type directory: str | unicode
+    :param books: the names of the order books to archive (``None`` == all)
+    :type books: [str | unicode]
+    :param index_size: the number of recent trade IDs kept per order book,
+        which must exceed the number of trades in an hour
+    :type index_size: int
+    :raises InvalidOrderBookError: on invalid order book name
+    """
+
+    def __init__(self, client, directory, books=None, index_size=16384):
+        self._client = client
+        self._directory = directory
+        self._books = client._verify_books(books)
+        self._index_size = index_size
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self._recent_ids = {book: self._load_ids(book) for book in self._books}
+
+    def path(self, book):
+        """Return the path of the archive directory of the order book.
+
+        :param book: the name of the order book
+        :type book: str | unicode
+        :returns: the path of the archive directory
+        :rtype: str | unicode
+        """
+        return os.path.join(self._directory, '{}.trades'.format(book))
+
+    def _load_ids(self, book):
+        """Build the index of recent trade IDs from the archive.
+
+        Values left at the end of some columns by an interrupted write are
+        truncated, so that all columns have the same length.
+
+        :param book: the name of the order book
+        :type book: str | unicode
+        :returns: the index of recent trade IDs
+        :rtype: quadriga.archive.RecentIds
+        """
+        recent_ids = RecentIds(self._index_size)
+        path = self.path(book)
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        sizes = {}
+        for name in columns:
+            with open(column_path(path, name), 'ab') as column:
+                sizes[name] = column.tell()
+        count = min(
+            sizes[name] // _column_formats[name].size for name in columns
+        )
+        for name in columns:
+            size = count * _column_formats[name].size
+            if sizes[name] != size:
+                with open(column_path(path, name), 'r+b') as column:
+                    column.truncate(size)
+
+        tid_format = _column_formats['tid']
+        with open(column_path(path, 'tid'), 'rb') as column:
+            column.seek(max(count - self._index_size, 0) * tid_format.size)
+            data = column.read()
+        for offset in range(0, len(data), tid_format.size):
+            recent_ids.add(tid_format.unpack_from(data, offset)[0])
+        return recent_ids
+
+    def poll(self, books=None):
+        """Fetch the recent public trades and archive the new ones.
+
+        :param books: the names of the order books (``None`` == all the
+            order books archived)
+        :type books: [str | unicode]
+        :returns: the number of trades appended by order book
+        :rtype: dict
+        :raises InvalidOrderBookError: on invalid order book name
+        """
+        books = self._books if books is None else books
+        return {book: self.poll_book(book) for book in books}
+
+    def poll_book(self, book):
+        """Fetch the recent public trades of the order book and archive the
+        new ones.
+
+        :param book: the name of the order book
+        :type book: str | unicode
+        :returns: the number of trades appended
+        :rtype: int
+        :raises InvalidOrderBookError: on invalid order book name
+        """
+        book = self._client._verify_book(book)
+        # Fetched unconverted, so that fixed-point units never end up in the
+        # price and amount columns
+        trades = self._client._get_public_trades('hour', book, refresh=True)
+        recent_ids = self._recent_ids.get(book)
+        if recent_ids is None:
+            recent_ids = self._recent_ids[book] = self._load_ids(book)
+
+        values = {name: [] for name in columns}
+        for trade in sorted(trades, key=lambda t: int(t['tid'])):
+            tid = int(trade['tid'])
+            if tid in recent_ids:
+                continue
+            recent_ids.add(tid)
+            values['tid'].append(tid)
+            values['timestamp'].append(int(trade['date']))
+            values['price'].append(float(trade['price']))
+            values['amount'].append(float(trade['amount']))
+            values['side'].append(_sides.get(trade.get('side'), 0))
+
+        count = len(values['tid'])
+        if count:
+            path = self.path(book)
+            for name in columns:
+                data = struct.pack(
+                    '<{}{}'.format(count, _column_codes[name]), *values[name]
+                )
+                with open(column_path(path, name), 'ab') as column:
+                    column.write(data)
+        return count
+
+
+class TradeArchive(object):
+    """Read-only, memory-mapped view of a columnar public trades archive.
+
+    Records are returned as ``(tid, timestamp, price, amount, side)`` tuples
+    in the order they were archived. Timestamps are searched in their own
+    column, without reading the others. With NumPy, a column can also be
+    mapped as an array::
+
+        numpy.memmap(
+            quadriga.archive.column_path(path, 'price'),
+            dtype=quadriga.archive.column_dtypes['price'],
+            mode='r'
+        )
+
+    :param path: the path of the archive directory, e.g. from
+        :func:`TradeArchiver.path`
+    :type path: str | unicode
+    """
+
+    def __init__(self, path):
+        self._files = {}
+        self._maps = {}
+        try:
+            for name in columns:
+                self._files[name] = open(column_path(path, name), 'rb')
+        except BaseException:
+            self.close()
+            raise
+        self._count = min(
+            os.fstat(self._files[name].fileno()).st_size //
+            _column_formats[name].size
+            for name in columns
+        )
+        if self._count:
+            for name in columns:
+                self._maps[name] = mmap.mmap(
+                    self._files[name].fileno(), 0, access=mmap.ACCESS_READ
+                )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError('record index out of range')
+        return self._record(index)
+
+    def close(self):
+        """Unmap and close the column files."""
+        for column in self._maps.values():
+            column.close()
+        self._maps = {}
+        for column in self._files.values():
+            column.close()
+        self._files = {}
+
+    def _value(self, name, index):
+        """Return a value of a column.
+
+        :param name: the name of the column
+        :type name: str | unicode
+        :param index: the index of the record
+        :type index: int
+        :returns: the value
+        :rtype: int | float
+        """
+        column_format = _column_formats[name]
+        return column_format.unpack_from(
+            self._maps[name], index * column_format.size
+        )[0]
+
+    def _record(self, index):
+        """Return a record assembled from the columns.
+
+        :param index: the index of the record
+        :type index: int
+        :returns: the ``(tid, timestamp, price, amount, side)`` record
+        :rtype: tuple
+        """
+        return tuple(self._value(name, index) for name in columns)
+
+    def bisect(self, timestamp):
+        """Return the index of the first record at or after the timestamp.
+
+        :param timestamp: the Unix timestamp
+        :type timestamp: int
+        :returns: the index of the record (``len(archive)`` == none)
+        :rtype: int
+        """
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._value('timestamp', middle) < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def scan(self, start=None, end=None):
+        """Iterate over the records in a time range.
+
+        :param start: the earliest Unix timestamp (inclusive)
+        :type start: int
+        :param end: the latest Unix timestamp (exclusive)
+        :type end: int
+        :returns: an iterator over the records
+        :rtype: collections.Iterator
+        """
+        first = 0 if start is None else self.bisect(start)
+        last = self._count if end is None else self.bisect(end)
+        for index in range(first, last):
+            yield self._record(index)
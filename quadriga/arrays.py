@@ -0,0 +1,117 @@
+from __future__ import absolute_import, unicode_literals
+
+from quadriga.archive import _sides
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+
+def _require_numpy():
+    """Raise an error if NumPy is not installed."""
+    if numpy is None:  # pragma: no cover
+        raise ImportError('numpy is required for array views')
+
+
+def _column(rows, count, index, dtype):
+    """Parse one column of the rows straight into a NumPy array.
+
+    :param rows: the rows of the response
+    :type rows: list
+    :param count: the number of rows
+    :type count: int
+    :param index: the index or key of the column in each row
+    :type index: int | str | unicode
+    :param dtype: the type of the array
+    :type dtype: numpy.dtype
+    :returns: the column
+    :rtype: numpy.ndarray
+    """
+    return numpy.fromiter(
+        (row[index] for row in rows), dtype=dtype, count=count
+    )
+
+
+def _order_side(orders):
+    """Parse one side of the public open orders.
+
+    :param orders: the price/amount pairs, best price first
+    :type orders: [[str | unicode]]
+    :returns: the price, amount and cumulative depth arrays
+    :rtype: dict
+    """
+    count = len(orders)
+    amount = _column(orders, count, 1, numpy.float64)
+    return {
+        'price': _column(orders, count, 0, numpy.float64),
+        'amount': amount,
+        'depth': numpy.cumsum(amount),
+    }
+
+
+def order_arrays(response):
+    """Parse a :func:`get_public_orders` response into NumPy arrays.
+
+    :param response: the public open orders
+    :type response: dict
+    :returns: the Unix ``"timestamp"``, and the float64 ``"price"``,
+        ``"amount"`` and cumulative ``"depth"`` arrays of the ``"bids"`` and
+        ``"asks"``, best price first
+    :rtype: dict
+    :raises ImportError: if NumPy is not installed
+    """
+    _require_numpy()
+    timestamp = response.get('timestamp')
+    return {
+        'timestamp': None if timestamp is None else int(timestamp),
+        'bids': _order_side(response['bids']),
+        'asks': _order_side(response['asks']),
+    }
+
+
+def trade_arrays(response):
+    """Parse a :func:`get_public_trades` response into NumPy arrays.
+
+    :param response: the recent public trades
+    :type response: [dict]
+    :returns: the int64 ``"tid"`` and ``"timestamp"``, float64 ``"price"``
+        and ``"amount"``, and int8 ``"side"`` (1 == buy, -1 == sell) arrays,
+        in the order of the response (latest first)
+    :rtype: dict
+    :raises ImportError: if NumPy is not installed
+    """
+    _require_numpy()
+    count = len(response)
+    return {
+        'tid': _column(response, count, 'tid', numpy.int64),
+        'timestamp': _column(response, count, 'date', numpy.int64),
+        'price': _column(response, count, 'price', numpy.float64),
+        'amount': _column(response, count, 'amount', numpy.float64),
+        'side': numpy.fromiter(
+            (_sides.get(trade.get('side'), 0) for trade in response),
+            dtype=numpy.int8,
+            count=count
+        ),
+    }
+
+
+def vwap(side, amount):
+    """Return the average price of filling an amount against one side of
+    the order book.
+
+    :param side: the arrays of one side returned by :func:`order_arrays`
+    :type side: dict
+    :param amount: the amount to fill
+    :type amount: int | float
+    :returns: the volume-weighted average price (``None`` == not enough
+        depth)
+    :rtype: float
+    """
+    depth = side['depth']
+    if not len(depth) or depth[-1] < amount:
+        return None
+    last = int(numpy.searchsorted(depth, amount))
+    filled = side['amount'][:last + 1].copy()
+    filled[last] -= depth[last] - amount
+    return float(numpy.dot(filled, side['price'][:last + 1]) / amount)
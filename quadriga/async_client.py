@@ -0,0 +1,346 @@
+from __future__ import absolute_import, unicode_literals
+
+import asyncio
+import time
+
+from quadriga import QuadrigaClient
+from quadriga.async_rest_client import AsyncRestClient
+from quadriga.tracing import convert
+
+
+class AsyncTradeIterator(object):
+    """Asynchronous iterator over the user's completed trades, latest first.
+
+    The next page is fetched in the background while the current one is
+    being consumed, unless the current one holds the trade to stop at. Call
+    :func:`close` to stop early and cancel the page being fetched.
+
+    :param client: the async QuadrigaCX client
+    :type client: quadriga.AsyncQuadrigaClient
+    :param book: the name of the order book
+    :type book: str | unicode
+    :param page_size: the number of trades fetched per request
+    :type page_size: int
+    :param since: the date and time to stop at (exclusive)
+    :type since: str | unicode
+    :param since_id: the transaction ID to stop at (exclusive)
+    :type since_id: str | unicode | int
+    :param raw: return the trades without conversions
+    :type raw: bool
+    """
+
+    def __init__(self, client, book, page_size, since, since_id, raw=False):
+        self._client = client
+        self._raw = raw
+        self._book = book
+        self._page_size = page_size
+        self._since = since
+        self._since_id = since_id
+        self._offset = 0
+        self._next_page = None
+        self._page = iter(())
+        self._page_ids = set()
+        self._last_ids = set()
+        self._started = False
+
+    def __aiter__(self):
+        return self
+
+    def _fetch(self):
+        """Start fetching the next page in the background."""
+        if self._raw:
+            page = self._client._get_trades(
+                self._page_size, self._offset, 'desc', self._book
+            )
+        else:
+            page = self._client.get_trades(
+                limit=self._page_size,
+                offset=self._offset,
+                sort='desc',
+                book=self._book
+            )
+        self._next_page = asyncio.ensure_future(page)
+
+    async def __anext__(self):
+        if not self._started:
+            self._started = True
+            self._fetch()
+        while True:
+            for trade in self._page:
+                self._page_ids.add(trade['id'])
+                if trade['id'] not in self._last_ids:
+                    return trade
+            if self._next_page is None:
+                raise StopAsyncIteration
+            page = await self._next_page
+            self._offset += len(page)
+            self._next_page = None
+            stop = self._client._find_stop(page, self._since, self._since_id)
+            if stop is None and len(page) == self._page_size:
+                self._fetch()
+            self._page = iter(page[:stop])
+            self._last_ids, self._page_ids = self._page_ids, set()
+
+    def close(self):
+        """Stop the iteration and cancel the page being fetched."""
+        self._page = iter(())
+        if self._next_page is not None:
+            self._next_page.cancel()
+            self._next_page = None
+
+
+class AsyncQuadrigaClient(QuadrigaClient):
+    """Asynchronous Python client for QuadrigaCX API v2.
+
+    It has the same methods as :class:`quadriga.QuadrigaClient`, but each
+    API call returns an awaitable. Invalid order books and currencies are
+    still reported immediately when the method is called.
+
+    :param api_key: QuadrigaCX API key
+    :type api_key: str | unicode
+    :param api_secret: QuadrigaCX API secret
+    :type api_secret: str | unicode
+    :param client_id: QuadrigaCX client ID
+    :type client_id: str | unicode
+    :param default_book: the default order book
+    :type default_book: str | unicode
+    :param session: the HTTP session to send requests with, which can be
+        shared between clients to reuse the same connection pool
+    :type session: aiohttp.ClientSession
+    :param nonce_generator: the generator of nonces for signed requests,
+        which should be shared by all clients using the same API key
+    :type nonce_generator: quadriga.nonce.NonceGenerator
+    :param coalesce: share the outcome of identical public requests in flight
+        instead of sending them again
+    :type coalesce: bool
+    :param rate_limiter: the client-side limiter of the request rate
+        (``None`` == unlimited)
+    :type rate_limiter: quadriga.ratelimit.RateLimiter
+    :param scheduler: the scheduler admitting requests by priority class
+        (``None`` == requests are sent right away)
+    :type scheduler: quadriga.async_rest_client.AsyncPriorityScheduler
+    :param retry_policy: the policy for retrying and hedging idempotent API
+        calls (``None`` == no retries)
+    :type retry_policy: quadriga.retry.RetryPolicy
+    :param limit: the maximum number of simultaneous connections
+        (0 == unlimited)
+    :type limit: int
+    :param limit_per_host: the maximum number of simultaneous connections per
+        host (0 == unlimited)
+    :type limit_per_host: int
+    :param keepalive_timeout: the number of seconds idle connections are kept
+    :type keepalive_timeout: int | float
+    :param cache: the cache for public market data responses (``None`` ==
+        no caching)
+    :type cache: quadriga.cache.ResponseCache
+    :param models: return compact typed models (e.g.
+        :class:`quadriga.models.Ticker`) instead of dictionaries
+    :type models: bool
+    :param decoder: the decoder of JSON response bodies (``None`` == the
+        standard library)
+    :type decoder: quadriga.decoder.JsonDecoder
+    :param fixed_point: return prices and amounts as integer units, and
+        format integer prices and amounts of orders
+    :type fixed_point: bool
+    :param round_prices: snap order prices to the price tick of the order
+        book rather than rejecting them
+    :type round_prices: bool
+    :param hooks: the request hooks, whose ``before_request`` and
+        ``after_request`` methods are called around each request sent, e.g.
+        a :class:`quadriga.MetricsCollector`
+    :type hooks: [object]
+    :param trace: measure the time spent in each phase of the requests, and
+        attach the :class:`quadriga.tracing.RequestTrace` to the responses,
+        errors and request events
+    :type trace: bool
+    :param fast_orders: prepare the signed requests of limit orders for all
+        order books ahead of time, to spend less time placing each order
+    :type fast_orders: bool
+    """
+
+    def __init__(self,
+                 api_key=None,
+                 api_secret=None,
+                 client_id=None,
+                 default_book='eth_cad',
+                 session=None,
+                 nonce_generator=None,
+                 coalesce=True,
+                 rate_limiter=None,
+                 scheduler=None,
+                 retry_policy=None,
+                 limit=100,
+                 limit_per_host=0,
+                 keepalive_timeout=15,
+                 cache=None,
+                 models=False,
+                 decoder=None,
+                 fixed_point=False,
+                 round_prices=False,
+                 hooks=None,
+                 trace=False,
+                 fast_orders=False):
+        self._limit = limit
+        self._limit_per_host = limit_per_host
+        self._keepalive_timeout = keepalive_timeout
+        super(AsyncQuadrigaClient, self).__init__(
+            api_key=api_key,
+            api_secret=api_secret,
+            client_id=client_id,
+            default_book=default_book,
+            session=session,
+            nonce_generator=nonce_generator,
+            coalesce=coalesce,
+            rate_limiter=rate_limiter,
+            scheduler=scheduler,
+            retry_policy=retry_policy,
+            cache=cache,
+            models=models,
+            decoder=decoder,
+            fixed_point=fixed_point,
+            round_prices=round_prices,
+            hooks=hooks,
+            trace=trace,
+            fast_orders=fast_orders
+        )
+
+    def _create_rest_client(self, transport=None, **kwargs):
+        """Create the REST client sending the API calls over aiohttp.
+
+        :param transport: unused, requests are always sent with aiohttp
+        :param kwargs: the parameters of the REST client
+        :returns: the REST client
+        :rtype: quadriga.async_rest_client.AsyncRestClient
+        """
+        return AsyncRestClient(
+            limit=self._limit,
+            limit_per_host=self._limit_per_host,
+            keepalive_timeout=self._keepalive_timeout,
+            **kwargs
+        )
+
+    def __enter__(self):
+        raise TypeError('use "async with" instead')
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *_):
+        await self.close()
+
+    async def close(self):
+        """Close the pooled connections owned by the client.
+
+        A session passed in during initialization is not closed, as it may
+        still be in use by other clients.
+        """
+        await self._rest_client.close()
+
+    def _get(self, endpoint, params, refresh=False, depth=None):
+        """Send an HTTP GET request, going through the cache if enabled.
+
+        Depth-limited responses are not cached.
+
+        :param endpoint: the API endpoint/path
+        :type endpoint: str | unicode
+        :param params: the request parameters
+        :type params: dict
+        :param refresh: bypass the cache and store the new response
+        :type refresh: bool
+        :param depth: the maximum number of order book levels per side
+            parsed from the response (``None`` == all)
+        :type depth: int
+        :returns: the JSON response body from QuadrigaCX
+        :rtype: collections.abc.Awaitable
+        """
+        if depth is not None:
+            return self._rest_client.get(
+                endpoint=endpoint, params=params, depth=depth
+            )
+        if self._cache is None or not self._cache.caches(endpoint):
+            return self._rest_client.get(endpoint=endpoint, params=params)
+
+        async def get():
+            if not refresh:
+                hit, response = self._cache.lookup(endpoint, params)
+                if hit:
+                    return response
+            response = await self._rest_client.get(
+                endpoint=endpoint,
+                params=params
+            )
+            self._cache.store(endpoint, params, response)
+            return response
+
+        return get()
+
+    def _then(self, response, func):
+        """Apply the function to the response once it is awaited.
+
+        :param response: the JSON response body from QuadrigaCX
+        :type response: collections.abc.Awaitable
+        :param func: the function converting the response
+        :type func: callable
+        :returns: the converted response
+        :rtype: collections.abc.Awaitable
+        """
+        async def then():
+            return convert(await response, func)
+
+        return then()
+
+    @staticmethod
+    async def _capture(method, **kwargs):
+        """Await the method and capture its result or error with a timestamp.
+
+        :param method: the client method to call
+        :type method: callable
+        :returns: the capture timestamp, and the result or the error raised
+        :rtype: dict
+        """
+        try:
+            result, error = await method(**kwargs), None
+        except Exception as err:
+            result, error = None, err
+        return {'timestamp': time.time(), 'result': result, 'error': error}
+
+    def _fan_out(self, method, books, **kwargs):
+        """Call the method for each order book concurrently.
+
+        :param method: the client method to call
+        :type method: callable
+        :param books: the names of the order books (``None`` == all)
+        :type books: [str | unicode]
+        :returns: the captured result or error of each order book
+        :rtype: collections.abc.Awaitable
+        :raises InvalidOrderBookError: on invalid order book name
+        """
+        books = self._verify_books(books)
+
+        async def gather():
+            results = await asyncio.gather(*[
+                self._capture(method, book=book, **kwargs) for book in books
+            ])
+            return dict(zip(books, results))
+
+        return gather()
+
+    def _iter_trades(self, book, page_size, since, since_id, raw=False):
+        """Return an asynchronous iterator over the user's completed trades.
+
+        :param book: the name of the order book
+        :type book: str | unicode
+        :param page_size: the number of trades fetched per request
+        :type page_size: int
+        :param since: the date and time to stop at (exclusive)
+        :type since: str | unicode
+        :param since_id: the transaction ID to stop at (exclusive)
+        :type since_id: str | unicode | int
+        :param raw: return the trades without conversions
+        :type raw: bool
+        :returns: an asynchronous iterator over the user's completed trades
+        :rtype: quadriga.async_client.AsyncTradeIterator
+        """
+        return AsyncTradeIterator(
+            self, book, page_size, since, since_id, raw
+        )
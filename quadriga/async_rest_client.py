@@ -0,0 +1,590 @@
+from __future__ import absolute_import, unicode_literals
+
+import asyncio
+import json
+import logging
+import time
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+from quadriga.cache import build_key
+from quadriga.metrics import clock
+from quadriga.rest_client import RestClient
+from quadriga.scheduler import PriorityScheduler, _Ticket
+from quadriga.streaming import OrderBookParser
+from quadriga.tracing import RequestTrace, attach
+
+
+class AsyncResponse(object):
+    """Fully read response from QuadrigaCX sent over :mod:`aiohttp`.
+
+    It mirrors the attributes of :class:`requests.models.Response` used by
+    :class:`quadriga.protocol.Protocol` so that errors are mapped the same
+    way for both clients.
+
+    :param response: the response from QuadrigaCX
+    :type response: aiohttp.ClientResponse
+    :param content: the response body
+    :type content: bytes
+    """
+
+    def __init__(self, response, content):
+        self.url = str(response.url)
+        self.headers = response.headers
+        self.status_code = response.status
+        self.reason = response.reason
+        self.content = content
+
+    @property
+    def text(self):
+        """Return the response body decoded as UTF-8.
+
+        :returns: the response body
+        :rtype: str | unicode
+        """
+        return self.content.decode('utf-8', 'replace')
+
+    def json(self):
+        """Return the JSON-decoded response body.
+
+        :returns: the JSON response body
+        :rtype: dict
+        :raises ValueError: if the body is not valid JSON
+        """
+        return json.loads(self.text)
+
+
+class AsyncRequestCoalescer(object):
+    """Coalesce identical requests in flight on the event loop into one.
+
+    While a request for a key is in flight, other coroutines asking for the
+    same key await its outcome instead of sending their own request.
+    """
+
+    def __init__(self):
+        self._flights = {}
+
+    async def call(self, key, func):
+        """Await the coroutine function, or the call in flight for the key.
+
+        :param key: the key identifying the request
+        :type key: collections.Hashable
+        :param func: the coroutine function sending the request
+        :type func: callable
+        :returns: the return value of the coroutine function
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = asyncio.ensure_future(func())
+            self._flights[key] = flight
+            flight.add_done_callback(lambda _: self._flights.pop(key, None))
+        return await asyncio.shield(flight)
+
+
+class AsyncPriorityScheduler(PriorityScheduler):
+    """Scheduler which admits coroutines by priority class when capacity is
+    limited.
+
+    It has the same parameters as :class:`quadriga.scheduler.PriorityScheduler`
+    but must only be used from a single event loop.
+    """
+
+    def __init__(self, max_in_flight=None, bucket=None, max_wait=10.0):
+        super(AsyncPriorityScheduler, self).__init__(
+            max_in_flight=max_in_flight,
+            bucket=bucket,
+            max_wait=max_wait
+        )
+        self._cond = None
+
+    def _get_cond(self):
+        """Return the condition waited on, creating it first if necessary.
+
+        :returns: the condition
+        :rtype: asyncio.Condition
+        """
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        return self._cond
+
+    async def acquire(self, priority):
+        """Wait until the request is admitted.
+
+        :param priority: the priority class of the request
+        :type priority: int
+        """
+        ticket = _Ticket(priority)
+        async with self._get_cond():
+            self._queues[priority].append(ticket)
+            try:
+                while True:
+                    retry_after = self._dispatch()
+                    if ticket.granted:
+                        return
+                    try:
+                        await asyncio.wait_for(self._cond.wait(), retry_after)
+                    except asyncio.TimeoutError:
+                        pass
+            except (asyncio.CancelledError, Exception):
+                # The ticket would otherwise be admitted later and hold its
+                # capacity forever, e.g. for the losers of hedged requests
+                self._abandon(ticket)
+                raise
+
+    async def release(self):
+        """Free the capacity used by a request which has completed."""
+        async with self._get_cond():
+            self._in_flight -= 1
+            self._dispatch()
+
+
+class AsyncRestClient(RestClient):
+    """Asynchronous HTTP client which handles HMAC SHA256 authentication.
+
+    The :class:`aiohttp.ClientSession` is created lazily on the first request
+    since it must be bound to a running event loop.
+
+    :param api_key: the API key from QuadrigaCX
+    :type api_key: str | unicode
+    :param api_secret: the API secret from QuadrigaCX
+    :type api_secret: str | unicode
+    :param client_id: the QuadrigaCX client ID
+    :type client_id: str | unicode
+    :param session: the HTTP session to send requests with
+    :type session: aiohttp.ClientSession
+    :param nonce_generator: the generator of nonces for signed requests,
+        which should be shared by all clients using the same API key
+    :type nonce_generator: quadriga.nonce.NonceGenerator
+    :param coalesce: share the outcome of identical GET requests in flight
+        instead of sending them again
+    :type coalesce: bool
+    :param rate_limiter: the client-side limiter of the request rate
+        (``None`` == unlimited)
+    :type rate_limiter: quadriga.ratelimit.RateLimiter
+    :param scheduler: the scheduler admitting requests by priority class
+        (``None`` == requests are sent right away)
+    :type scheduler: quadriga.async_rest_client.AsyncPriorityScheduler
+    :param retry_policy: the policy for retrying and hedging idempotent
+        API calls (``None`` == no retries)
+    :type retry_policy: quadriga.retry.RetryPolicy
+    :param limit: the maximum number of simultaneous connections
+        (0 == unlimited)
+    :type limit: int
+    :param limit_per_host: the maximum number of simultaneous connections per
+        host (0 == unlimited)
+    :type limit_per_host: int
+    :param keepalive_timeout: the number of seconds idle connections are kept
+    :type keepalive_timeout: int | float
+    :param decoder: the decoder of JSON response bodies (``None`` == the
+        standard library)
+    :type decoder: quadriga.decoder.JsonDecoder
+    :param hooks: the request hooks, whose ``before_request`` and
+        ``after_request`` methods are called with a
+        :class:`quadriga.metrics.RequestEvent` around each request sent
+    :type hooks: [object]
+    :param trace: measure the time spent in each phase of the requests,
+        and attach the :class:`quadriga.tracing.RequestTrace` to the
+        responses, errors and request events
+    :type trace: bool
+    """
+
+    # Errors from the HTTP transport treated as transient
+    transient_errors = (
+        (aiohttp.ClientConnectionError, asyncio.TimeoutError)
+        if aiohttp is not None else ()
+    )
+
+    def __init__(self,
+                 api_key=None,
+                 api_secret=None,
+                 client_id=None,
+                 session=None,
+                 nonce_generator=None,
+                 coalesce=True,
+                 rate_limiter=None,
+                 scheduler=None,
+                 retry_policy=None,
+                 limit=100,
+                 limit_per_host=0,
+                 keepalive_timeout=15,
+                 decoder=None,
+                 hooks=None,
+                 trace=False):
+        if aiohttp is None:  # pragma: no cover
+            raise ImportError('aiohttp is required for the async client')
+        self._limit = limit
+        self._limit_per_host = limit_per_host
+        self._keepalive_timeout = keepalive_timeout
+        super(AsyncRestClient, self).__init__(
+            api_key=api_key,
+            api_secret=api_secret,
+            client_id=client_id,
+            session=session,
+            nonce_generator=nonce_generator,
+            coalesce=coalesce,
+            rate_limiter=rate_limiter,
+            scheduler=scheduler,
+            retry_policy=retry_policy,
+            decoder=decoder,
+            hooks=hooks,
+            trace=trace
+        )
+
+    def _create_transport(self, session):
+        """Keep the session, deferring its creation until the first request
+        is sent, since requests are sent over :mod:`aiohttp` directly.
+
+        :param session: the HTTP session to send requests with
+        :type session: aiohttp.ClientSession
+        :returns: None
+        """
+        self._owns_session = session is None
+        self._session = session
+        return None
+
+    @property
+    def session(self):
+        """Return the HTTP session used to send requests.
+
+        :returns: the HTTP session (``None`` == not created yet)
+        :rtype: aiohttp.ClientSession
+        """
+        return self._session
+
+    @property
+    def _transient_errors(self):
+        """Return the errors from :mod:`aiohttp` treated as transient.
+
+        :returns: the exception classes
+        :rtype: (type)
+        """
+        return self.transient_errors
+
+    def _create_coalescer(self):
+        """Create the coalescer of identical GET requests in flight.
+
+        :returns: the request coalescer
+        :rtype: quadriga.async_rest_client.AsyncRequestCoalescer
+        """
+        return AsyncRequestCoalescer()
+
+    def _get_session(self):
+        """Return the HTTP session, creating it first if necessary.
+
+        :returns: the HTTP session
+        :rtype: aiohttp.ClientSession
+        """
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self._limit,
+                    limit_per_host=self._limit_per_host,
+                    keepalive_timeout=self._keepalive_timeout
+                )
+            )
+        return self._session
+
+    async def close(self):
+        """Close the pooled connections owned by this client.
+
+        Sessions passed in by the caller are shared and left open.
+        """
+        if self._owns_session and self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _acquire(self, private):
+        """Wait until the budget for the kind of API call is available.
+
+        :param private: whether the API call is signed
+        :type private: bool
+        """
+        if self._rate_limiter is None:
+            return
+        bucket = self._rate_limiter.bucket(private)
+        if bucket is not None:
+            delay = bucket.reserve()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+    async def _send(self, endpoint, private, send):
+        """Send the request once admitted by the scheduler and the limiter.
+
+        :param endpoint: the API endpoint/path
+        :type endpoint: str | unicode
+        :param private: whether the API call is signed
+        :type private: bool
+        :param send: the coroutine function sending the request, given the
+            trace of the request if traced
+        :type send: callable
+        :returns: the JSON response body from QuadrigaCX
+        :rtype: dict
+        """
+        trace = None
+        if self._trace:
+            trace = RequestTrace()
+            queued = clock()
+        admitted = False
+        try:
+            if self._scheduler is not None:
+                await self._scheduler.acquire(
+                    self._priority(endpoint, private)
+                )
+                admitted = True
+            await self._acquire(private)
+            if trace is None:
+                return await send()
+            trace.add('queue', clock() - queued)
+            return await send(trace)
+        finally:
+            if admitted:
+                await self._scheduler.release()
+
+    async def _call(self, endpoint, private, send):
+        """Send the request, retrying and hedging it if the policy allows.
+
+        :param endpoint: the API endpoint/path
+        :type endpoint: str | unicode
+        :param private: whether the API call is signed
+        :type private: bool
+        :param send: the coroutine function sending the request
+        :type send: callable
+        :returns: the JSON response body from QuadrigaCX
+        :rtype: dict
+        """
+        if not self._is_retryable(endpoint, private):
+            return await self._send(endpoint, private, send)
+        attempt = 1
+        while True:
+            try:
+                if private:
+                    return await self._send(endpoint, private, send)
+                return await self._hedge(endpoint, send)
+            except Exception as err:
+                if attempt >= self._retry_policy.max_attempts:
+                    raise
+                if not self._is_transient(err):
+                    raise
+            await asyncio.sleep(self._retry_policy.backoff_delay(attempt))
+            attempt += 1
+
+    async def _hedge(self, endpoint, send):
+        """Send the GET request, and a second one if the first is too slow.
+
+        The request which does not complete first is cancelled.
+
+        :param endpoint: the API endpoint/path
+        :type endpoint: str | unicode
+        :param send: the coroutine function sending the request
+        :type send: callable
+        :returns: the JSON response body from the first successful request
+        :rtype: dict
+        """
+        policy = self._retry_policy
+
+        async def timed_send():
+            start = time.time()
+            result = await self._send(endpoint, False, send)
+            policy.record_latency(time.time() - start)
+            return result
+
+        delay = policy.hedge_delay()
+        if delay is None:
+            return await timed_send()
+
+        first = asyncio.ensure_future(timed_send())
+        done, _ = await asyncio.wait([first], timeout=delay)
+        if done:
+            return first.result()
+
+        second = asyncio.ensure_future(timed_send())
+        pending = {first, second}
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for future in done:
+                error = future.exception()
+                if error is None:
+                    for loser in pending:
+                        loser.cancel()
+                    return future.result()
+        raise error
+
+    async def _request(self, request, depth=None, trace=None):
+        """Send an HTTP request to QuadrigaCX and handle the response,
+        notifying the request hooks.
+
+        :param request: the request to send
+        :type request: quadriga.protocol.Request
+        :param depth: parse the order book response from the stream up to
+            this number of price levels per side (``None`` == all)
+        :type depth: int
+        :param trace: the trace of the request, if traced
+        :type trace: quadriga.tracing.RequestTrace
+        :returns: the JSON response body from QuadrigaCX
+        :rtype: dict
+        """
+        if (not self._hooks and trace is None and
+                not self._logger.isEnabledFor(logging.DEBUG)):
+            return await self._exchange(request, depth)
+        event = self._start_event(
+            request.endpoint, request.method == 'POST', trace
+        )
+        error = None
+        try:
+            result = await self._exchange(request, depth, event)
+            return result if trace is None else attach(result, trace)
+        except BaseException as err:
+            error = err
+            raise
+        finally:
+            self._finish_event(event, error)
+
+    async def _exchange(self, request, depth=None, event=None):
+        """Send an HTTP request to QuadrigaCX and handle the response.
+
+        Connecting is not split from waiting for the response headers, i.e.
+        the ``"first_byte"`` phase includes ``"connect"`` and ``"tls"``.
+
+        :param request: the request to send
+        :type request: quadriga.protocol.Request
+        :param depth: parse the order book response from the stream up to
+            this number of price levels per side (``None`` == all)
+        :type depth: int
+        :param event: the request event to fill in
+        :type event: quadriga.metrics.RequestEvent
+        :returns: the JSON response body from QuadrigaCX
+        :rtype: dict
+        """
+        protocol = self._protocol
+        trace = None if event is None else event.trace
+        if request.body is not None:
+            kwargs = {'data': request.body, 'headers': request.headers}
+        elif request.method == 'POST':
+            kwargs = {'json': request.json}
+        else:
+            kwargs = {'params': request.params}
+        session = self._get_session()
+        async with session.request(
+            request.method, request.url, **kwargs
+        ) as response:
+            if event is not None:
+                event.status = response.status
+            if trace is not None:
+                trace.add('first_byte', clock() - event.start)
+                start = clock()
+            if depth is None or response.status not in protocol.http_success:
+                content = await response.read()
+                if event is not None:
+                    event.bytes = len(content)
+                if trace is None:
+                    return protocol.handle_response(
+                        AsyncResponse(response, content)
+                    )
+                trace.add('download', clock() - start)
+                start = clock()
+                try:
+                    return protocol.handle_response(
+                        AsyncResponse(response, content)
+                    )
+                finally:
+                    trace.add('decode', clock() - start)
+            if event is not None:
+                event.bytes = response.content_length
+            parser = OrderBookParser(depth)
+            async for chunk in response.content.iter_chunked(
+                self.stream_chunk_size
+            ):
+                if parser.feed(chunk):
+                    break
+        if trace is not None:
+            trace.add('download', clock() - start)
+        return protocol.handle_levels(
+            AsyncResponse(response, parser.text.encode('utf-8')), parser
+        )
+
+    async def post_order(self, template, amount, price):
+        """Send a limit order built from its template to QuadrigaCX.
+
+        :param template: the order template
+        :type template: quadriga.protocol.OrderTemplate
+        :param amount: the amount of major currency
+        :type amount: int | float | str | unicode | decimal.Decimal
+        :param price: the limit price
+        :type price: int | float | str | unicode | decimal.Decimal
+        :return: the JSON response body from QuadrigaCX
+        :rtype: dict
+        """
+        return await self._call(
+            template.endpoint,
+            True,
+            lambda trace=None: self._request(
+                self._protocol.build_order(template, amount, price, trace),
+                trace=trace
+            )
+        )
+
+    async def get(self, endpoint, params=None, depth=None):
+        """Send an HTTP GET request to QuadrigaCX.
+
+        :param endpoint: the API endpoint/path
+        :type endpoint: str | unicode
+        :param params: the request parameters
+        :type params: dict
+        :param depth: parse the order book response from the stream up to
+            this number of price levels per side (``None`` == all)
+        :type depth: int
+        :returns: the JSON response body from QuadrigaCX
+        :rtype: dict
+        """
+        if self._coalescer is None:
+            return await self._get(endpoint, params, depth)
+        key = build_key(endpoint, params)
+        return await self._coalescer.call(
+            key=key if depth is None else (key, depth),
+            func=lambda: self._get(endpoint, params, depth)
+        )
+
+    async def _get(self, endpoint, params, depth=None):
+        """Send an HTTP GET request to QuadrigaCX without coalescing.
+
+        :param endpoint: the API endpoint/path
+        :type endpoint: str | unicode
+        :param params: the request parameters
+        :type params: dict
+        :param depth: parse the order book response from the stream up to
+            this number of price levels per side (``None`` == all)
+        :type depth: int
+        :returns: the JSON response body from QuadrigaCX
+        :rtype: dict
+        """
+        request = self._protocol.build_get(endpoint, params)
+        return await self._call(
+            endpoint,
+            False,
+            lambda trace=None: self._request(request, depth, trace)
+        )
+
+    async def post(self, endpoint, payload=None):
+        """Send an HTTP POST request to QuadrigaCX.
+
+        :param endpoint: the API endpoint/path
+        :type endpoint: str | unicode
+        :param payload: the request payload
+        :type payload: dict
+        :return: the JSON response body from QuadrigaCX
+        :rtype: dict
+        """
+        return await self._call(
+            endpoint,
+            True,
+            lambda trace=None: self._request(
+                self._protocol.build_post(endpoint, payload, trace),
+                trace=trace
+            )
+        )
@@ -0,0 +1,139 @@
+from __future__ import absolute_import, unicode_literals
+
+import threading
+import time
+from collections import OrderedDict
+
+
+def build_key(endpoint, params):
+    """Build the key identifying a request from its endpoint and parameters.
+
+    :param endpoint: the API endpoint/path
+    :type endpoint: str | unicode
+    :param params: the request parameters
+    :type params: dict
+    :returns: the request key
+    :rtype: tuple
+    """
+    return endpoint, tuple(sorted((params or {}).items()))
+
+
+class ResponseCache(object):
+    """In-process TTL cache with LRU eviction for public API responses.
+
+    Responses are keyed by the API endpoint and the request parameters. Note
+    that cached responses are shared between callers and should not be
+    modified in place.
+
+    :param ttls: the number of seconds responses are kept by API endpoint
+        (e.g. ``{"/ticker": 1}``), merged into :attr:`default_ttls`
+    :type ttls: dict
+    :param maxsize: the maximum number of responses kept
+    :type maxsize: int
+    """
+
+    # Default time-to-live in seconds by API endpoint
+    default_ttls = {
+        '/ticker': 1.0,
+        '/order_book': 0.5,
+        '/transactions': 5.0,
+    }
+
+    def __init__(self, ttls=None, maxsize=256):
+        self._ttls = dict(self.default_ttls)
+        self._ttls.update(ttls or {})
+        self._maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._stats = {}
+
+    def _count(self, endpoint, stat):
+        """Increment a statistic of the API endpoint.
+
+        :param endpoint: the API endpoint/path
+        :type endpoint: str | unicode
+        :param stat: the name of the statistic
+        :type stat: str | unicode
+        """
+        if endpoint not in self._stats:
+            self._stats[endpoint] = {'hits': 0, 'misses': 0, 'evictions': 0}
+        self._stats[endpoint][stat] += 1
+
+    def caches(self, endpoint):
+        """Return True if responses from the API endpoint are cached.
+
+        :param endpoint: the API endpoint/path
+        :type endpoint: str | unicode
+        :returns: whether responses from the endpoint are cached
+        :rtype: bool
+        """
+        return bool(self._ttls.get(endpoint))
+
+    def lookup(self, endpoint, params=None):
+        """Look up a fresh response.
+
+        :param endpoint: the API endpoint/path
+        :type endpoint: str | unicode
+        :param params: the request parameters
+        :type params: dict
+        :returns: whether a fresh response was found, and the response
+        :rtype: (bool, dict)
+        """
+        key = build_key(endpoint, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.time():
+                self._count(endpoint, 'misses')
+                return False, None
+            self._entries.pop(key)
+            self._entries[key] = entry
+            self._count(endpoint, 'hits')
+            return True, entry[1]
+
+    def store(self, endpoint, params, response):
+        """Store a response, evicting the least recently used if full.
+
+        :param endpoint: the API endpoint/path
+        :type endpoint: str | unicode
+        :param params: the request parameters
+        :type params: dict
+        :param response: the response to store
+        :type response: dict | list
+        """
+        key = build_key(endpoint, params)
+        expires_at = time.time() + self._ttls[endpoint]
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (expires_at, response)
+            while len(self._entries) > self._maxsize:
+                (evicted_endpoint, _), _ = self._entries.popitem(last=False)
+                self._count(evicted_endpoint, 'evictions')
+
+    def invalidate(self, endpoint=None):
+        """Remove the cached responses so that they are fetched again.
+
+        :param endpoint: the API endpoint/path (``None`` == all)
+        :type endpoint: str | unicode
+        """
+        with self._lock:
+            if endpoint is None:
+                self._entries.clear()
+                return
+            for key in [k for k in self._entries if k[0] == endpoint]:
+                del self._entries[key]
+
+    def stats(self):
+        """Return the hit, miss and eviction counts by API endpoint.
+
+        :returns: the cache statistics
+        :rtype: dict
+        """
+        with self._lock:
+            stats = {}
+            for endpoint, counts in self._stats.items():
+                lookups = counts['hits'] + counts['misses']
+                stats[endpoint] = dict(
+                    counts,
+                    hit_ratio=counts['hits'] / float(lookups or 1)
+                )
+            return stats
@@ -0,0 +1,207 @@
+from __future__ import absolute_import, unicode_literals
+
+from quadriga.archive import RecentIds
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+# Candle intervals in seconds
+INTERVAL_1M = 60
+INTERVAL_5M = 300
+INTERVAL_1H = 3600
+
+
+def _is_units(value):
+    """Return whether a price or amount is in integer units, e.g. from a
+    client in fixed-point mode rather than as sent by QuadrigaCX."""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+class _Candle(object):
+    """OHLCV bar of one interval.
+
+    The open and close are the trades with the lowest and highest
+    ``(timestamp, tid)`` keys, so that late trades land where they belong.
+    """
+
+    __slots__ = (
+        'open', 'high', 'low', 'close', 'volume', 'trades',
+        '_open_key', '_close_key'
+    )
+
+    def __init__(self, key, price, amount):
+        self.open = self.high = self.low = self.close = price
+        self.volume = amount
+        self.trades = 1
+        self._open_key = self._close_key = key
+
+    def add(self, key, price, amount):
+        if price > self.high:
+            self.high = price
+        elif price < self.low:
+            self.low = price
+        if key < self._open_key:
+            self.open, self._open_key = price, key
+        elif key > self._close_key:
+            self.close, self._close_key = price, key
+        self.volume += amount
+        self.trades += 1
+
+
+class CandleAggregator(object):
+    """Incremental aggregator of public trades into OHLCV candles.
+
+    Candles are maintained for all intervals and order books at once, in
+    constant time per trade and interval, including the check for duplicates
+    (see :class:`quadriga.archive.RecentIds`). Trades may arrive late (they
+    update the candle of their own interval) or more than once (duplicates
+    are dropped by trade ID, as long as the ID is among the most recent
+    **index_size** ones).
+
+    :param intervals: the candle intervals in seconds
+    :type intervals: [int]
+    :param index_size: the number of recent trade IDs kept per order book
+    :type index_size: int
+    """
+
+    def __init__(self,
+                 intervals=(INTERVAL_1M, INTERVAL_5M, INTERVAL_1H),
+                 index_size=16384):
+        self.intervals = tuple(intervals)
+        self._index_size = index_size
+        self._recent_ids = {}
+        self._candles = {}
+
+    def add(self, book, tid, timestamp, price, amount):
+        """Add a trade to the candles of the order book.
+
+        :param book: the name of the order book
+        :type book: str | unicode
+        :param tid: the trade ID
+        :type tid: int
+        :param timestamp: the Unix timestamp of the trade
+        :type timestamp: int
+        :param price: the price of the trade
+        :type price: float
+        :param amount: the amount traded
+        :type amount: float
+        :returns: whether the trade was added (False == duplicate)
+        :rtype: bool
+        """
+        recent_ids = self._recent_ids.get(book)
+        if recent_ids is None:
+            recent_ids = self._recent_ids[book] = RecentIds(self._index_size)
+            for interval in self.intervals:
+                self._candles[book, interval] = {}
+        if tid in recent_ids:
+            return False
+        recent_ids.add(tid)
+
+        key = (timestamp, tid)
+        for interval in self.intervals:
+            candles = self._candles[book, interval]
+            start = timestamp - timestamp % interval
+            candle = candles.get(start)
+            if candle is None:
+                candles[start] = _Candle(key, price, amount)
+            else:
+                candle.add(key, price, amount)
+        return True
+
+    def add_trades(self, book, trades, fixed_point=None):
+        """Add the trades returned by :func:`get_public_trades`.
+
+        Trades from a client in fixed-point mode need the
+        :class:`quadriga.FixedPoint` of their order book, so that their
+        integer units are converted back into prices and amounts.
+
+        :param book: the name of the order book
+        :type book: str | unicode
+        :param trades: the public trades
+        :type trades: [dict]
+        :param fixed_point: the fixed-point representation of the prices and
+            amounts (``None`` == decimals)
+        :type fixed_point: quadriga.FixedPoint
+        :returns: the number of trades added
+        :rtype: int
+        :raises ValueError: on integer units without **fixed_point**
+        """
+        added = 0
+        for trade in trades:
+            price, amount = trade['price'], trade['amount']
+            if fixed_point is not None:
+                price = fixed_point.format_price(price)
+                amount = fixed_point.format_amount(amount)
+            elif _is_units(price) or _is_units(amount):
+                raise ValueError(
+                    'trade {} is in fixed-point units'.format(trade['tid'])
+                )
+            added += self.add(
+                book,
+                int(trade['tid']),
+                int(trade['date']),
+                float(price),
+                float(amount)
+            )
+        return added
+
+    def add_records(self, book, records):
+        """Add the trade records of an archive.
+
+        :param book: the name of the order book
+        :type book: str | unicode
+        :param records: the records, e.g. from :func:`TradeArchive.scan`
+        :type records: collections.Iterable
+        :returns: the number of trades added
+        :rtype: int
+        """
+        added = 0
+        for tid, timestamp, price, amount, _ in records:
+            added += self.add(book, tid, timestamp, price, amount)
+        return added
+
+    def candles(self, book, interval):
+        """Return the candles of the order book, earliest first.
+
+        :param book: the name of the order book
+        :type book: str | unicode
+        :param interval: the candle interval in seconds
+        :type interval: int
+        :returns: the start timestamp, open, high, low, close and volume of
+            each candle
+        :rtype: [(int, float, float, float, float, float)]
+        :raises KeyError: on interval not aggregated
+        """
+        if interval not in self.intervals:
+            raise KeyError('interval {} not aggregated'.format(interval))
+        candles = self._candles.get((book, interval), {})
+        return [
+            (start, c.open, c.high, c.low, c.close, c.volume)
+            for start, c in sorted(candles.items())
+        ]
+
+    def to_arrays(self, book, interval):
+        """Return the candles of the order book as NumPy arrays.
+
+        :param book: the name of the order book
+        :type book: str | unicode
+        :param interval: the candle interval in seconds
+        :type interval: int
+        :returns: the int64 ``"timestamp"`` and the float64 ``"open"``,
+            ``"high"``, ``"low"``, ``"close"`` and ``"volume"`` arrays,
+            earliest first
+        :rtype: dict
+        :raises KeyError: on interval not aggregated
+        """
+        if numpy is None:  # pragma: no cover
+            raise ImportError('numpy is required for array exports')
+        candles = self.candles(book, interval)
+        columns = list(zip(*candles)) or [()] * 6
+        arrays = {'timestamp': numpy.array(columns[0], dtype=numpy.int64)}
+        for name, column in zip(
+            ('open', 'high', 'low', 'close', 'volume'), columns[1:]
+        ):
+            arrays[name] = numpy.array(column, dtype=numpy.float64)
+        return arrays
@@ -0,0 +1,57 @@
+from __future__ import absolute_import, unicode_literals
+
+import threading
+
+
+class _Flight(object):
+    """Request in flight, shared by all callers waiting for its outcome."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class RequestCoalescer(object):
+    """Coalesce identical requests in flight into a single one.
+
+    While a request for a key is in flight, other callers asking for the same
+    key wait for its outcome instead of sending their own request. They get
+    the same response object, or the same exception is raised for them.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def call(self, key, func):
+        """Call the function, or wait for the call in flight for the key.
+
+        :param key: the key identifying the request
+        :type key: collections.Hashable
+        :param func: the function sending the request
+        :type func: callable
+        :returns: the return value of the function
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = func()
+        except Exception as err:
+            flight.error = err
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result
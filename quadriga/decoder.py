@@ -0,0 +1,159 @@
+from __future__ import absolute_import, unicode_literals
+
+import json
+import re
+from decimal import Decimal
+
+from quadriga.fixed import currency_places
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import ujson
+except ImportError:  # pragma: no cover
+    ujson = None
+
+# Fields holding prices and amounts, besides the ones named after their
+# currency (e.g. "btc" in user trades and "btc_balance" in balances)
+number_fields = frozenset((
+    'price', 'amount', 'rate', 'fee', 'volume',
+    'high', 'last', 'vwap', 'low', 'ask', 'bid',
+))
+
+# Fields holding price levels, i.e. arrays starting with a price and an amount
+level_fields = frozenset(('bids', 'asks'))
+
+# Prices and amounts sent as strings, e.g. "1234.50" or "1234"
+_number = re.compile(r'-?[0-9]+(?:\.[0-9]+)?$')
+
+
+class _Float(type('')):
+    """Decimal number of a JSON document, kept as text until decoding of
+    the object holding it, so that it is only parsed once."""
+
+
+def scaled_int(places):
+    """Return a parser of decimal numbers into integers scaled by a power of
+    ten, e.g. ``"1.5"`` into 150000000 for 8 decimal places.
+
+    Digits beyond the decimal places are rounded half to even. The number of
+    decimal places is kept as the ``places`` attribute of the parser.
+
+    :param places: the number of decimal places kept
+    :type places: int
+    :returns: the number parser
+    :rtype: callable
+    """
+    def parse(value):
+        return int(Decimal(value).scaleb(places).to_integral_value())
+    parse.places = places
+    return parse
+
+
+class JsonDecoder(object):
+    """Decoder of the JSON response bodies from QuadrigaCX.
+
+    Without **parse_number**, bodies are decoded by the fastest library
+    installed (orjson, then ujson, then the standard library), or the one
+    given in **backend**.
+
+    With **parse_number**, prices and amounts are parsed with it while the
+    body is being decoded, whether QuadrigaCX sends them as strings (e.g.
+    ``"1234.50"`` or ``"1234"``) or as numbers, so no second pass over the
+    data is needed. They are found by field name (see :data:`number_fields`,
+    the fields named after a currency and the price levels of
+    :data:`level_fields`), so other fields such as timestamps and IDs are
+    left as is. Other decimal numbers are parsed too. This uses the standard
+    library, whose parser accepts a hook for each decoded object.
+
+    :param parse_number: the parser of decimal numbers, e.g.
+        :class:`decimal.Decimal` or :func:`quadriga.decoder.scaled_int`
+        (``None`` == strings are left as is)
+    :type parse_number: callable
+    :param backend: the JSON library (``"orjson"``, ``"ujson"`` or
+        ``"json"``) used without **parse_number** (``None`` == the fastest
+        one installed)
+    :type backend: str | unicode
+    :raises ValueError: on unknown or missing backend
+    """
+
+    backends = {
+        'orjson': None if orjson is None else orjson.loads,
+        'ujson': None if ujson is None else ujson.loads,
+        'json': json.loads,
+    }
+
+    def __init__(self, parse_number=None, backend=None):
+        self.parse_number = parse_number
+        if backend is None:
+            backend = next(
+                name for name in ('orjson', 'ujson', 'json')
+                if self.backends[name] is not None
+            )
+        if self.backends.get(backend) is None:
+            raise ValueError('JSON backend "{}" not available'.format(backend))
+        self.backend = backend
+        self._loads = self.backends[backend]
+
+    def decode(self, body):
+        """Decode a response body.
+
+        :param body: the response body
+        :type body: bytes | str | unicode
+        :returns: the decoded JSON document
+        :rtype: dict | list
+        :raises ValueError: if the body is not valid JSON
+        """
+        if self.parse_number is None:
+            return self._loads(body)
+        if isinstance(body, bytes):
+            body = body.decode('utf-8')
+        return self._parse_floats(json.loads(
+            body, parse_float=_Float, object_hook=self.parse_fields
+        ))
+
+    def parse_fields(self, document):
+        """Parse the prices and amounts of a decoded JSON object in place.
+
+        :param document: the JSON object
+        :type document: dict
+        :returns: the JSON object
+        :rtype: dict
+        """
+        for key, value in document.items():
+            if key in level_fields and isinstance(value, list):
+                document[key] = [self._parse_level(level) for level in value]
+            elif key in number_fields or (
+                    key.partition('_')[0] in currency_places):
+                document[key] = self._parse(value)
+            elif isinstance(value, (_Float, list)):
+                document[key] = self._parse_floats(value)
+        return document
+
+    def _parse(self, value):
+        """Parse a price or amount, leaving other values as is."""
+        if isinstance(value, _Float) or (
+                isinstance(value, type('')) and _number.match(value)):
+            return self.parse_number(value)
+        if isinstance(value, int) and not isinstance(value, bool):
+            return self.parse_number(str(value))
+        return self._parse_floats(value)
+
+    def _parse_level(self, level):
+        """Parse the price and amount of a price level."""
+        if not isinstance(level, list):
+            return level
+        return [self._parse(value) for value in level[:2]] + [
+            self._parse_floats(value) for value in level[2:]
+        ]
+
+    def _parse_floats(self, value):
+        """Parse the decimal numbers left in a value of any other field."""
+        if isinstance(value, _Float):
+            return self.parse_number(value)
+        if isinstance(value, list):
+            return [self._parse_floats(item) for item in value]
+        return value
@@ -8,6 +8,9 @@ class QuadrigaError(Exception):
 class RequestError(QuadrigaError):
     """Raised when there is an issue with sending requests to QuadrigaCX."""
 
+    # Phases of the request (a quadriga.tracing.RequestTrace), if traced
+    trace = None
+
     def __init__(self, response, message, error_code=None):
         self.url = response.url
         self.body = response.text
@@ -24,3 +27,7 @@ class InvalidCurrencyError(QuadrigaError):
 
 class InvalidOrderBookError(QuadrigaError):
     """Raised when an invalid order book name is specified."""
+
+
+class InvalidOrderError(QuadrigaError):
+    """Raised when an order breaks the rules of its order book."""
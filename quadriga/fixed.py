@@ -0,0 +1,215 @@
+from __future__ import absolute_import, unicode_literals
+
+from decimal import Decimal
+
+# Decimal places of each currency, i.e. the size of its integer unit (cents
+# for fiat currencies, 10^-8 for cryptocurrencies)
+currency_places = {
+    'cad': 2,
+    'usd': 2,
+    'btc': 8,
+    'eth': 8,
+    'ltc': 8,
+}
+
+# Fields of the trading summary holding prices
+_ticker_prices = ('high', 'last', 'vwap', 'low', 'ask', 'bid')
+
+
+def to_units(value, places):
+    """Convert a number into integer units of 10^-places.
+
+    Digits beyond the decimal places are rounded half to even.
+
+    :param value: the number, e.g. ``"1234.50"``
+    :type value: str | unicode | int | float | decimal.Decimal
+    :param places: the number of decimal places
+    :type places: int
+    :returns: the number of units
+    :rtype: int
+    """
+    if isinstance(value, int):
+        return value * 10 ** places
+    if not isinstance(value, (Decimal, float)):
+        whole, _, fraction = value.partition('.')
+        if len(fraction) <= places and '-' not in fraction:
+            try:
+                return int(whole + fraction.ljust(places, '0'))
+            except ValueError:
+                pass
+    else:
+        value = str(value)
+    return int(Decimal(value).scaleb(places).to_integral_value())
+
+
+def from_units(units, places):
+    """Format integer units of 10^-places as an exact decimal string.
+
+    :param units: the number of units
+    :type units: int
+    :param places: the number of decimal places
+    :type places: int
+    :returns: the decimal string, e.g. ``"1234.50"``
+    :rtype: str | unicode
+    """
+    sign = '-' if units < 0 else ''
+    whole, fraction = divmod(abs(units), 10 ** places)
+    if not places:
+        return '{}{}'.format(sign, whole)
+    return '{}{}.{:0{}d}'.format(sign, whole, fraction, places)
+
+
+def _convert(value, places):
+    """Convert a response value into units, leaving missing values as is."""
+    return value if value is None else to_units(value, places)
+
+
+def balance(response):
+    """Convert the amounts of a :func:`get_balance` response into units.
+
+    :param response: the user's account balance
+    :type response: dict
+    :returns: a copy of the response with integer amounts
+    :rtype: dict
+    """
+    result = dict(response)
+    for key, value in response.items():
+        currency, _, kind = key.partition('_')
+        if currency in currency_places and kind:
+            result[key] = _convert(value, currency_places[currency])
+    return result
+
+
+class FixedPoint(object):
+    """Fixed-point representation of the prices and amounts of an order book.
+
+    Amounts are integer units of the major currency and prices are integer
+    units of the minor currency, e.g. satoshis and cents for ``btc_cad``.
+
+    :param book: the name of the order book
+    :type book: str | unicode
+    """
+
+    def __init__(self, book):
+        self.book = book
+        self.major, self.minor = book.split('_')
+        self.amount_places = currency_places[self.major]
+        self.price_places = currency_places[self.minor]
+
+    def __repr__(self):
+        return '<FixedPoint {} amount_places={} price_places={}>'.format(
+            self.book, self.amount_places, self.price_places
+        )
+
+    def amount(self, value):
+        """Convert an amount into units of the major currency.
+
+        :param value: the amount
+        :type value: str | unicode | int | float | decimal.Decimal
+        :returns: the number of units
+        :rtype: int
+        """
+        return to_units(value, self.amount_places)
+
+    def price(self, value):
+        """Convert a price into units of the minor currency.
+
+        :param value: the price
+        :type value: str | unicode | int | float | decimal.Decimal
+        :returns: the number of units
+        :rtype: int
+        """
+        return to_units(value, self.price_places)
+
+    def format_amount(self, units):
+        """Format units of the major currency as an exact amount.
+
+        :param units: the number of units
+        :type units: int
+        :returns: the amount, e.g. ``"0.50000000"``
+        :rtype: str | unicode
+        """
+        return from_units(units, self.amount_places)
+
+    def format_price(self, units):
+        """Format units of the minor currency as an exact price.
+
+        :param units: the number of units
+        :type units: int
+        :returns: the price, e.g. ``"1234.50"``
+        :rtype: str | unicode
+        """
+        return from_units(units, self.price_places)
+
+    def ticker(self, response):
+        """Convert a :func:`get_summary` response into units.
+
+        :param response: the trading summary
+        :type response: dict
+        :returns: a copy of the response with integer prices and volume
+        :rtype: dict
+        """
+        result = dict(response)
+        for key in _ticker_prices:
+            if key in result:
+                result[key] = _convert(result[key], self.price_places)
+        if 'volume' in result:
+            result['volume'] = _convert(result['volume'], self.amount_places)
+        return result
+
+    def levels(self, response):
+        """Convert a :func:`get_public_orders` response into units.
+
+        :param response: the public open orders
+        :type response: dict
+        :returns: a copy of the response with integer prices and amounts
+        :rtype: dict
+        """
+        price_places, amount_places = self.price_places, self.amount_places
+        result = dict(response)
+        for side in ('bids', 'asks'):
+            if side in result:
+                result[side] = [
+                    [to_units(level[0], price_places),
+                     to_units(level[1], amount_places)] + list(level[2:])
+                    for level in result[side]
+                ]
+        return result
+
+    def trades(self, response):
+        """Convert the trades or orders of a :func:`get_public_trades` or
+        :func:`get_orders` response into units.
+
+        :param response: the trades or orders
+        :type response: [dict]
+        :returns: a copy of the response with integer prices and amounts
+        :rtype: [dict]
+        """
+        result = []
+        for trade in response:
+            trade = dict(trade)
+            for key, places in (('price', self.price_places),
+                                ('amount', self.amount_places)):
+                if key in trade:
+                    trade[key] = _convert(trade[key], places)
+            result.append(trade)
+        return result
+
+    def user_trades(self, response):
+        """Convert a :func:`get_trades` response into units.
+
+        :param response: the user's completed trades
+        :type response: [dict]
+        :returns: a copy of the response with integer amounts and rates
+        :rtype: [dict]
+        """
+        result = []
+        for trade in response:
+            trade = dict(trade)
+            for key, places in ((self.major, self.amount_places),
+                                (self.minor, self.price_places),
+                                ('rate', self.price_places)):
+                if key in trade:
+                    trade[key] = _convert(trade[key], places)
+            result.append(trade)
+        return result
@@ -0,0 +1,250 @@
+from __future__ import absolute_import, unicode_literals
+
+import threading
+import time
+
+from quadriga.exceptions import RequestError
+
+# Monotonic clock with the best resolution available
+clock = getattr(time, 'perf_counter', time.time)
+
+# Number of sub-buckets per power of two of the latency histograms, i.e. a
+# relative error of at most 1/16
+_sub_buckets = 16
+_sub_bits = 4
+
+
+class RequestEvent(object):
+    """Outcome of an HTTP request to QuadrigaCX, passed to request hooks.
+
+    Before the request is sent, only **endpoint**, **method**, **start** and
+    **trace** are set. The rest is filled in once it has completed.
+
+    :param endpoint: the API endpoint/path
+    :type endpoint: str | unicode
+    :param method: the HTTP method
+    :type method: str | unicode
+    :param trace: the phases of the request, if traced
+    :type trace: quadriga.tracing.RequestTrace
+    """
+
+    __slots__ = ('endpoint', 'method', 'start', 'elapsed', 'status',
+                 'error_code', 'error', 'bytes', 'trace')
+
+    def __init__(self, endpoint, method, trace=None):
+        self.endpoint = endpoint
+        self.method = method
+        self.trace = trace
+        self.start = clock()
+        self.elapsed = None
+        self.status = None
+        self.error_code = None
+        self.error = None
+        self.bytes = None
+
+    def __repr__(self):
+        return '<RequestEvent {} {} status={} elapsed={}>'.format(
+            self.method, self.endpoint, self.status, self.elapsed
+        )
+
+    def finish(self, error=None):
+        """Record the end of the request.
+
+        :param error: the error raised by the request, if any
+        :type error: Exception
+        """
+        self.elapsed = clock() - self.start
+        if error is not None:
+            self.error = error
+            if isinstance(error, RequestError):
+                self.status = error.http_code
+                self.error_code = error.error_code
+
+
+def _bucket(micros):
+    """Return the histogram bucket of a latency.
+
+    :param micros: the latency in microseconds
+    :type micros: int
+    :returns: the bucket index
+    :rtype: int
+    """
+    if micros < 2 * _sub_buckets:
+        return micros
+    shift = micros.bit_length() - _sub_bits - 1
+    return (shift << _sub_bits) + (micros >> shift)
+
+
+def _bucket_value(index):
+    """Return the midpoint of a histogram bucket.
+
+    :param index: the bucket index
+    :type index: int
+    :returns: the latency in microseconds
+    :rtype: float
+    """
+    if index < 2 * _sub_buckets:
+        return float(index)
+    shift = (index >> _sub_bits) - 1
+    low = (index - (shift << _sub_bits)) << shift
+    return low + ((1 << shift) - 1) / 2.0
+
+
+class LatencyHistogram(object):
+    """Histogram of latencies with logarithmic buckets, which records a
+    latency in constant time and memory.
+
+    Percentiles are accurate to within about 3%, and the maximum is exact.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._buckets = {}
+
+    def record(self, seconds):
+        """Record a latency.
+
+        :param seconds: the latency in seconds
+        :type seconds: float
+        """
+        index = _bucket(int(seconds * 1e6))
+        self._buckets[index] = self._buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, percent):
+        """Return a percentile of the latencies.
+
+        :param percent: the percentile, e.g. 99
+        :type percent: int | float
+        :returns: the latency in seconds (``None`` == nothing recorded)
+        :rtype: float
+        """
+        if not self.count:
+            return None
+        rank = max(1, percent / 100.0 * self.count)
+        seen = 0
+        for index in sorted(self._buckets):
+            seen += self._buckets[index]
+            if seen >= rank:
+                return min(_bucket_value(index) / 1e6, self.max)
+        return self.max  # pragma: no cover
+
+    def snapshot(self):
+        """Return the summary of the latencies.
+
+        :returns: the ``"p50"``, ``"p99"``, ``"max"`` and ``"mean"``
+            latencies in seconds
+        :rtype: dict
+        """
+        return {
+            'p50': self.percentile(50),
+            'p99': self.percentile(99),
+            'max': self.max if self.count else None,
+            'mean': self.total / self.count if self.count else None,
+        }
+
+
+class _EndpointMetrics(object):
+    """Metrics of the requests to an API endpoint."""
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.in_flight = 0
+        self.errors = 0
+        self.error_codes = {}
+        self.bytes = 0
+
+
+class MetricsCollector(object):
+    """Request hook collecting metrics per API endpoint: request and error
+    counts, errors by code, requests in flight, bytes received and latency
+    histograms.
+
+    Pass it to the client in **hooks**. It is thread-safe, and can be
+    shared by multiple clients.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def _metrics(self, endpoint):
+        """Return the metrics of the endpoint, creating them if necessary.
+
+        :param endpoint: the API endpoint/path
+        :type endpoint: str | unicode
+        :returns: the metrics of the endpoint
+        :rtype: quadriga.metrics._EndpointMetrics
+        """
+        metrics = self._endpoints.get(endpoint)
+        if metrics is None:
+            metrics = self._endpoints[endpoint] = _EndpointMetrics()
+        return metrics
+
+    def before_request(self, event):
+        """Count the request as in flight.
+
+        :param event: the request about to be sent
+        :type event: quadriga.metrics.RequestEvent
+        """
+        with self._lock:
+            self._metrics(event.endpoint).in_flight += 1
+
+    def after_request(self, event):
+        """Record the outcome of the request.
+
+        Errors are counted by QuadrigaCX error code, or else by HTTP status
+        code (e.g. ``"HTTP 500"``) or exception class name.
+
+        :param event: the request which has completed
+        :type event: quadriga.metrics.RequestEvent
+        """
+        with self._lock:
+            metrics = self._metrics(event.endpoint)
+            metrics.in_flight -= 1
+            metrics.latency.record(event.elapsed)
+            if event.bytes:
+                metrics.bytes += event.bytes
+            if event.error is not None:
+                if event.error_code is not None:
+                    key = event.error_code
+                elif event.status is not None:
+                    key = 'HTTP {}'.format(event.status)
+                else:
+                    key = type(event.error).__name__
+                metrics.errors += 1
+                metrics.error_codes[key] = metrics.error_codes.get(key, 0) + 1
+
+    def snapshot(self, reset=False):
+        """Return the metrics collected so far.
+
+        :param reset: start collecting anew, keeping requests in flight
+        :type reset: bool
+        :returns: the metrics by API endpoint, as plain dictionaries which
+            can be exported as JSON, e.g. ``{"/ticker": {"count": 10,
+            "errors": 1, "error_codes": {"HTTP 500": 1}, "in_flight": 0,
+            "bytes": 1250, "latency": {"p50": 0.05, ...}}}``
+        :rtype: dict
+        """
+        with self._lock:
+            snapshot = {
+                endpoint: {
+                    'count': metrics.latency.count,
+                    'errors': metrics.errors,
+                    'error_codes': dict(metrics.error_codes),
+                    'in_flight': metrics.in_flight,
+                    'bytes': metrics.bytes,
+                    'latency': metrics.latency.snapshot(),
+                }
+                for endpoint, metrics in self._endpoints.items()
+            }
+            if reset:
+                for endpoint, metrics in list(self._endpoints.items()):
+                    fresh = self._endpoints[endpoint] = _EndpointMetrics()
+                    fresh.in_flight = metrics.in_flight
+        return snapshot
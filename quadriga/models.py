@@ -0,0 +1,272 @@
+from __future__ import absolute_import, unicode_literals
+
+from decimal import Decimal
+
+
+def _slots(fields):
+    """Return the slot names of the fields.
+
+    :param fields: the field names
+    :type fields: (str | unicode)
+    :returns: the slot names
+    :rtype: (str)
+    """
+    return tuple(str('_' + field) for field in fields)
+
+
+class _Field(object):
+    """Descriptor of a model field holding a JSON value as is."""
+
+    __slots__ = ('_slot',)
+
+    def __init__(self, name):
+        self._slot = str('_' + name)
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        return getattr(instance, self._slot)
+
+
+class _Number(_Field):
+    """Descriptor of a model field converted from a JSON value on first
+    access, then cached in its slot."""
+
+    __slots__ = ()
+
+    type = None
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        value = getattr(instance, self._slot)
+        if value is None or type(value) is self.type:
+            return value
+        value = self.convert(value)
+        setattr(instance, self._slot, value)
+        return value
+
+    def convert(self, value):
+        return self.type(value)
+
+
+class _Decimal(_Number):
+    __slots__ = ()
+
+    type = Decimal
+
+    def convert(self, value):
+        # Integer units of the fixed-point mode are kept as is
+        if isinstance(value, int):
+            return value
+        # Floats are converted through their shortest representation
+        return Decimal(value if isinstance(value, type('')) else str(value))
+
+
+class _Int(_Number):
+    __slots__ = ()
+
+    type = int
+
+
+class Model(object):
+    """Base class of the compact models of API responses.
+
+    Fields are stored in slots rather than a dictionary, and numeric fields
+    are converted to :class:`decimal.Decimal` or int on first access. Models
+    can be indexed by their JSON keys like the dictionaries they replace.
+    """
+
+    __slots__ = ()
+
+    # The JSON keys of the fields
+    fields = ()
+
+    def __getitem__(self, key):
+        if key not in self.fields:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key):
+        return key in self.fields
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.as_dict() == other.as_dict()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return '<{} {}>'.format(type(self).__name__, ' '.join(
+            '{}={}'.format(field, getattr(self, field))
+            for field in self.fields
+            if getattr(self, field) is not None
+        ))
+
+    __hash__ = None
+
+    def get(self, key, default=None):
+        """Return the field with the JSON key, or the default if missing.
+
+        :param key: the JSON key of the field
+        :type key: str | unicode
+        :param default: the value returned if the field is missing
+        :returns: the value of the field
+        """
+        value = self[key] if key in self.fields else None
+        return default if value is None else value
+
+    @classmethod
+    def from_json(cls, data):
+        """Build the model from a parsed JSON object.
+
+        :param data: the JSON object from QuadrigaCX
+        :type data: dict
+        :returns: the model
+        :rtype: quadriga.models.Model
+        """
+        model = cls.__new__(cls)
+        for field, slot in zip(cls.fields, cls.__slots__):
+            setattr(model, slot, data.get(field))
+        return model
+
+    def as_dict(self):
+        """Return the fields as a JSON-serializable dictionary.
+
+        Decimal values are returned as strings, like QuadrigaCX sends them.
+
+        :returns: the fields by JSON key (missing fields are omitted)
+        :rtype: dict
+        """
+        result = {}
+        for field in self.fields:
+            value = getattr(self, field)
+            if value is not None:
+                result[field] = (
+                    str(value) if isinstance(value, Decimal) else value
+                )
+        return result
+
+
+class Ticker(Model):
+    """Trading summary returned by :func:`get_summary`."""
+
+    fields = ('high', 'last', 'timestamp', 'volume', 'vwap', 'low', 'ask',
+              'bid')
+    __slots__ = _slots(fields)
+
+    high = _Decimal('high')
+    last = _Decimal('last')
+    timestamp = _Int('timestamp')
+    volume = _Decimal('volume')
+    vwap = _Decimal('vwap')
+    low = _Decimal('low')
+    ask = _Decimal('ask')
+    bid = _Decimal('bid')
+
+
+class PublicTrade(Model):
+    """Public trade returned by :func:`get_public_trades`."""
+
+    fields = ('date', 'tid', 'price', 'amount', 'side')
+    __slots__ = _slots(fields)
+
+    date = _Int('date')
+    tid = _Int('tid')
+    price = _Decimal('price')
+    amount = _Decimal('amount')
+    side = _Field('side')
+
+
+class UserTrade(Model):
+    """User's completed trade returned by :func:`get_trades`.
+
+    The amounts keyed by currency (e.g. ``"btc"`` and ``"cad"``) are stored
+    as **major** and **minor**, and can still be indexed by currency.
+    """
+
+    fields = ('id', 'datetime', 'type', 'method', 'order_id', 'rate', 'fee',
+              'major', 'minor')
+    __slots__ = _slots(fields) + ('_currencies',)
+
+    id = _Int('id')
+    datetime = _Field('datetime')
+    type = _Int('type')
+    method = _Field('method')
+    order_id = _Field('order_id')
+    rate = _Decimal('rate')
+    fee = _Decimal('fee')
+    major = _Decimal('major')
+    minor = _Decimal('minor')
+
+    def __getitem__(self, key):
+        if key in self._currencies:
+            key = ('major', 'minor')[self._currencies.index(key)]
+        return super(UserTrade, self).__getitem__(key)
+
+    def __contains__(self, key):
+        return key in self._currencies or key in self.fields
+
+    def get(self, key, default=None):
+        if key in self._currencies:
+            key = ('major', 'minor')[self._currencies.index(key)]
+        return super(UserTrade, self).get(key, default)
+
+    @classmethod
+    def from_json(cls, data, book):
+        """Build the model from a parsed JSON object.
+
+        :param data: the JSON object from QuadrigaCX
+        :type data: dict
+        :param book: the name of the order book of the trade
+        :type book: str | unicode
+        :returns: the model
+        :rtype: quadriga.models.UserTrade
+        """
+        model = super(UserTrade, cls).from_json(data)
+        model._currencies = tuple(book.split('_'))
+        model._major = data.get(model._currencies[0])
+        model._minor = data.get(model._currencies[1])
+        return model
+
+    def as_dict(self):
+        result = super(UserTrade, self).as_dict()
+        for field, currency in zip(('major', 'minor'), self._currencies):
+            if field in result:
+                result[currency] = result.pop(field)
+        return result
+
+
+class OpenOrder(Model):
+    """User's open order returned by :func:`get_orders`."""
+
+    fields = ('id', 'datetime', 'type', 'price', 'amount', 'status')
+    __slots__ = _slots(fields)
+
+    id = _Field('id')
+    datetime = _Field('datetime')
+    type = _Int('type')
+    price = _Decimal('price')
+    amount = _Decimal('amount')
+    status = _Int('status')
+
+
+class Balance(Model):
+    """User's account balance returned by :func:`get_balance`.
+
+    Each currency has a ``<currency>_balance``, ``<currency>_reserved`` and
+    ``<currency>_available`` field, e.g. ``btc_available``.
+    """
+
+    currencies = ('cad', 'usd', 'btc', 'eth', 'ltc')
+    fields = tuple(
+        '{}_{}'.format(currency, kind)
+        for currency in currencies
+        for kind in ('balance', 'reserved', 'available')
+    ) + ('fee',)
+    __slots__ = _slots(fields)
+
+
+for _field in Balance.fields:
+    setattr(Balance, _field, _Decimal(_field))
+del _field
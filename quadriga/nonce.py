@@ -0,0 +1,111 @@
+from __future__ import absolute_import, unicode_literals
+
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+    import msvcrt
+
+
+class NonceGenerator(object):
+    """Thread-safe generator of strictly increasing nonces.
+
+    Nonces are based on the current time in milliseconds. When two nonces
+    are requested within the same millisecond, the second one is bumped to
+    the previous nonce plus one.
+
+    Clients using the same API key should share a single generator.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_nonce = 0
+
+    def _next_nonce(self, last_nonce):
+        """Return the nonce following the last one.
+
+        :param last_nonce: the last nonce generated
+        :type last_nonce: int
+        :returns: the next nonce
+        :rtype: int
+        """
+        return max(int(time.time() * 1000), last_nonce + 1)
+
+    def generate(self):
+        """Return a new nonce greater than all the previous ones.
+
+        :returns: the new nonce
+        :rtype: int
+        """
+        with self._lock:
+            self._last_nonce = self._next_nonce(self._last_nonce)
+            return self._last_nonce
+
+
+class FileNonceGenerator(NonceGenerator):
+    """Nonce generator which can be shared across processes.
+
+    The last nonce is stored in a file which is locked while a new nonce is
+    generated, so multiple processes using the same API key never generate
+    the same nonce as long as they point to the same file.
+
+    :param path: the path to the nonce file (created if missing)
+    :type path: str | unicode
+    """
+
+    def __init__(self, path):
+        super(FileNonceGenerator, self).__init__()
+        self._path = path
+
+    @staticmethod
+    def _lock_file(fd):
+        """Acquire an exclusive lock on the file, blocking until available.
+
+        :param fd: the file descriptor
+        :type fd: int
+        """
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        else:  # pragma: no cover
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+
+    @staticmethod
+    def _unlock_file(fd):
+        """Release the lock on the file.
+
+        :param fd: the file descriptor
+        :type fd: int
+        """
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        else:  # pragma: no cover
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+    def generate(self):
+        """Return a new nonce greater than all the previous ones.
+
+        :returns: the new nonce
+        :rtype: int
+        """
+        with self._lock:
+            fd = os.open(self._path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                self._lock_file(fd)
+                try:
+                    os.lseek(fd, 0, os.SEEK_SET)
+                    content = os.read(fd, 32).strip()
+                    nonce = self._next_nonce(int(content or 0))
+                    os.lseek(fd, 0, os.SEEK_SET)
+                    os.write(fd, '{:<32d}'.format(nonce).encode('ascii'))
+                finally:
+                    self._unlock_file(fd)
+            finally:
+                os.close(fd)
+            self._last_nonce = nonce
+            return nonce
@@ -0,0 +1,249 @@
+from __future__ import absolute_import, unicode_literals
+
+from array import array
+from bisect import bisect_left
+
+
+class _BookSide(object):
+    """Price levels on one side of an order book, stored in sorted arrays.
+
+    Levels are sorted by key (the price for bids, the negated price for asks)
+    so that the best level is always last.
+
+    :param sign: 1 for bids and -1 for asks
+    :type sign: int
+    """
+
+    __slots__ = ('_sign', '_keys', '_amounts')
+
+    def __init__(self, sign):
+        self._sign = sign
+        self._keys = array('d')
+        self._amounts = array('d')
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _index(self, price):
+        """Return the index of the price level.
+
+        :param price: the price of the level
+        :type price: float
+        :returns: the index of the level (``None`` == not found)
+        :rtype: int
+        """
+        key = self._sign * price
+        index = bisect_left(self._keys, key)
+        if index < len(self._keys) and self._keys[index] == key:
+            return index
+        return None
+
+    def best(self):
+        """Return the best price level.
+
+        :returns: the price and amount (``None`` == side is empty)
+        :rtype: (float, float)
+        """
+        if not self._keys:
+            return None
+        return self._sign * self._keys[-1], self._amounts[-1]
+
+    def amount(self, price):
+        """Return the amount at the price level.
+
+        :param price: the price of the level
+        :type price: float
+        :returns: the amount (0 == no such level)
+        :rtype: float
+        """
+        index = self._index(price)
+        return 0.0 if index is None else self._amounts[index]
+
+    def levels(self, depth=None):
+        """Return the price levels from the best one.
+
+        :param depth: the maximum number of levels (``None`` == all)
+        :type depth: int
+        :returns: the price and amount of each level
+        :rtype: [(float, float)]
+        """
+        count = len(self._keys) if depth is None else depth
+        return [
+            (self._sign * self._keys[i], self._amounts[i])
+            for i in range(len(self._keys) - 1, -1, -1)[:count]
+        ]
+
+    def apply(self, levels):
+        """Apply a new snapshot, changing only the levels which differ.
+
+        :param levels: the amount of each price level in the new snapshot
+        :type levels: dict
+        :returns: the price and new amount of each changed level (0 == the
+            level was removed)
+        :rtype: [(float, float)]
+        """
+        keys, amounts = self._keys, self._amounts
+        levels = dict(levels)
+        changes = []
+        for index in range(len(keys) - 1, -1, -1):
+            price = self._sign * keys[index]
+            amount = levels.pop(price, None)
+            if amount is None:
+                del keys[index]
+                del amounts[index]
+                changes.append((price, 0.0))
+            elif amount != amounts[index]:
+                amounts[index] = amount
+                changes.append((price, amount))
+        for price, amount in levels.items():
+            index = bisect_left(keys, self._sign * price)
+            keys.insert(index, self._sign * price)
+            amounts.insert(index, amount)
+            changes.append((price, amount))
+        return changes
+
+
+class OrderBook(object):
+    """Local order book maintained from :func:`get_public_orders` responses.
+
+    Prices and amounts are stored as floats in compact sorted arrays, giving
+    O(1) access to the best bid and ask and O(log n) lookup of a price level.
+    Each update only changes the levels which differ from the previous
+    snapshot. Both grouped and ungrouped responses are supported: orders with
+    the same price are summed into a single level.
+
+    :param book: the name of the order book
+    :type book: str | unicode
+    """
+
+    def __init__(self, book=None):
+        self.book = book
+        self.timestamp = None
+        self._bids = _BookSide(1)
+        self._asks = _BookSide(-1)
+
+    def __repr__(self):
+        return '<OrderBook {} bids={} asks={}>'.format(
+            self.book, len(self._bids), len(self._asks)
+        )
+
+    @staticmethod
+    def _parse_levels(orders):
+        """Parse the orders of one side into the amount of each price level.
+
+        :param orders: the price/amount pairs from the response
+        :type orders: [[str | unicode]]
+        :returns: the amount of each price level
+        :rtype: dict
+        """
+        levels = {}
+        for order in orders:
+            price = float(order[0])
+            levels[price] = levels.get(price, 0.0) + float(order[1])
+        return levels
+
+    def update(self, snapshot):
+        """Apply a :func:`get_public_orders` response to the order book.
+
+        :param snapshot: the response body of :func:`get_public_orders`
+        :type snapshot: dict
+        :returns: the price and new amount of each changed level by
+            ``"bids"`` and ``"asks"`` (0 == the level was removed)
+        :rtype: dict
+        """
+        timestamp = snapshot.get('timestamp')
+        self.timestamp = None if timestamp is None else int(timestamp)
+        return {
+            'bids': self._bids.apply(self._parse_levels(snapshot['bids'])),
+            'asks': self._asks.apply(self._parse_levels(snapshot['asks'])),
+        }
+
+    def refresh(self, client, group=True, depth=None):
+        """Fetch the public open orders and apply them to the order book.
+
+        :param client: the QuadrigaCX client
+        :type client: quadriga.QuadrigaClient
+        :param group: group orders with the same price
+        :type group: bool
+        :param depth: the maximum number of price levels kept per side
+            (``None`` == all)
+        :type depth: int
+        :returns: the price and new amount of each changed level by
+            ``"bids"`` and ``"asks"`` (0 == the level was removed)
+        :rtype: dict
+        """
+        # Levels are kept in decimal prices and amounts, even for a client in
+        # fixed-point mode
+        snapshot = client._get_public_orders(
+            group, client._verify_book(self.book), depth=depth
+        )
+        return self.update(snapshot)
+
+    @property
+    def best_bid(self):
+        """Return the highest bid.
+
+        :returns: the price and amount (``None`` == no bids)
+        :rtype: (float, float)
+        """
+        return self._bids.best()
+
+    @property
+    def best_ask(self):
+        """Return the lowest ask.
+
+        :returns: the price and amount (``None`` == no asks)
+        :rtype: (float, float)
+        """
+        return self._asks.best()
+
+    @property
+    def spread(self):
+        """Return the difference between the lowest ask and the highest bid.
+
+        :returns: the spread (``None`` == one of the sides is empty)
+        :rtype: float
+        """
+        if not self._bids or not self._asks:
+            return None
+        return self._asks.best()[0] - self._bids.best()[0]
+
+    def bid_amount(self, price):
+        """Return the amount bid at the price.
+
+        :param price: the price of the level
+        :type price: int | float | str | unicode
+        :returns: the amount (0 == no such level)
+        :rtype: float
+        """
+        return self._bids.amount(float(price))
+
+    def ask_amount(self, price):
+        """Return the amount asked at the price.
+
+        :param price: the price of the level
+        :type price: int | float | str | unicode
+        :returns: the amount (0 == no such level)
+        :rtype: float
+        """
+        return self._asks.amount(float(price))
+
+    def bids(self, depth=None):
+        """Return the bid levels from the highest price.
+
+        :param depth: the maximum number of levels (``None`` == all)
+        :type depth: int
+        :returns: the price and amount of each level
+        :rtype: [(float, float)]
+        """
+        return self._bids.levels(depth)
+
+    def asks(self, depth=None):
+        """Return the ask levels from the lowest price.
+
+        :param depth: the maximum number of levels (``None`` == all)
+        :type depth: int
+        :returns: the price and amount of each level
+        :rtype: [(float, float)]
+        """
+        return self._asks.levels(depth)
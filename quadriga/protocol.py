@@ -0,0 +1,391 @@
+from __future__ import absolute_import, unicode_literals
+
+import hashlib
+import hmac
+import json
+
+from quadriga.exceptions import RequestError
+from quadriga.metrics import clock
+from quadriga.nonce import NonceGenerator
+from quadriga.rules import to_decimal
+
+
+class Request(object):
+    """HTTP request to QuadrigaCX, built by :class:`Protocol` and sent by a
+    transport.
+
+    :param method: the HTTP method (``"GET"`` or ``"POST"``)
+    :type method: str | unicode
+    :param endpoint: the API endpoint/path
+    :type endpoint: str | unicode
+    :param url: the full URL
+    :type url: str | unicode
+    :param params: the query parameters
+    :type params: dict
+    :param json: the JSON request payload
+    :type json: dict
+    :param stream: read the response body as a stream of chunks
+    :type stream: bool
+    :param body: the JSON request payload already encoded, sent instead of
+        **json**
+    :type body: bytes
+    :param headers: the request headers
+    :type headers: dict
+    """
+
+    __slots__ = ('method', 'endpoint', 'url', 'params', 'json', 'stream',
+                 'body', 'headers')
+
+    def __init__(self,
+                 method,
+                 endpoint,
+                 url,
+                 params=None,
+                 json=None,
+                 stream=False,
+                 body=None,
+                 headers=None):
+        self.method = method
+        self.endpoint = endpoint
+        self.url = url
+        self.params = params
+        self.json = json
+        self.stream = stream
+        self.body = body
+        self.headers = headers
+
+    def __repr__(self):
+        return '<Request {} {}>'.format(self.method, self.url)
+
+
+class OrderTemplate(object):
+    """Signed limit order request to QuadrigaCX for an order book, prepared
+    ahead of time by :func:`Protocol.order_template`.
+
+    The URL, the headers and the JSON request payload are encoded once, so
+    that only the amount, the price, the nonce and the signature are filled
+    in for each order.
+
+    :param endpoint: the API endpoint/path (``"/buy"`` or ``"/sell"``)
+    :type endpoint: str | unicode
+    :param url: the full URL
+    :type url: str | unicode
+    :param book: the name of the order book
+    :type book: str | unicode
+    :param api_key: the API key from QuadrigaCX
+    :type api_key: str | unicode
+    """
+
+    __slots__ = ('endpoint', 'url', 'book', 'headers', '_head')
+
+    # Headers of the requests with a JSON payload
+    json_headers = {'Content-Type': 'application/json'}
+
+    def __init__(self, endpoint, url, book, api_key):
+        self.endpoint = endpoint
+        self.url = url
+        self.book = book
+        self.headers = self.json_headers
+        self._head = '{{"book": {}, "key": {}, "amount": "'.format(
+            json.dumps(book), json.dumps(api_key)
+        ).encode('utf-8')
+
+    def __repr__(self):
+        return '<OrderTemplate {} {}>'.format(self.endpoint, self.book)
+
+    def encode(self, amount, price, nonce, signature):
+        """Encode the JSON request payload of an order.
+
+        The amount and the price are sent as JSON strings in fixed-point
+        notation, e.g. ``1e-05`` as ``"0.00001"``.
+
+        :param amount: the amount of major currency
+        :type amount: int | float | str | unicode | decimal.Decimal
+        :param price: the limit price
+        :type price: int | float | str | unicode | decimal.Decimal
+        :param nonce: the nonce, encoded
+        :type nonce: bytes
+        :param signature: the signature, encoded
+        :type signature: bytes
+        :returns: the JSON request payload
+        :rtype: bytes
+        :raises InvalidOrderError: if the amount or the price is not a
+            finite number
+        """
+        return b''.join((
+            self._head,
+            '{:f}'.format(to_decimal(amount, 'amount')).encode('ascii'),
+            b'", "price": "',
+            '{:f}'.format(to_decimal(price, 'price')).encode('ascii'),
+            b'", "nonce": ',
+            nonce,
+            b', "signature": "',
+            signature,
+            b'"}',
+        ))
+
+
+class Protocol(object):
+    """Transport-independent core of the QuadrigaCX API: it builds signed
+    requests and parses responses, but does no I/O.
+
+    Responses must have the attributes of :class:`requests.models.Response`
+    used here: ``url``, ``headers``, ``status_code``, ``reason``, ``text``,
+    ``content`` and ``json()``, as :class:`quadriga.transport.Response` does.
+
+    :param api_key: the API key from QuadrigaCX
+    :type api_key: str | unicode
+    :param api_secret: the API secret from QuadrigaCX
+    :type api_secret: str | unicode
+    :param client_id: the QuadrigaCX client ID
+    :type client_id: str | unicode
+    :param nonce_generator: the generator of nonces for signed requests
+    :type nonce_generator: quadriga.nonce.NonceGenerator
+    :param decoder: the decoder of JSON response bodies (``None`` == the
+        ``json()`` method of the response)
+    :type decoder: quadriga.decoder.JsonDecoder
+    :param endpoint_prefix: the URL prefix of the API endpoints
+    :type endpoint_prefix: str | unicode
+    """
+
+    endpoint_prefix = 'https://api.quadrigacx.com/v2'
+
+    # HTTP status codes of successful responses
+    http_success = frozenset(range(200, 210))
+
+    def __init__(self,
+                 api_key=None,
+                 api_secret=None,
+                 client_id=None,
+                 nonce_generator=None,
+                 decoder=None,
+                 endpoint_prefix=None):
+        self._api_key = str(api_key)
+        self._hmac_key = str(api_secret).encode('utf-8')
+        self._client_id = str(client_id)
+        # The HMAC keyed once, copied for each signature, and the end of the
+        # signed message
+        self._hmac = hmac.new(self._hmac_key, digestmod=hashlib.sha256)
+        self._signed_suffix = (self._client_id + self._api_key).encode('utf-8')
+        self._nonce_generator = nonce_generator or NonceGenerator()
+        self.decoder = decoder
+        if endpoint_prefix is not None:
+            self.endpoint_prefix = endpoint_prefix
+
+    def compute_signature(self, nonce):
+        """Compute the signature using HMAC SHA256 for authentication.
+
+        :param nonce: an integer unique to each API call
+        :type nonce: int
+        :return: the signature computed using HMAC SHA256
+        :rtype: str | unicode
+        """
+        return self._sign(str(nonce).encode('ascii'))
+
+    def _sign(self, nonce):
+        """Compute the signature from a copy of the keyed HMAC.
+
+        :param nonce: the nonce, encoded
+        :type nonce: bytes
+        :return: the signature computed using HMAC SHA256
+        :rtype: str | unicode
+        """
+        mac = self._hmac.copy()
+        mac.update(nonce)
+        mac.update(self._signed_suffix)
+        return mac.hexdigest()
+
+    def sign_payload(self, payload=None):
+        """Add the API key, nonce and signature to the request payload.
+
+        :param payload: the request payload
+        :type payload: dict
+        :returns: the signed request payload
+        :rtype: dict
+        """
+        nonce = self._nonce_generator.generate()
+        signature = self.compute_signature(nonce)
+
+        payload = {} if payload is None else dict(payload)
+        payload['key'] = self._api_key
+        payload['nonce'] = nonce
+        payload['signature'] = signature
+        return payload
+
+    def build_get(self, endpoint, params=None, stream=False):
+        """Build a public API call.
+
+        :param endpoint: the API endpoint/path
+        :type endpoint: str | unicode
+        :param params: the request parameters
+        :type params: dict
+        :param stream: read the response body as a stream of chunks
+        :type stream: bool
+        :returns: the HTTP GET request
+        :rtype: quadriga.protocol.Request
+        """
+        return Request(
+            'GET',
+            endpoint,
+            self.endpoint_prefix + endpoint,
+            params=params,
+            stream=stream
+        )
+
+    def build_post(self, endpoint, payload=None, trace=None):
+        """Build a signed API call, using up a nonce.
+
+        :param endpoint: the API endpoint/path
+        :type endpoint: str | unicode
+        :param payload: the request payload
+        :type payload: dict
+        :param trace: the trace the signing time is added to
+        :type trace: quadriga.tracing.RequestTrace
+        :returns: the HTTP POST request
+        :rtype: quadriga.protocol.Request
+        """
+        if trace is None:
+            payload = self.sign_payload(payload)
+        else:
+            start = clock()
+            payload = self.sign_payload(payload)
+            trace.add('sign', clock() - start)
+        return Request(
+            'POST',
+            endpoint,
+            self.endpoint_prefix + endpoint,
+            json=payload
+        )
+
+    def order_template(self, endpoint, book):
+        """Prepare the signed limit order requests of an order book.
+
+        :param endpoint: the API endpoint/path (``"/buy"`` or ``"/sell"``)
+        :type endpoint: str | unicode
+        :param book: the name of the order book
+        :type book: str | unicode
+        :returns: the order template
+        :rtype: quadriga.protocol.OrderTemplate
+        """
+        return OrderTemplate(
+            endpoint, self.endpoint_prefix + endpoint, book, self._api_key
+        )
+
+    def build_order(self, template, amount, price, trace=None):
+        """Build a signed limit order from its template, using up a nonce.
+
+        :param template: the order template
+        :type template: quadriga.protocol.OrderTemplate
+        :param amount: the amount of major currency
+        :type amount: int | float | str | unicode | decimal.Decimal
+        :param price: the limit price
+        :type price: int | float | str | unicode | decimal.Decimal
+        :param trace: the trace the signing time is added to
+        :type trace: quadriga.tracing.RequestTrace
+        :returns: the HTTP POST request, with an encoded payload
+        :rtype: quadriga.protocol.Request
+        :raises InvalidOrderError: if the amount or the price is not a
+            finite number
+        """
+        if trace is not None:
+            start = clock()
+        nonce = str(self._nonce_generator.generate()).encode('ascii')
+        signature = self._sign(nonce).encode('ascii')
+        if trace is not None:
+            trace.add('sign', clock() - start)
+        return Request(
+            'POST',
+            template.endpoint,
+            template.url,
+            body=template.encode(amount, price, nonce, signature),
+            headers=template.headers
+        )
+
+    def check_status(self, response):
+        """Check the HTTP status code of the response from QuadrigaCX.
+
+        :param response: the response from QuadrigaCX
+        :type response: requests.models.Response
+        :raises QuadrigaRequestError: HTTP 2XX was not returned
+        """
+        http_code = response.status_code
+        if http_code not in self.http_success:
+            raise RequestError(
+                response=response,
+                message='[HTTP {}] {}'.format(
+                    http_code, response.reason
+                )
+            )
+
+    def check_body(self, response, body):
+        """Check the decoded response body for an error from QuadrigaCX.
+
+        :param response: the response from QuadrigaCX
+        :type response: requests.models.Response
+        :param body: the JSON response body
+        :type body: dict
+        :returns: the JSON response body
+        :rtype: dict
+        :raises QuadrigaRequestError: the body holds an error
+        """
+        if 'error' in body:
+            error_code = body['error'].get('code', '?')
+            raise RequestError(
+                response=response,
+                message='[HTTP {}][ERR {}] {}'.format(
+                    response.status_code,
+                    error_code,
+                    body['error'].get('message', 'no error message')
+                ),
+                error_code=error_code
+            )
+        return body
+
+    def handle_response(self, response):
+        """Handle the response from QuadrigaCX.
+
+        :param response: the response from QuadrigaCX
+        :type response: requests.models.Response
+        :returns: the JSON response body
+        :rtype: dict
+        :raises QuadrigaRequestError: HTTP 2XX was not returned
+        """
+        self.check_status(response)
+        try:
+            if self.decoder is None:
+                body = response.json()
+            else:
+                body = self.decoder.decode(response.content)
+        except ValueError:
+            raise RequestError(
+                response=response,
+                message='[HTTP {}] response body: {}'.format(
+                    response.status_code, response.text
+                )
+            )
+        return self.check_body(response, body)
+
+    def handle_levels(self, response, parser):
+        """Handle the order book parsed from the response stream.
+
+        :param response: the response from QuadrigaCX
+        :type response: requests.models.Response
+        :param parser: the parser fed with the response body
+        :type parser: quadriga.streaming.OrderBookParser
+        :returns: the JSON response body up to the depth
+        :rtype: dict
+        :raises QuadrigaRequestError: the body is incomplete or an error
+        """
+        try:
+            body = parser.result()
+        except ValueError:
+            raise RequestError(
+                response=response,
+                message='[HTTP {}] incomplete order book response'.format(
+                    response.status_code
+                )
+            )
+        body = self.check_body(response, body)
+        if getattr(self.decoder, 'parse_number', None) is not None:
+            body = self.decoder.parse_fields(body)
+        return body
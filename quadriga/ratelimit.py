@@ -0,0 +1,160 @@
+from __future__ import absolute_import, unicode_literals
+
+import threading
+import time
+
+
+class TokenBucket(object):
+    """Thread-safe token bucket which budgets the rate of requests.
+
+    The bucket holds up to **capacity** tokens and is refilled continuously at
+    **rate** tokens per second. Each request takes one token, and waits for
+    the bucket to refill when it is empty. Waiting callers are served in the
+    order they arrived.
+
+    :param rate: the number of tokens added per second
+    :type rate: int | float
+    :param capacity: the maximum number of tokens held (i.e. the largest
+        burst allowed), defaults to **rate**
+    :type capacity: int | float
+    """
+
+    def __init__(self, rate, capacity=None):
+        self._rate = float(rate)
+        self._capacity = float(rate if capacity is None else capacity)
+        self._tokens = self._capacity
+        self._updated_at = time.time()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        """Add the tokens accumulated since the last update."""
+        now = time.time()
+        elapsed = max(now - self._updated_at, 0)
+        self._tokens = min(self._capacity, self._tokens + elapsed * self._rate)
+        self._updated_at = now
+
+    @property
+    def rate(self):
+        """Return the number of tokens added per second.
+
+        :returns: the refill rate
+        :rtype: float
+        """
+        return self._rate
+
+    @property
+    def capacity(self):
+        """Return the maximum number of tokens held.
+
+        :returns: the capacity of the bucket
+        :rtype: float
+        """
+        return self._capacity
+
+    @property
+    def level(self):
+        """Return the number of tokens currently available.
+
+        The level is negative when tokens have been reserved by callers still
+        waiting for the bucket to refill.
+
+        :returns: the fill level
+        :rtype: float
+        """
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+    def reserve(self, tokens=1):
+        """Take tokens from the bucket and return how long to wait for them.
+
+        :param tokens: the number of tokens to take
+        :type tokens: int | float
+        :returns: the number of seconds to wait before sending the request
+        :rtype: float
+        """
+        with self._lock:
+            self._refill()
+            self._tokens -= tokens
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self._rate
+
+    def try_acquire(self, tokens=1):
+        """Take tokens from the bucket only if they are available right now.
+
+        :param tokens: the number of tokens to take
+        :type tokens: int | float
+        :returns: whether the tokens were taken
+        :rtype: bool
+        """
+        with self._lock:
+            self._refill()
+            if self._tokens < tokens:
+                return False
+            self._tokens -= tokens
+            return True
+
+    def acquire(self, tokens=1):
+        """Take tokens from the bucket, blocking until they are available.
+
+        :param tokens: the number of tokens to take
+        :type tokens: int | float
+        :returns: the number of seconds spent waiting
+        :rtype: float
+        """
+        delay = self.reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+
+class RateLimiter(object):
+    """Client-side rate limiter with separate budgets for public and private
+    (signed) API calls.
+
+    Pass the same bucket for both to share a single budget, or ``None`` to
+    leave a kind of call unlimited.
+
+    :param public: the budget of public HTTP GET requests
+    :type public: quadriga.ratelimit.TokenBucket
+    :param private: the budget of signed HTTP POST requests
+    :type private: quadriga.ratelimit.TokenBucket
+    """
+
+    def __init__(self, public=None, private=None):
+        self.public = public
+        self.private = private
+
+    def bucket(self, private):
+        """Return the budget for the kind of API call.
+
+        :param private: whether the API call is signed
+        :type private: bool
+        :returns: the token bucket (``None`` == unlimited)
+        :rtype: quadriga.ratelimit.TokenBucket
+        """
+        return self.private if private else self.public
+
+    def acquire(self, private):
+        """Block until the budget for the kind of API call is available.
+
+        :param private: whether the API call is signed
+        :type private: bool
+        :returns: the number of seconds spent waiting
+        :rtype: float
+        """
+        bucket = self.bucket(private)
+        return 0.0 if bucket is None else bucket.acquire()
+
+    def levels(self):
+        """Return the current fill level of each budget.
+
+        :returns: the fill levels by ``"public"`` and ``"private"``
+        :rtype: dict
+        """
+        return {
+            name: None if bucket is None else bucket.level
+            for name, bucket in (('public', self.public),
+                                 ('private', self.private))
+        }
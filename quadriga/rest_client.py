@@ -1,23 +1,68 @@
 from __future__ import absolute_import, unicode_literals
 
-import hashlib
-import hmac
+import logging
+import threading
 import time
+from concurrent import futures
+from datetime import timedelta
 
-import requests
-
+from quadriga.cache import build_key
+from quadriga.coalesce import RequestCoalescer
 from quadriga.exceptions import RequestError
+from quadriga.metrics import RequestEvent, clock
+from quadriga.protocol import Protocol
+from quadriga.scheduler import (
+    PRIORITY_CANCEL,
+    PRIORITY_ORDER,
+    PRIORITY_PRIVATE,
+    PRIORITY_PUBLIC
+)
+from quadriga.streaming import OrderBookParser, StreamedResponse
+from quadriga.tracing import RequestTrace, activate, attach
+from quadriga.transport import RequestsTransport
 
 
 class RestClient(object):
-    """Utility HTTP client which handles HMAC SHA256 authentication."""
+    """Utility HTTP client which handles HMAC SHA256 authentication.
+
+    Requests are built and responses parsed by a
+    :class:`quadriga.protocol.Protocol`, and sent by a swappable transport.
+    """
 
     endpoint_prefix = 'https://api.quadrigacx.com/v2'
 
+    # Priority classes of signed API calls other than private reads
+    endpoint_priorities = {
+        '/cancel_order': PRIORITY_CANCEL,
+        '/buy': PRIORITY_ORDER,
+        '/sell': PRIORITY_ORDER,
+    }
+
+    # Signed API calls which can be retried safely
+    idempotent_endpoints = {
+        '/balance',
+        '/lookup_order',
+        '/open_orders',
+        '/user_transactions',
+    }
+
+    # Number of bytes read at a time from streamed responses
+    stream_chunk_size = 4096
+
     def __init__(self,
                  api_key=None,
                  api_secret=None,
-                 client_id=None):
+                 client_id=None,
+                 session=None,
+                 nonce_generator=None,
+                 coalesce=True,
+                 rate_limiter=None,
+                 scheduler=None,
+                 retry_policy=None,
+                 decoder=None,
+                 transport=None,
+                 hooks=None,
+                 trace=False):
         """Wrapper for sending requests to QuadrigaCX.
 
         Authentication using HMAC SHA256 is carried out here.
@@ -28,82 +73,496 @@ class RestClient(object):
         :type api_secret: str | unicode
         :param client_id: the QuadrigaCX client ID
         :type client_id: str | unicode
+        :param session: the HTTP session to send requests with (a new
+            :class:`quadriga.session.PooledSession` is created if not set),
+            used if **transport** is not set
+        :type session: requests.Session
+        :param nonce_generator: the generator of nonces for signed requests,
+            which should be shared by all clients using the same API key
+        :type nonce_generator: quadriga.nonce.NonceGenerator
+        :param coalesce: share the outcome of identical GET requests in
+            flight instead of sending them again
+        :type coalesce: bool
+        :param rate_limiter: the client-side limiter of the request rate
+            (``None`` == unlimited)
+        :type rate_limiter: quadriga.ratelimit.RateLimiter
+        :param scheduler: the scheduler admitting requests by priority class
+            (``None`` == requests are sent right away)
+        :type scheduler: quadriga.scheduler.PriorityScheduler
+        :param retry_policy: the policy for retrying and hedging idempotent
+            API calls (``None`` == no retries)
+        :type retry_policy: quadriga.retry.RetryPolicy
+        :param decoder: the decoder of JSON response bodies (``None`` == the
+            decoder of the HTTP library)
+        :type decoder: quadriga.decoder.JsonDecoder
+        :param transport: the transport sending requests (``None`` == a
+            :class:`quadriga.transport.RequestsTransport` with **session**)
+        :type transport: quadriga.transport.Transport
+        :param hooks: the request hooks, whose ``before_request`` and
+            ``after_request`` methods are called with a
+            :class:`quadriga.metrics.RequestEvent` around each request sent,
+            e.g. a :class:`quadriga.metrics.MetricsCollector`
+        :type hooks: [object]
+        :param trace: measure the time spent in each phase of the requests,
+            and attach the :class:`quadriga.tracing.RequestTrace` to the
+            responses, errors and request events
+        :type trace: bool
+        """
+        self._protocol = Protocol(
+            api_key=api_key,
+            api_secret=api_secret,
+            client_id=client_id,
+            nonce_generator=nonce_generator,
+            decoder=decoder,
+            endpoint_prefix=self.endpoint_prefix
+        )
+        self._owns_transport = transport is None
+        if transport is None:
+            transport = self._create_transport(session)
+        self._transport = transport
+        self._coalescer = self._create_coalescer() if coalesce else None
+        self._rate_limiter = rate_limiter
+        self._scheduler = scheduler
+        self._retry_policy = retry_policy
+        self._hooks = list(hooks or ())
+        self._trace = trace
+        self._client_id = client_id
+        self._logger = logging.getLogger('quadriga')
+        self._hedge_executor = None
+        self._hedge_lock = threading.Lock()
+
+    def _create_transport(self, session):
+        """Create the transport owned by this client.
+
+        :param session: the HTTP session to send requests with
+        :type session: requests.Session
+        :returns: the transport
+        :rtype: quadriga.transport.Transport
+        """
+        return RequestsTransport(session)
+
+    def _create_coalescer(self):
+        """Create the coalescer of identical GET requests in flight.
+
+        :returns: the request coalescer
+        :rtype: quadriga.coalesce.RequestCoalescer
         """
-        self._api_key = str(api_key)
-        self._hmac_key = str(api_secret).encode('utf-8')
-        self._client_id = str(client_id)
-        self._http_success = {code for code in range(200, 210)}
+        return RequestCoalescer()
 
-    def _compute_signature(self, nonce):
-        """Compute the signature using HMAC SHA256 for authentication.
+    @property
+    def session(self):
+        """Return the HTTP session used to send requests.
 
-        :param nonce: an integer unique to each API call
-        :type nonce: int
-        :return: the signature computed using HMAC SHA256
-        :rtype: str | unicode
+        :returns: the HTTP session (``None`` == not sent with requests)
+        :rtype: requests.Session
         """
-        msg = str(nonce) + self._client_id + self._api_key
-        return hmac.new(
-            key=self._hmac_key,
-            msg=msg.encode('utf-8'),
-            digestmod=hashlib.sha256
-        ).hexdigest()
+        return getattr(self._transport, 'session', None)
+
+    @property
+    def transport(self):
+        """Return the transport used to send requests.
+
+        :returns: the transport
+        :rtype: quadriga.transport.Transport
+        """
+        return self._transport
+
+    def close(self):
+        """Close the pooled connections owned by this client.
 
-    def _handle_response(self, response):
-        """Handle the response from QuadrigaCX.
+        Sessions and transports passed in by the caller are shared and left
+        open.
+        """
+        with self._hedge_lock:
+            executor, self._hedge_executor = self._hedge_executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+        if self._owns_transport:
+            self._transport.close()
+
+    def _priority(self, endpoint, private):
+        """Return the priority class of the API call.
+
+        :param endpoint: the API endpoint/path
+        :type endpoint: str | unicode
+        :param private: whether the API call is signed
+        :type private: bool
+        :returns: the priority class
+        :rtype: int
+        """
+        if not private:
+            return PRIORITY_PUBLIC
+        return self.endpoint_priorities.get(endpoint, PRIORITY_PRIVATE)
+
+    def _send(self, endpoint, private, send, handle=None):
+        """Send the request once admitted by the scheduler and the limiter.
+
+        :param endpoint: the API endpoint/path
+        :type endpoint: str | unicode
+        :param private: whether the API call is signed
+        :type private: bool
+        :param send: the function sending the request, given the trace of
+            the request if traced
+        :type send: callable
+        :param handle: the function handling the response (``None`` ==
+            :func:`quadriga.protocol.Protocol.handle_response`)
+        :type handle: callable
+        :returns: the JSON response body from QuadrigaCX
+        :rtype: dict
+        """
+        trace = None
+        if self._trace:
+            trace = RequestTrace()
+            queued = clock()
+        if self._scheduler is not None:
+            self._scheduler.acquire(self._priority(endpoint, private))
+        try:
+            if self._rate_limiter is not None:
+                self._rate_limiter.acquire(private=private)
+            if trace is not None:
+                trace.add('queue', clock() - queued)
+            if (self._hooks or trace is not None or
+                    self._logger.isEnabledFor(logging.DEBUG)):
+                return self._send_hooked(
+                    endpoint, private, send, handle, trace
+                )
+            return (handle or self._protocol.handle_response)(send())
+        finally:
+            if self._scheduler is not None:
+                self._scheduler.release()
 
+    def _start_event(self, endpoint, private, trace=None):
+        """Notify the request hooks of a request about to be sent.
+
+        :param endpoint: the API endpoint/path
+        :type endpoint: str | unicode
+        :param private: whether the API call is signed
+        :type private: bool
+        :param trace: the trace of the request, if traced
+        :type trace: quadriga.tracing.RequestTrace
+        :returns: the request event
+        :rtype: quadriga.metrics.RequestEvent
+        """
+        event = RequestEvent(endpoint, 'POST' if private else 'GET', trace)
+        for hook in self._hooks:
+            hook.before_request(event)
+        return event
+
+    def _finish_event(self, event, error=None):
+        """Notify the request hooks of a request which has completed, and
+        log it if debug logging is enabled.
+
+        The trace of the request is attached to the error, if any.
+
+        :param event: the request event
+        :type event: quadriga.metrics.RequestEvent
+        :param error: the error raised by the request, if any
+        :type error: Exception
+        """
+        event.finish(error)
+        if error is not None and event.trace is not None:
+            attach(error, event.trace)
+        for hook in self._hooks:
+            hook.after_request(event)
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._log_event(event)
+
+    def _log_event(self, event):
+        """Log a debug record of a request which has completed.
+
+        The fields ``client_id``, ``endpoint``, ``method``, ``status``,
+        ``error_code``, ``latency`` (in seconds) and ``bytes`` are set as
+        attributes of the record, for structured log handlers.
+
+        :param event: the request event
+        :type event: quadriga.metrics.RequestEvent
+        """
+        fields = {
+            'client_id': self._client_id,
+            'endpoint': event.endpoint,
+            'method': event.method,
+            'status': event.status,
+            'error_code': event.error_code,
+            'latency': event.elapsed,
+            'bytes': event.bytes,
+        }
+        self._logger.debug(
+            '[client: %(client_id)s] %(method)s %(endpoint)s: '
+            'HTTP %(status)s in %(latency).6fs',
+            fields,
+            extra=fields
+        )
+
+    @staticmethod
+    def _trace_exchange(trace, response, seconds):
+        """Split the time spent sending the request and receiving the
+        response into phases.
+
+        :param trace: the trace of the request
+        :type trace: quadriga.tracing.RequestTrace
         :param response: the response from QuadrigaCX
         :type response: requests.models.Response
-        :returns: the JSON response body
+        :param seconds: the time spent sending the request, including the
+            phases already traced
+        :type seconds: float
+        """
+        phases = trace.phases
+        seconds -= phases.get('sign', 0.0)
+        connecting = phases.get('connect', 0.0) + phases.get('tls', 0.0)
+        elapsed = getattr(response, 'elapsed', None)
+        if not isinstance(elapsed, timedelta):
+            trace.add('first_byte', seconds - connecting)
+            return
+        headers = elapsed.total_seconds()
+        trace.add('first_byte', headers - connecting)
+        trace.add('download', seconds - headers)
+
+    def _send_hooked(self, endpoint, private, send, handle=None, trace=None):
+        """Send the request, notifying the request hooks and tracing it.
+
+        :param endpoint: the API endpoint/path
+        :type endpoint: str | unicode
+        :param private: whether the API call is signed
+        :type private: bool
+        :param send: the function sending the request
+        :type send: callable
+        :param handle: the function handling the response (``None`` ==
+            :func:`quadriga.protocol.Protocol.handle_response`)
+        :type handle: callable
+        :param trace: the trace of the request, if traced
+        :type trace: quadriga.tracing.RequestTrace
+        :returns: the JSON response body from QuadrigaCX
         :rtype: dict
-        :raises QuadrigaRequestError: HTTP 2XX was not returned
         """
-        http_code = response.status_code
-        if http_code not in self._http_success:
-            raise RequestError(
-                response=response,
-                message='[HTTP {}] {}'.format(
-                    http_code, response.reason
-                )
-            )
+        event = self._start_event(endpoint, private, trace)
+        error = None
         try:
-            body = response.json()
-        except ValueError:
-            raise RequestError(
-                response=response,
-                message='[HTTP {}] response body: {}'.format(
-                    http_code, response.text
-                )
-            )
-        else:
-            if 'error' in body:
-                error_code = body['error'].get('code', '?')
-                raise RequestError(
-                    response=response,
-                    message='[HTTP {}][ERR {}] {}'.format(
-                        response.status_code,
-                        error_code,
-                        body['error'].get('message', 'no error message')
-                    ),
-                    error_code=error_code
+            if trace is None:
+                response = send()
+            else:
+                with activate(trace):
+                    response = send(trace)
+                self._trace_exchange(trace, response, clock() - event.start)
+            event.status = response.status_code
+            if handle is None:
+                # The body is decoded once read in full, and parsed as it is
+                # read when streamed
+                event.bytes = len(response.content)
+                handle, phase = self._protocol.handle_response, 'decode'
+            else:
+                length = response.headers.get('Content-Length')
+                event.bytes = None if length is None else int(length)
+                phase = 'download'
+            if trace is None:
+                return handle(response)
+            start = clock()
+            try:
+                return attach(handle(response), trace)
+            finally:
+                trace.add(phase, clock() - start)
+        except BaseException as err:
+            error = err
+            raise
+        finally:
+            self._finish_event(event, error)
+
+    def _is_retryable(self, endpoint, private):
+        """Return True if the API call may be retried.
+
+        :param endpoint: the API endpoint/path
+        :type endpoint: str | unicode
+        :param private: whether the API call is signed
+        :type private: bool
+        :returns: whether the API call may be retried
+        :rtype: bool
+        """
+        if self._retry_policy is None:
+            return False
+        return not private or endpoint in self.idempotent_endpoints
+
+    def _is_transient(self, error):
+        """Return True if the error is transient and worth a retry.
+
+        :param error: the error raised by the API call
+        :type error: Exception
+        :returns: whether the error is transient
+        :rtype: bool
+        """
+        if isinstance(error, RequestError):
+            return error.http_code in self._retry_policy.retry_http_codes
+        return isinstance(error, self._transient_errors)
+
+    @property
+    def _transient_errors(self):
+        """Return the errors from the transport treated as transient.
+
+        :returns: the exception classes
+        :rtype: (type)
+        """
+        return self._transport.transient_errors
+
+    def _call(self, endpoint, private, send, handle=None):
+        """Send the request, retrying and hedging it if the policy allows.
+
+        :param endpoint: the API endpoint/path
+        :type endpoint: str | unicode
+        :param private: whether the API call is signed
+        :type private: bool
+        :param send: the function sending the request
+        :type send: callable
+        :param handle: the function handling the response (``None`` ==
+            :func:`quadriga.protocol.Protocol.handle_response`)
+        :type handle: callable
+        :returns: the JSON response body from QuadrigaCX
+        :rtype: dict
+        """
+        if not self._is_retryable(endpoint, private):
+            return self._send(endpoint, private, send, handle)
+        attempt = 1
+        while True:
+            try:
+                if private:
+                    return self._send(endpoint, private, send, handle)
+                return self._hedge(endpoint, send, handle)
+            except Exception as err:
+                if attempt >= self._retry_policy.max_attempts:
+                    raise
+                if not self._is_transient(err):
+                    raise
+            time.sleep(self._retry_policy.backoff_delay(attempt))
+            attempt += 1
+
+    def _hedge(self, endpoint, send, handle=None):
+        """Send the GET request, and a second one if the first is too slow.
+
+        :param endpoint: the API endpoint/path
+        :type endpoint: str | unicode
+        :param send: the function sending the request
+        :type send: callable
+        :param handle: the function handling the response (``None`` ==
+            :func:`quadriga.protocol.Protocol.handle_response`)
+        :type handle: callable
+        :returns: the JSON response body from the first successful request
+        :rtype: dict
+        """
+        policy = self._retry_policy
+
+        def timed_send():
+            start = time.time()
+            result = self._send(endpoint, False, send, handle)
+            policy.record_latency(time.time() - start)
+            return result
+
+        delay = policy.hedge_delay()
+        if delay is None:
+            return timed_send()
+
+        executor = self._get_hedge_executor()
+        first = executor.submit(timed_send)
+        done, _ = futures.wait([first], timeout=delay)
+        if done:
+            return first.result()
+
+        second = executor.submit(timed_send)
+        error = None
+        for future in futures.as_completed([first, second]):
+            error = future.exception()
+            if error is None:
+                return future.result()
+        raise error
+
+    def _get_hedge_executor(self):
+        """Return the thread pool of hedged requests, creating it first if
+        necessary.
+
+        The pool is created under a lock, since hedged requests are sent by
+        concurrent callers.
+
+        :returns: the thread pool sending hedged requests
+        :rtype: concurrent.futures.ThreadPoolExecutor
+        """
+        with self._hedge_lock:
+            if self._hedge_executor is None:
+                self._hedge_executor = futures.ThreadPoolExecutor(
+                    max_workers=self._retry_policy.hedge_workers
                 )
-            return body
+            return self._hedge_executor
+
+    def _stream_levels(self, response, depth):
+        """Parse the order book from the response stream up to the depth.
+
+        The response is closed as soon as both sides have been parsed.
 
-    def get(self, endpoint, params=None):
+        :param response: the streamed response from QuadrigaCX
+        :type response: requests.models.Response
+        :param depth: the maximum number of price levels per side
+        :type depth: int
+        :returns: the JSON response body up to the depth
+        :rtype: dict
+        :raises QuadrigaRequestError: HTTP 2XX was not returned
+        """
+        if response.status_code not in self._protocol.http_success:
+            return self._protocol.handle_response(response)
+        parser = OrderBookParser(depth)
+        try:
+            for chunk in response.iter_content(self.stream_chunk_size):
+                if parser.feed(chunk):
+                    break
+        finally:
+            response.close()
+        return self._protocol.handle_levels(
+            StreamedResponse(response, parser.text), parser
+        )
+
+    def get(self, endpoint, params=None, depth=None):
         """Send an HTTP GET request to QuadrigaCX.
 
         :param endpoint: the API endpoint/path
         :type endpoint: str | unicode
         :param params: the request parameters
         :type params: dict
+        :param depth: parse the order book response from the stream up to
+            this number of price levels per side (``None`` == all)
+        :type depth: int
+        :returns: the JSON response body from QuadrigaCX
+        :rtype: dict
+        """
+        if self._coalescer is None:
+            return self._get(endpoint, params, depth)
+        key = build_key(endpoint, params)
+        return self._coalescer.call(
+            key=key if depth is None else (key, depth),
+            func=lambda: self._get(endpoint, params, depth)
+        )
+
+    def _get(self, endpoint, params, depth=None):
+        """Send an HTTP GET request to QuadrigaCX without coalescing.
+
+        :param endpoint: the API endpoint/path
+        :type endpoint: str | unicode
+        :param params: the request parameters
+        :type params: dict
+        :param depth: parse the order book response from the stream up to
+            this number of price levels per side (``None`` == all)
+        :type depth: int
         :returns: the JSON response body from QuadrigaCX
         :rtype: dict
         """
-        response = requests.get(
-            url=self.endpoint_prefix + endpoint,
-            params=params
+        request = self._protocol.build_get(
+            endpoint, params, stream=depth is not None
+        )
+
+        def send(trace=None):
+            return self._transport.send(request)
+
+        if depth is None:
+            return self._call(endpoint, False, send)
+        return self._call(
+            endpoint,
+            False,
+            send,
+            lambda response: self._stream_levels(response, depth)
         )
-        return self._handle_response(response)
 
     def post(self, endpoint, payload=None):
         """Send an HTTP POST request to QuadrigaCX.
@@ -115,17 +574,42 @@ class RestClient(object):
         :return: the JSON response body from QuadrigaCX
         :rtype: dict
         """
-        nonce = int(time.time() * 1000)
-        signature = self._compute_signature(nonce)
+        return self._call(
+            endpoint,
+            True,
+            lambda trace=None: self._transport.send(
+                self._protocol.build_post(endpoint, payload, trace)
+            )
+        )
 
-        if payload is None:
-            payload = {}
-        payload['key'] = self._api_key
-        payload['nonce'] = nonce
-        payload['signature'] = signature
+    def order_template(self, endpoint, book):
+        """Prepare the signed limit order requests of an order book.
 
-        response = requests.post(
-            url=self.endpoint_prefix + endpoint,
-            json=payload
+        :param endpoint: the API endpoint/path (``"/buy"`` or ``"/sell"``)
+        :type endpoint: str | unicode
+        :param book: the name of the order book
+        :type book: str | unicode
+        :returns: the order template
+        :rtype: quadriga.protocol.OrderTemplate
+        """
+        return self._protocol.order_template(endpoint, book)
+
+    def post_order(self, template, amount, price):
+        """Send a limit order built from its template to QuadrigaCX.
+
+        :param template: the order template
+        :type template: quadriga.protocol.OrderTemplate
+        :param amount: the amount of major currency
+        :type amount: int | float | str | unicode | decimal.Decimal
+        :param price: the limit price
+        :type price: int | float | str | unicode | decimal.Decimal
+        :return: the JSON response body from QuadrigaCX
+        :rtype: dict
+        """
+        return self._call(
+            template.endpoint,
+            True,
+            lambda trace=None: self._transport.send(
+                self._protocol.build_order(template, amount, price, trace)
+            )
         )
-        return self._handle_response(response)
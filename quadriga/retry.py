@@ -0,0 +1,104 @@
+from __future__ import absolute_import, unicode_literals
+
+import random
+import threading
+from collections import deque
+
+
+class RetryPolicy(object):
+    """Policy for retrying and hedging idempotent API calls.
+
+    Failed calls are retried with an exponential backoff: the n-th retry
+    waits ``backoff * multiplier ** (n - 1)`` seconds (up to **max_backoff**),
+    randomized between 0 and that value if **jitter** is enabled. Only
+    transient errors are retried, i.e. connection errors, timeouts and the
+    HTTP codes in **retry_http_codes**. Orders and withdrawals are never
+    retried.
+
+    If **hedge_percentile** is set, a second HTTP GET request is sent when
+    the first one has not completed within that percentile of the recent GET
+    latencies, and whichever completes first is used.
+
+    :param max_attempts: the maximum number of attempts per call
+    :type max_attempts: int
+    :param backoff: the number of seconds to wait before the first retry
+    :type backoff: int | float
+    :param multiplier: the factor applied to the backoff after each retry
+    :type multiplier: int | float
+    :param max_backoff: the maximum number of seconds to wait between retries
+    :type max_backoff: int | float
+    :param jitter: randomize the backoff to spread out retries
+    :type jitter: bool
+    :param retry_http_codes: the HTTP codes treated as transient errors
+    :type retry_http_codes: {int}
+    :param hedge_percentile: the latency percentile (e.g. 95) after which a
+        GET request is hedged (``None`` == no hedging)
+    :type hedge_percentile: int | float
+    :param hedge_window: the number of recent GET latencies kept
+    :type hedge_window: int
+    :param hedge_min_samples: the number of GET latencies required before
+        requests are hedged
+    :type hedge_min_samples: int
+    :param hedge_workers: the maximum number of threads sending hedged GET
+        requests per client
+    :type hedge_workers: int
+    """
+
+    def __init__(self,
+                 max_attempts=3,
+                 backoff=0.1,
+                 multiplier=2.0,
+                 max_backoff=5.0,
+                 jitter=True,
+                 retry_http_codes=(500, 502, 503, 504),
+                 hedge_percentile=None,
+                 hedge_window=100,
+                 hedge_min_samples=20,
+                 hedge_workers=8):
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.multiplier = multiplier
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.retry_http_codes = set(retry_http_codes)
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_workers = hedge_workers
+        self._latencies = deque(maxlen=hedge_window)
+        self._lock = threading.Lock()
+
+    def backoff_delay(self, attempt):
+        """Return the number of seconds to wait after a failed attempt.
+
+        :param attempt: the number of the attempt which failed (from 1)
+        :type attempt: int
+        :returns: the backoff delay
+        :rtype: float
+        """
+        delay = self.backoff * self.multiplier ** (attempt - 1)
+        delay = min(delay, self.max_backoff)
+        return random.uniform(0, delay) if self.jitter else delay
+
+    def record_latency(self, seconds):
+        """Record the latency of a completed HTTP GET request.
+
+        :param seconds: the latency in seconds
+        :type seconds: float
+        """
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def hedge_delay(self):
+        """Return how long to wait before hedging an HTTP GET request.
+
+        :returns: the hedge delay in seconds (``None`` == do not hedge)
+        :rtype: float
+        """
+        if self.hedge_percentile is None:
+            return None
+        with self._lock:
+            if len(self._latencies) < self.hedge_min_samples:
+                return None
+            latencies = sorted(self._latencies)
+        index = int(round(self.hedge_percentile / 100.0 * len(latencies)))
+        return latencies[min(max(index - 1, 0), len(latencies) - 1)]
@@ -0,0 +1,135 @@
+from __future__ import absolute_import, unicode_literals
+
+from decimal import Decimal, InvalidOperation, ROUND_CEILING, ROUND_FLOOR
+
+from quadriga.exceptions import InvalidOrderError
+
+
+def to_decimal(value, name):
+    """Convert an order amount or price into a decimal.
+
+    :param value: the amount or price
+    :type value: int | float | str | unicode | decimal.Decimal
+    :param name: the name of the value, used in error messages
+    :type name: str | unicode
+    :returns: the decimal value
+    :rtype: decimal.Decimal
+    :raises InvalidOrderError: if the value is not a finite number
+    """
+    try:
+        # Floats are converted through their shortest representation
+        number = Decimal(
+            value if isinstance(value, (type(''), Decimal)) else str(value)
+        )
+    except (InvalidOperation, TypeError, ValueError):
+        number = None
+    if number is None or not number.is_finite():
+        raise InvalidOrderError('Invalid {} "{}"'.format(name, value))
+    return number
+
+
+class BookRules(object):
+    """Trading rules of an order book, checked locally before orders are
+    sent, so invalid orders fail without a round trip to QuadrigaCX.
+
+    :param price_tick: the price increment, e.g. ``"0.01"``
+    :type price_tick: str | unicode | decimal.Decimal
+    :param amount_places: the decimal places of amounts
+    :type amount_places: int
+    :param minimum_amount: the minimum amount of an order
+    :type minimum_amount: str | unicode | decimal.Decimal
+    """
+
+    def __init__(self, price_tick, amount_places, minimum_amount):
+        self.price_tick = Decimal(price_tick)
+        self.amount_places = amount_places
+        self.minimum_amount = Decimal(minimum_amount)
+        self._amount_exponent = Decimal(1).scaleb(-amount_places)
+
+    def __repr__(self):
+        return (
+            '<BookRules price_tick={} amount_places={} minimum_amount={}>'
+            .format(self.price_tick, self.amount_places, self.minimum_amount)
+        )
+
+    def check_amount(self, amount):
+        """Check the amount of an order.
+
+        :param amount: the amount of major currency
+        :type amount: int | float | str | unicode | decimal.Decimal
+        :raises InvalidOrderError: if the amount is below the minimum or has
+            too many decimal places
+        """
+        number = to_decimal(amount, 'amount')
+        if number < self.minimum_amount:
+            raise InvalidOrderError(
+                'Amount {} is below the minimum of {}'
+                .format(amount, self.minimum_amount)
+            )
+        if number != number.quantize(self._amount_exponent, ROUND_FLOOR):
+            raise InvalidOrderError(
+                'Amount {} has more than {} decimal places'
+                .format(amount, self.amount_places)
+            )
+
+    def check_price(self, price):
+        """Check the price of an order.
+
+        :param price: the price
+        :type price: int | float | str | unicode | decimal.Decimal
+        :raises InvalidOrderError: if the price is not positive or not a
+            multiple of the price tick
+        """
+        number = to_decimal(price, 'price')
+        if number <= 0:
+            raise InvalidOrderError('Price {} is not positive'.format(price))
+        if number % self.price_tick:
+            raise InvalidOrderError(
+                'Price {} is not a multiple of the tick of {}'
+                .format(price, self.price_tick)
+            )
+
+    def round_price(self, price, side):
+        """Snap the price of an order to the price tick.
+
+        Buy prices are rounded down and sell prices up, so the rounded price
+        is never worse than the one given.
+
+        :param price: the price
+        :type price: int | float | str | unicode | decimal.Decimal
+        :param side: the side of the order (``"buy"`` or ``"sell"``)
+        :type side: str | unicode
+        :returns: the rounded price
+        :rtype: str | unicode
+        :raises InvalidOrderError: if the rounded price is not positive
+        """
+        number = to_decimal(price, 'price')
+        rounding = ROUND_FLOOR if side == 'buy' else ROUND_CEILING
+        ticks = (number / self.price_tick).to_integral_value(rounding)
+        rounded = (ticks * self.price_tick).quantize(self.price_tick)
+        if rounded <= 0:
+            raise InvalidOrderError('Price {} is not positive'.format(price))
+        return '{:f}'.format(rounded)
+
+    def check_order(self, amount, price=None, side='buy', round_price=False):
+        """Check an order, optionally snapping its price to the price tick.
+
+        :param amount: the amount of major currency
+        :type amount: int | float | str | unicode | decimal.Decimal
+        :param price: the limit price (``None`` == market order)
+        :type price: int | float | str | unicode | decimal.Decimal
+        :param side: the side of the order (``"buy"`` or ``"sell"``)
+        :type side: str | unicode
+        :param round_price: snap the price to the price tick rather than
+            rejecting prices between ticks
+        :type round_price: bool
+        :returns: the price to send
+        :rtype: int | float | str | unicode | decimal.Decimal
+        :raises InvalidOrderError: if the order breaks the rules
+        """
+        self.check_amount(amount)
+        if price is not None:
+            if round_price:
+                return self.round_price(price, side)
+            self.check_price(price)
+        return price
@@ -0,0 +1,195 @@
+from __future__ import absolute_import, unicode_literals
+
+import threading
+import time
+from collections import deque
+
+# Priority classes of API calls (lower is served first)
+PRIORITY_CANCEL = 0
+PRIORITY_ORDER = 1
+PRIORITY_PRIVATE = 2
+PRIORITY_PUBLIC = 3
+
+priority_names = {
+    PRIORITY_CANCEL: 'cancel',
+    PRIORITY_ORDER: 'order',
+    PRIORITY_PRIVATE: 'private',
+    PRIORITY_PUBLIC: 'public',
+}
+
+
+class _Ticket(object):
+    """Request waiting in the scheduler queue."""
+
+    __slots__ = ('priority', 'enqueued_at', 'granted')
+
+    def __init__(self, priority):
+        self.priority = priority
+        self.enqueued_at = time.time()
+        self.granted = False
+
+
+class PriorityScheduler(object):
+    """Scheduler which admits requests by priority class when capacity is
+    limited.
+
+    Capacity is limited by the number of requests in flight and/or by a token
+    bucket. When it runs out, waiting requests are admitted in the order of
+    their priority class (:data:`PRIORITY_CANCEL`, :data:`PRIORITY_ORDER`,
+    :data:`PRIORITY_PRIVATE` then :data:`PRIORITY_PUBLIC`), and in the order
+    they arrived within a class. A request which has waited longer than the
+    starvation limit of its class is admitted next regardless of priority.
+
+    :param max_in_flight: the maximum number of requests in flight
+        (``None`` == unlimited)
+    :type max_in_flight: int
+    :param bucket: the budget of requests (``None`` == unlimited)
+    :type bucket: quadriga.ratelimit.TokenBucket
+    :param max_wait: the starvation limit in seconds, either for all classes
+        or by priority class (``None`` == no limit)
+    :type max_wait: int | float | dict
+    """
+
+    def __init__(self, max_in_flight=None, bucket=None, max_wait=10.0):
+        self._max_in_flight = max_in_flight
+        self._bucket = bucket
+        if not isinstance(max_wait, dict):
+            max_wait = {priority: max_wait for priority in priority_names}
+        self._max_wait = max_wait
+        self._queues = {priority: deque() for priority in priority_names}
+        self._in_flight = 0
+        self._stats = {
+            priority: {'requests': 0, 'total_wait': 0.0, 'max_wait': 0.0}
+            for priority in priority_names
+        }
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+
+    def _is_starving(self, ticket, now):
+        """Return True if the ticket has waited past its starvation limit.
+
+        :param ticket: the waiting ticket
+        :type ticket: quadriga.scheduler._Ticket
+        :param now: the current time
+        :type now: float
+        :returns: whether the ticket is starving
+        :rtype: bool
+        """
+        max_wait = self._max_wait.get(ticket.priority)
+        return max_wait is not None and now - ticket.enqueued_at >= max_wait
+
+    def _next_ticket(self):
+        """Return the ticket to admit next.
+
+        :returns: the next ticket (``None`` == no ticket waiting)
+        :rtype: quadriga.scheduler._Ticket
+        """
+        heads = [
+            self._queues[priority][0]
+            for priority in sorted(self._queues)
+            if self._queues[priority]
+        ]
+        if not heads:
+            return None
+        now = time.time()
+        starving = [t for t in heads if self._is_starving(t, now)]
+        if starving:
+            return min(starving, key=lambda t: t.enqueued_at)
+        return heads[0]
+
+    def _dispatch(self):
+        """Admit as many waiting tickets as the capacity allows.
+
+        The caller must hold the scheduler lock. Waiters are notified when
+        any ticket is admitted.
+
+        :returns: the number of seconds until the budget refills if tickets
+            are blocked by it (``None`` == not blocked by the budget)
+        :rtype: float
+        """
+        retry_after = None
+        admitted = 0
+        while True:
+            ticket = self._next_ticket()
+            if ticket is None:
+                break
+            if self._max_in_flight is not None:
+                if self._in_flight >= self._max_in_flight:
+                    break
+            if self._bucket is not None and not self._bucket.try_acquire():
+                retry_after = (1 - self._bucket.level) / self._bucket.rate
+                break
+
+            self._queues[ticket.priority].popleft()
+            self._in_flight += 1
+            ticket.granted = True
+
+            wait = time.time() - ticket.enqueued_at
+            stats = self._stats[ticket.priority]
+            stats['requests'] += 1
+            stats['total_wait'] += wait
+            stats['max_wait'] = max(stats['max_wait'], wait)
+            admitted += 1
+
+        if admitted:
+            self._cond.notify_all()
+        return retry_after
+
+    def _abandon(self, ticket):
+        """Give up the ticket of a request which stopped waiting, e.g. on
+        cancellation, freeing its capacity if it was already admitted.
+
+        The caller must hold the scheduler lock.
+
+        :param ticket: the ticket given up
+        :type ticket: quadriga.scheduler._Ticket
+        """
+        if ticket.granted:
+            self._in_flight -= 1
+        else:
+            self._queues[ticket.priority].remove(ticket)
+        self._dispatch()
+
+    def acquire(self, priority):
+        """Block until the request is admitted.
+
+        :param priority: the priority class of the request
+        :type priority: int
+        """
+        ticket = _Ticket(priority)
+        with self._cond:
+            self._queues[priority].append(ticket)
+            try:
+                while True:
+                    retry_after = self._dispatch()
+                    if ticket.granted:
+                        return
+                    self._cond.wait(retry_after)
+            except BaseException:
+                self._abandon(ticket)
+                raise
+
+    def release(self):
+        """Free the capacity used by a request which has completed."""
+        with self._cond:
+            self._in_flight -= 1
+            self._dispatch()
+
+    def stats(self):
+        """Return the queue-wait statistics by priority class.
+
+        :returns: the number of requests admitted, the number of requests
+            waiting, and the mean and maximum wait in seconds by class name
+        :rtype: dict
+        """
+        with self._lock:
+            return {
+                priority_names[priority]: {
+                    'requests': stats['requests'],
+                    'queued': len(self._queues[priority]),
+                    'mean_wait':
+                        stats['total_wait'] / (stats['requests'] or 1),
+                    'max_wait': stats['max_wait'],
+                }
+                for priority, stats in self._stats.items()
+            }
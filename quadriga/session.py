@@ -0,0 +1,66 @@
+from __future__ import absolute_import, unicode_literals
+
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from quadriga.tracing import trace_connections
+
+
+class PooledSession(requests.Session):
+    """HTTP session which keeps connections to QuadrigaCX alive and pooled.
+
+    A single session can be shared by multiple clients so that they reuse
+    the same TCP/TLS connections instead of opening new ones per request.
+
+    :param pool_connections: the number of per-host connection pools to cache
+    :type pool_connections: int
+    :param pool_maxsize: the maximum number of connections kept per host
+    :type pool_maxsize: int
+    :param pool_block: block when no free connection is available for a host
+        instead of opening a temporary one
+    :type pool_block: bool
+    :param idle_timeout: the number of seconds the session may stay unused
+        before its pooled connections are dropped (``None`` == never)
+    :type idle_timeout: int | float
+    """
+
+    def __init__(self,
+                 pool_connections=10,
+                 pool_maxsize=10,
+                 pool_block=False,
+                 idle_timeout=None):
+        super(PooledSession, self).__init__()
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block
+        )
+        trace_connections(adapter.poolmanager)
+        self.mount('https://', adapter)
+        self.mount('http://', adapter)
+        self.idle_timeout = idle_timeout
+        self._last_used = None
+
+    def _drop_idle_connections(self):
+        """Close the pooled connections if the idle timeout has expired."""
+        if self.idle_timeout is None or self._last_used is None:
+            return
+        if time.time() - self._last_used > self.idle_timeout:
+            self.close()
+
+    def request(self, *args, **kwargs):
+        """Send a request using a pooled connection.
+
+        Stale connections are dropped first so that the exchange does not
+        reset them halfway through the request.
+
+        :returns: the response from the server
+        :rtype: requests.models.Response
+        """
+        self._drop_idle_connections()
+        try:
+            return super(PooledSession, self).request(*args, **kwargs)
+        finally:
+            self._last_used = time.time()
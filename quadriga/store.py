@@ -0,0 +1,188 @@
+from __future__ import absolute_import, unicode_literals
+
+import json
+import sqlite3
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from quadriga.models import Model
+
+_datetime_format = '%Y-%m-%d %H:%M:%S'
+
+_schema = '''
+CREATE TABLE IF NOT EXISTS trades (
+    account TEXT NOT NULL,
+    book TEXT NOT NULL,
+    id TEXT NOT NULL,
+    datetime TEXT NOT NULL,
+    order_id TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (account, book, id)
+);
+CREATE INDEX IF NOT EXISTS trades_datetime
+    ON trades (account, book, datetime);
+CREATE INDEX IF NOT EXISTS trades_order_id
+    ON trades (order_id);
+'''
+
+
+def _json_default(value):
+    """Serialize the decimals of a trade (e.g. parsed by
+    :class:`quadriga.JsonDecoder`) as strings, like QuadrigaCX sends them.
+
+    :param value: the value not serializable by default
+    :type value: object
+    :returns: the decimal string
+    :rtype: str | unicode
+    :raises TypeError: if the value is not a decimal
+    """
+    if isinstance(value, Decimal):
+        return '{:f}'.format(value)
+    raise TypeError('{!r} is not JSON serializable'.format(value))
+
+
+class TradeStore(object):
+    """Local SQLite store of the user's completed trades.
+
+    Trades are stored by account (client ID) and order book, and indexed by
+    date and time and by order ID so that they can be queried without going
+    through the API. Each sync only fetches the trades completed after the
+    latest one stored.
+
+    :param path: the path to the SQLite database (created if missing)
+    :type path: str | unicode
+    """
+
+    def __init__(self, path):
+        self._conn = sqlite3.connect(path)
+        self._conn.executescript(_schema)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def close(self):
+        """Close the database connection."""
+        self._conn.close()
+
+    def latest(self, account, book):
+        """Return the latest trade stored for the account and order book.
+
+        :param account: the QuadrigaCX client ID
+        :type account: str | unicode
+        :param book: the name of the order book
+        :type book: str | unicode
+        :returns: the latest trade (``None`` == no trades stored)
+        :rtype: dict
+        """
+        row = self._conn.execute(
+            'SELECT data FROM trades WHERE account = ? AND book = ? '
+            'ORDER BY datetime DESC, id DESC LIMIT 1',
+            (str(account), book)
+        ).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def upsert(self, account, book, trades):
+        """Insert the trades, replacing the ones already stored.
+
+        :param account: the QuadrigaCX client ID
+        :type account: str | unicode
+        :param book: the name of the order book
+        :type book: str | unicode
+        :param trades: the user's completed trades
+        :type trades: collections.Iterable
+        :returns: the number of trades upserted
+        :rtype: int
+        """
+        trades = (
+            trade.as_dict() if isinstance(trade, Model) else trade
+            for trade in trades
+        )
+        rows = (
+            (
+                str(account),
+                book,
+                str(trade['id']),
+                trade['datetime'],
+                trade.get('order_id'),
+                json.dumps(trade, sort_keys=True, default=_json_default)
+            )
+            for trade in trades
+        )
+        with self._conn:
+            cursor = self._conn.executemany(
+                'INSERT OR REPLACE INTO trades '
+                '(account, book, id, datetime, order_id, data) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                rows
+            )
+        return cursor.rowcount
+
+    def sync(self, client, books=None, page_size=100):
+        """Fetch and store the trades completed since the latest one stored.
+
+        :param client: the QuadrigaCX client
+        :type client: quadriga.QuadrigaClient
+        :param books: the names of the order books (``None`` == all)
+        :type books: [str | unicode]
+        :param page_size: the number of trades fetched per request
+        :type page_size: int
+        :returns: the number of trades upserted by order book
+        :rtype: dict
+        :raises InvalidOrderBookError: on invalid order book name
+        """
+        account = client.client_id
+        counts = {}
+        for book in client._verify_books(books):
+            latest = self.latest(account, book)
+            since = since_id = None
+            if latest is not None:
+                # Stop at the latest trade stored, or just before its time
+                # should it no longer be listed (trades fetched again are
+                # replaced by the upsert)
+                since_id = latest['id']
+                since = (datetime.strptime(
+                    latest['datetime'], _datetime_format
+                ) - timedelta(seconds=1)).strftime(_datetime_format)
+            # Trades are stored as QuadrigaCX sends them, whatever the
+            # conversions of the client
+            trades = client._iter_trades(
+                book, page_size, since, since_id, raw=True
+            )
+            counts[book] = self.upsert(account, book, trades)
+        return counts
+
+    def trades(self, account, book, start=None, end=None, order_id=None):
+        """Return the stored trades, earliest first.
+
+        :param account: the QuadrigaCX client ID
+        :type account: str | unicode
+        :param book: the name of the order book
+        :type book: str | unicode
+        :param start: the earliest date and time (inclusive)
+        :type start: str | unicode
+        :param end: the latest date and time (exclusive)
+        :type end: str | unicode
+        :param order_id: the ID of the order the trades belong to
+        :type order_id: str | unicode
+        :returns: the stored trades
+        :rtype: [dict]
+        """
+        query = 'SELECT data FROM trades WHERE account = ? AND book = ?'
+        params = [str(account), book]
+        if start is not None:
+            query += ' AND datetime >= ?'
+            params.append(start)
+        if end is not None:
+            query += ' AND datetime < ?'
+            params.append(end)
+        if order_id is not None:
+            query += ' AND order_id = ?'
+            params.append(order_id)
+        query += ' ORDER BY datetime, id'
+        return [
+            json.loads(row[0])
+            for row in self._conn.execute(query, params)
+        ]
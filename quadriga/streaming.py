@@ -0,0 +1,184 @@
+from __future__ import absolute_import, unicode_literals
+
+import json
+import re
+
+# Key of a top-level field of an order book response
+_key = re.compile(br'"(bids|asks|timestamp|error)"\s*:\s*')
+
+# Value of the timestamp field
+_timestamp = re.compile(br'"?([0-9]+)"?')
+
+# Price level, i.e. an array starting with the price and the amount
+_level = re.compile(
+    br'\s*,?\s*\[\s*"?([^",\]\s]+)"?\s*,\s*"?([^",\]\s]+)"?[^\]]*\]'
+)
+
+# End of an array of price levels
+_end = re.compile(br'\s*\]')
+
+# Next character of an array of price levels after a level
+_next = re.compile(br'\s*(\S)')
+
+# End of the last level and of the array, after skipped levels
+_rest = re.compile(br'\]\s*\]')
+
+
+class StreamedResponse(object):
+    """Summary of a streamed response from QuadrigaCX whose body was only
+    partially read.
+
+    It mirrors the attributes of :class:`requests.models.Response` used by
+    :class:`quadriga.exceptions.RequestError`.
+
+    :param response: the streamed response from QuadrigaCX
+    :type response: requests.models.Response
+    :param text: the part of the response body kept
+    :type text: str | unicode
+    """
+
+    def __init__(self, response, text):
+        self.url = str(response.url)
+        self.headers = response.headers
+        self.status_code = response.status_code
+        self.reason = response.reason
+        self.text = text
+
+
+class OrderBookParser(object):
+    """Incremental parser of :func:`get_public_orders` response bodies which
+    stops after a number of price levels per side.
+
+    Chunks of the body are fed as they are received. Once both sides have
+    been parsed up to the depth, the rest of the body is not needed. Levels
+    past the depth are skipped without being parsed, and the consumed part
+    of the body is discarded, so memory usage is bounded by the chunk size.
+
+    :param depth: the maximum number of price levels per side
+    :type depth: int
+    :raises ValueError: if the depth is less than 1
+    """
+
+    def __init__(self, depth):
+        if depth < 1:
+            raise ValueError('invalid depth: {}'.format(depth))
+        self._depth = depth
+        self._buffer = b''
+        self._side = None
+        self._skipping = None
+        self._raw = None
+        self._sides_done = set()
+        self._result = {'bids': [], 'asks': []}
+
+    @property
+    def done(self):
+        """Return True if both sides have been parsed up to the depth.
+
+        :returns: whether the rest of the body is not needed
+        :rtype: bool
+        """
+        return len(self._sides_done) == 2
+
+    def feed(self, chunk):
+        """Parse the next chunk of the response body.
+
+        :param chunk: the next chunk of the response body
+        :type chunk: bytes
+        :returns: whether the rest of the body is not needed
+        :rtype: bool
+        """
+        if self._raw is not None:
+            self._raw.append(chunk)
+            return False
+        self._buffer += chunk
+        pos = 0
+        while not self.done:
+            if self._side is None:
+                match = _key.search(self._buffer, pos)
+                if match is None or match.end() == len(self._buffer):
+                    break
+                key = match.group(1)
+                if key == b'error':
+                    # Error responses are decoded in full
+                    self._raw = [self._buffer]
+                    return False
+                if key == b'timestamp':
+                    value = _timestamp.match(self._buffer, match.end())
+                    if value is None or value.end() == len(self._buffer):
+                        break
+                    self._result['timestamp'] = value.group(1).decode()
+                    pos = value.end()
+                    continue
+                start = self._buffer.find(b'[', match.end())
+                if start < 0:
+                    break
+                self._side = key.decode()
+                pos = start + 1
+            elif self._skipping:
+                if self._skipping == 'next':
+                    match = _next.match(self._buffer, pos)
+                    if match is None:
+                        break
+                    if match.group(1) == b']':
+                        self._end_side()
+                    else:
+                        self._skipping = 'rest'
+                    pos = match.end()
+                    continue
+                match = _rest.search(self._buffer, pos)
+                if match is None:
+                    # Keep the last level end, which may be followed by the
+                    # end of the array in the next chunk
+                    pos = max(pos, self._buffer.rfind(b']'))
+                    break
+                self._end_side()
+                pos = match.end()
+            else:
+                end = _end.match(self._buffer, pos)
+                if end is not None:
+                    self._end_side()
+                    pos = end.end()
+                    continue
+                match = _level.match(self._buffer, pos)
+                if match is None:
+                    break
+                levels = self._result[self._side]
+                levels.append([
+                    match.group(1).decode(), match.group(2).decode()
+                ])
+                pos = match.end()
+                if len(levels) == self._depth:
+                    self._skipping = 'next'
+        self._buffer = self._buffer[pos:]
+        return self.done
+
+    def _end_side(self):
+        """Mark the side being parsed as complete."""
+        self._sides_done.add(self._side)
+        self._side = None
+        self._skipping = None
+
+    @property
+    def text(self):
+        """Return the response body kept in full, i.e. of an error response.
+
+        :returns: the response body (empty if not kept)
+        :rtype: str | unicode
+        """
+        if self._raw is None:
+            return ''
+        return b''.join(self._raw).decode('utf-8', 'replace')
+
+    def result(self):
+        """Return the response body parsed so far.
+
+        :returns: the ``"timestamp"``, and the ``"bids"`` and ``"asks"`` up
+            to the depth (or the whole body of an error response)
+        :rtype: dict
+        :raises ValueError: if the body ended before both sides were parsed
+        """
+        if self._raw is not None:
+            return json.loads(self.text)
+        if not self.done:
+            raise ValueError('incomplete order book response')
+        return self._result
@@ -0,0 +1,195 @@
+from __future__ import absolute_import, unicode_literals
+
+import contextlib
+import threading
+
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from quadriga.metrics import clock
+
+# Phases of a request, in order
+PHASES = (
+    'queue',       # Waiting for the scheduler and the rate limiter
+    'sign',        # Computing the HMAC signature
+    'connect',     # Resolving the host and opening a TCP connection
+    'tls',         # TLS handshake
+    'first_byte',  # Sending the request until the response headers arrive
+    'download',    # Reading the response body
+    'decode',      # Decoding and checking the JSON response body
+)
+
+# Trace of the request being sent by the current thread, for the phases
+# measured by the connection pools
+_local = threading.local()
+
+
+class RequestTrace(object):
+    """Time spent in each phase of a request to QuadrigaCX, in seconds.
+
+    Phases which did not happen are left out, e.g. ``"connect"`` and
+    ``"tls"`` when a pooled connection was reused, or ``"sign"`` for public
+    API calls. See :data:`quadriga.tracing.PHASES`.
+    """
+
+    __slots__ = ('phases',)
+
+    def __init__(self):
+        self.phases = {}
+
+    def __repr__(self):
+        return '<RequestTrace {}>'.format(' '.join(
+            '{}={:.6f}'.format(phase, self.phases[phase])
+            for phase in PHASES if phase in self.phases
+        ))
+
+    def add(self, phase, seconds):
+        """Add time spent in a phase.
+
+        :param phase: the name of the phase
+        :type phase: str | unicode
+        :param seconds: the time spent
+        :type seconds: float
+        """
+        self.phases[phase] = self.phases.get(phase, 0.0) + max(seconds, 0.0)
+
+    @property
+    def total(self):
+        """Return the time spent in all phases.
+
+        :returns: the time in seconds
+        :rtype: float
+        """
+        return sum(self.phases.values())
+
+
+class TracedDict(dict):
+    """JSON object response with the trace of its request."""
+
+    __slots__ = ('trace',)
+
+
+class TracedList(list):
+    """JSON array response with the trace of its request."""
+
+    __slots__ = ('trace',)
+
+
+def attach(value, trace):
+    """Attach the trace to a response or an error.
+
+    :param value: the response or the error
+    :type value: dict | list | Exception
+    :param trace: the trace of the request
+    :type trace: quadriga.tracing.RequestTrace
+    :returns: the response with a ``trace`` attribute (a copy for
+        dictionaries and lists), or the value as is if it cannot have one
+    :rtype: dict | list | Exception
+    """
+    if type(value) is dict:
+        value = TracedDict(value)
+    elif type(value) is list:
+        value = TracedList(value)
+    try:
+        value.trace = trace
+    except AttributeError:
+        pass
+    return value
+
+
+def convert(response, func):
+    """Apply a function to a response, keeping its trace if any.
+
+    :param response: the JSON response body from QuadrigaCX
+    :type response: dict | list
+    :param func: the function converting the response
+    :type func: callable
+    :returns: the converted response
+    :rtype: dict | list
+    """
+    result = func(response)
+    trace = getattr(response, 'trace', None)
+    return result if trace is None else attach(result, trace)
+
+
+@contextlib.contextmanager
+def activate(trace):
+    """Make the trace the one of the current thread, so that connection
+    pools can add the connection phases to it.
+
+    :param trace: the trace of the request
+    :type trace: quadriga.tracing.RequestTrace
+    """
+    _local.trace = trace
+    try:
+        yield trace
+    finally:
+        _local.trace = None
+
+
+def _add_to_current(phase, seconds):
+    """Add time spent in a phase to the trace of the current thread.
+
+    :param phase: the name of the phase
+    :type phase: str | unicode
+    :param seconds: the time spent
+    :type seconds: float
+    """
+    trace = getattr(_local, 'trace', None)
+    if trace is not None:
+        trace.add(phase, seconds)
+
+
+class _TracedConnectionMixin(object):
+    """Measure the time spent opening connections."""
+
+    _connect_time = 0.0
+
+    def _new_conn(self):
+        start = clock()
+        try:
+            return super(_TracedConnectionMixin, self)._new_conn()
+        finally:
+            self._connect_time = clock() - start
+            _add_to_current('connect', self._connect_time)
+
+
+class TracedHTTPConnection(_TracedConnectionMixin, HTTPConnection):
+    """HTTP connection measuring the time spent connecting."""
+
+
+class TracedHTTPSConnection(_TracedConnectionMixin, HTTPSConnection):
+    """HTTPS connection measuring the time spent connecting and in the TLS
+    handshake."""
+
+    def connect(self):
+        start = clock()
+        self._connect_time = 0.0
+        try:
+            return super(TracedHTTPSConnection, self).connect()
+        finally:
+            _add_to_current('tls', clock() - start - self._connect_time)
+
+
+class TracedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TracedHTTPConnection
+
+
+class TracedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TracedHTTPSConnection
+
+
+def trace_connections(pool_manager):
+    """Make a :class:`urllib3.PoolManager` measure the time spent opening
+    connections, for the requests sent with an active trace.
+
+    :param pool_manager: the pool manager
+    :type pool_manager: urllib3.PoolManager
+    :returns: the pool manager
+    :rtype: urllib3.PoolManager
+    """
+    pool_manager.pool_classes_by_scheme = {
+        'http': TracedHTTPConnectionPool,
+        'https': TracedHTTPSConnectionPool,
+    }
+    return pool_manager
@@ -0,0 +1,387 @@
+from __future__ import absolute_import, unicode_literals
+
+import json
+from datetime import timedelta
+
+import requests
+import urllib3
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+from quadriga.metrics import clock
+from quadriga.session import PooledSession
+from quadriga.tracing import trace_connections
+
+
+class Response(object):
+    """HTTP response from QuadrigaCX received by a transport other than
+    :mod:`requests`.
+
+    It mirrors the attributes of :class:`requests.models.Response` used by
+    :class:`quadriga.protocol.Protocol` and the streaming parser.
+
+    :param status_code: the HTTP status code
+    :type status_code: int
+    :param reason: the HTTP reason phrase
+    :type reason: str | unicode
+    :param url: the URL of the request
+    :type url: str | unicode
+    :param headers: the response headers
+    :type headers: dict
+    :param content: the response body, if read in full
+    :type content: bytes
+    :param chunks: the function returning an iterator over the chunks of a
+        streamed response body, given the chunk size
+    :type chunks: callable
+    :param close: the function releasing the connection of a streamed
+        response
+    :type close: callable
+    :param elapsed: the time from sending the request until the response
+        headers arrived
+    :type elapsed: datetime.timedelta
+    """
+
+    def __init__(self,
+                 status_code,
+                 reason,
+                 url,
+                 headers,
+                 content=None,
+                 chunks=None,
+                 close=None,
+                 elapsed=None):
+        self.status_code = status_code
+        self.reason = reason
+        self.url = url
+        self.headers = headers
+        self._content = content
+        self._chunks = chunks
+        self._close = close
+        self.elapsed = elapsed
+
+    @property
+    def content(self):
+        """Return the response body, reading the rest of the stream first.
+
+        :returns: the response body
+        :rtype: bytes
+        """
+        if self._content is None:
+            self._content = b''.join(self.iter_content(65536))
+            self.close()
+        return self._content
+
+    @property
+    def text(self):
+        """Return the response body decoded as UTF-8.
+
+        :returns: the response body
+        :rtype: str | unicode
+        """
+        return self.content.decode('utf-8', 'replace')
+
+    def json(self):
+        """Return the JSON-decoded response body.
+
+        :returns: the JSON response body
+        :rtype: dict
+        :raises ValueError: if the body is not valid JSON
+        """
+        return json.loads(self.text)
+
+    def iter_content(self, chunk_size):
+        """Iterate over the chunks of the response body.
+
+        :param chunk_size: the number of bytes read at a time
+        :type chunk_size: int
+        :returns: the chunks of the response body
+        :rtype: collections.Iterator
+        """
+        if self._content is not None:
+            return iter([
+                self._content[i:i + chunk_size]
+                for i in range(0, len(self._content), chunk_size)
+            ])
+        return self._chunks(chunk_size)
+
+    def close(self):
+        """Release the connection of a streamed response."""
+        if self._close is not None:
+            self._close()
+            self._close = None
+
+
+class Transport(object):
+    """Base class of the transports sending requests built by
+    :class:`quadriga.protocol.Protocol`."""
+
+    # Errors raised by the transport which are treated as transient
+    transient_errors = ()
+
+    def send(self, request):
+        """Send the request.
+
+        :param request: the request to send
+        :type request: quadriga.protocol.Request
+        :returns: the response from QuadrigaCX
+        :rtype: requests.models.Response | quadriga.transport.Response
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """Close the connections owned by the transport."""
+
+
+class RequestsTransport(Transport):
+    """Transport sending requests with a :class:`requests.Session`.
+
+    :param session: the HTTP session (a new
+        :class:`quadriga.session.PooledSession` is created if not set)
+    :type session: requests.Session
+    """
+
+    transient_errors = (requests.ConnectionError, requests.Timeout)
+
+    def __init__(self, session=None):
+        self._owns_session = session is None
+        self.session = PooledSession() if session is None else session
+
+    def send(self, request):
+        """Send the request.
+
+        :param request: the request to send
+        :type request: quadriga.protocol.Request
+        :returns: the response from QuadrigaCX
+        :rtype: requests.models.Response
+        """
+        if request.body is not None:
+            return self.session.post(
+                url=request.url, data=request.body, headers=request.headers
+            )
+        if request.method == 'POST':
+            return self.session.post(url=request.url, json=request.json)
+        if request.stream:
+            return self.session.get(
+                url=request.url, params=request.params, stream=True
+            )
+        return self.session.get(url=request.url, params=request.params)
+
+    def close(self):
+        """Close the session if it was created by the transport.
+
+        Sessions passed in by the caller are shared and left open.
+        """
+        if self._owns_session:
+            self.session.close()
+
+
+class Urllib3Transport(Transport):
+    """Transport sending requests with a :class:`urllib3.PoolManager`,
+    without the overhead of :mod:`requests`.
+
+    :param pool_manager: the connection pool manager (a new one is created
+        with **pool_kwargs** if not set)
+    :type pool_manager: urllib3.PoolManager
+    :param pool_kwargs: the parameters of the new pool manager, e.g.
+        ``maxsize`` and ``timeout``
+    """
+
+    transient_errors = (
+        urllib3.exceptions.NewConnectionError,
+        urllib3.exceptions.ProtocolError,
+        urllib3.exceptions.TimeoutError,
+    )
+
+    # Headers of the requests with a JSON payload
+    json_headers = {'Content-Type': 'application/json'}
+
+    def __init__(self, pool_manager=None, **pool_kwargs):
+        self._owns_pool_manager = pool_manager is None
+        if pool_manager is None:
+            pool_manager = urllib3.PoolManager(**pool_kwargs)
+            trace_connections(pool_manager)
+        self.pool_manager = pool_manager
+
+    def send(self, request):
+        """Send the request.
+
+        :param request: the request to send
+        :type request: quadriga.protocol.Request
+        :returns: the response from QuadrigaCX
+        :rtype: quadriga.transport.Response
+        """
+        start = clock()
+        if request.method == 'POST':
+            body = request.body
+            if body is None:
+                body = json.dumps(request.json).encode('utf-8')
+            response = self.pool_manager.request(
+                'POST',
+                request.url,
+                body=body,
+                headers=request.headers or self.json_headers,
+                retries=False,
+                preload_content=False
+            )
+        else:
+            response = self.pool_manager.request(
+                request.method,
+                request.url,
+                fields=request.params,
+                retries=False,
+                preload_content=False
+            )
+        elapsed = timedelta(seconds=clock() - start)
+        if not request.stream:
+            try:
+                content = response.read()
+            finally:
+                response.release_conn()
+            return Response(
+                response.status,
+                response.reason,
+                request.url,
+                response.headers,
+                content=content,
+                elapsed=elapsed
+            )
+        return Response(
+            response.status,
+            response.reason,
+            request.url,
+            response.headers,
+            chunks=response.stream,
+            close=response.release_conn,
+            elapsed=elapsed
+        )
+
+    def close(self):
+        """Close the pool manager if it was created by the transport."""
+        if self._owns_pool_manager:
+            self.pool_manager.clear()
+
+
+class HttpxTransport(Transport):
+    """Transport sending requests with a :class:`httpx.Client`, which can
+    multiplex them over a single HTTP/2 connection.
+
+    HTTP/2 requires the ``h2`` package (``pip install httpx[http2]``).
+
+    :param client: the HTTP client (a new one is created with
+        **client_kwargs** if not set)
+    :type client: httpx.Client
+    :param http2: enable HTTP/2 on the new client
+    :type http2: bool
+    :param client_kwargs: the other parameters of the new client
+    :raises ImportError: if httpx is not installed
+    """
+
+    transient_errors = (httpx.TransportError,) if httpx is not None else ()
+
+    def __init__(self, client=None, http2=True, **client_kwargs):
+        self._owns_client = client is None
+        if client is None:
+            if httpx is None:  # pragma: no cover
+                raise ImportError('httpx is required for HttpxTransport')
+            client = httpx.Client(http2=http2, **client_kwargs)
+        self.client = client
+
+    def send(self, request):
+        """Send the request.
+
+        :param request: the request to send
+        :type request: quadriga.protocol.Request
+        :returns: the response from QuadrigaCX
+        :rtype: quadriga.transport.Response
+        """
+        prepared = self.client.build_request(
+            request.method,
+            request.url,
+            params=request.params,
+            json=request.json,
+            content=request.body,
+            headers=request.headers
+        )
+        response = self.client.send(prepared, stream=request.stream)
+        if not request.stream:
+            return Response(
+                response.status_code,
+                response.reason_phrase,
+                request.url,
+                response.headers,
+                content=response.content
+            )
+        return Response(
+            response.status_code,
+            response.reason_phrase,
+            request.url,
+            response.headers,
+            chunks=lambda size: response.iter_bytes(size),
+            close=response.close
+        )
+
+    def close(self):
+        """Close the client if it was created by the transport."""
+        if self._owns_client:
+            self.client.close()
+
+
+class FakeTransport(Transport):
+    """In-memory transport serving canned responses, for tests and for
+    measuring the overhead of the client without a network.
+
+    Requests sent are recorded in :attr:`requests`. Endpoints without a
+    response return HTTP 404.
+
+    :param responses: the responses by HTTP method and endpoint, e.g.
+        ``{('GET', '/ticker'): {'last': '1234.50'}}`` (see :func:`add`)
+    :type responses: dict
+    """
+
+    def __init__(self, responses=None):
+        self.requests = []
+        self._responses = {}
+        for (method, endpoint), body in (responses or {}).items():
+            self.add(method, endpoint, body)
+
+    def add(self, method, endpoint, body, status_code=200, reason='OK'):
+        """Set the response of an API endpoint.
+
+        :param method: the HTTP method
+        :type method: str | unicode
+        :param endpoint: the API endpoint/path
+        :type endpoint: str | unicode
+        :param body: the JSON response body, the raw response body, or a
+            function returning the response given the request
+        :type body: dict | list | bytes | str | unicode | callable
+        :param status_code: the HTTP status code
+        :type status_code: int
+        :param reason: the HTTP reason phrase
+        :type reason: str | unicode
+        """
+        if not callable(body):
+            if isinstance(body, (dict, list)):
+                body = json.dumps(body)
+            if not isinstance(body, bytes):
+                body = body.encode('utf-8')
+        self._responses[method, endpoint] = (body, status_code, reason)
+
+    def send(self, request):
+        """Record the request and return its canned response.
+
+        :param request: the request to send
+        :type request: quadriga.protocol.Request
+        :returns: the response
+        :rtype: quadriga.transport.Response
+        """
+        self.requests.append(request)
+        key = request.method, request.endpoint
+        if key not in self._responses:
+            return Response(404, 'Not Found', request.url, {}, content=b'')
+        body, status_code, reason = self._responses[key]
+        if callable(body):
+            return body(request)
+        return Response(status_code, reason, request.url, {}, content=body)
@@ -13,7 +13,12 @@ setup(
     url='https://github.com/joowani/quadriga',
     packages=find_packages(),
     license='MIT',
-    install_requires=['requests'],
+    install_requires=['requests', 'futures; python_version < "3"'],
+    extras_require={
+        'async': ['aiohttp'],
+        'http2': ['httpx[http2]'],
+        'numpy': ['numpy']
+    },
     tests_require=['pytest', 'mock'],
     classifiers=[
         'Intended Audience :: Developers',
@@ -1,20 +1,89 @@
 from __future__ import absolute_import, unicode_literals
 
+import datetime
+import hashlib
+import hmac
+import json
+import threading
 import time
+from decimal import Decimal
 
 import mock
 import pytest
 import requests
 
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+except ImportError:  # pragma: no cover
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+
 from quadriga import QuadrigaClient
 from quadriga import RestClient
+from quadriga import PooledSession
+from quadriga import NonceGenerator, FileNonceGenerator
+from quadriga import ResponseCache
+from quadriga import RateLimiter, TokenBucket
+from quadriga import PriorityScheduler
+from quadriga import RetryPolicy
+from quadriga import OrderBook
+from quadriga import TradeStore
+from quadriga import TradeArchive, TradeArchiver
+from quadriga.archive import RecentIds, column_dtypes, column_path
+from quadriga import CandleAggregator
+from quadriga import order_arrays, trade_arrays
+from quadriga.arrays import vwap
+from quadriga import Balance, OpenOrder, PublicTrade, Ticker, UserTrade
+from quadriga import JsonDecoder
+from quadriga.decoder import scaled_int
+from quadriga import FixedPoint
+from quadriga.fixed import from_units, to_units
+from quadriga.streaming import OrderBookParser
+from quadriga.protocol import Protocol
+from quadriga import MetricsCollector
+from quadriga.metrics import LatencyHistogram
+from quadriga.transport import (
+    FakeTransport,
+    HttpxTransport,
+    RequestsTransport,
+    Response,
+    Urllib3Transport
+)
+from quadriga.scheduler import (
+    PRIORITY_CANCEL,
+    PRIORITY_ORDER,
+    PRIORITY_PRIVATE,
+    PRIORITY_PUBLIC
+)
 from quadriga.exceptions import (
     RequestError,
     InvalidCurrencyError,
-    InvalidOrderBookError
+    InvalidOrderBookError,
+    InvalidOrderError
 )
+from quadriga.rules import BookRules
+from quadriga.tracing import RequestTrace
 from quadriga.version import VERSION
 
+try:
+    import asyncio
+    import aiohttp
+    from quadriga import AsyncQuadrigaClient
+    from quadriga import AsyncPriorityScheduler
+    from quadriga.async_rest_client import AsyncRestClient
+except (ImportError, SyntaxError):
+    aiohttp = None
+
+requires_aiohttp = pytest.mark.skipif(
+    aiohttp is None, reason='requires aiohttp (Python 3.5+)'
+)
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+requires_numpy = pytest.mark.skipif(numpy is None, reason='requires numpy')
+
 test_key = 'test_api_key'
 test_secret = 'test_api_secret'
 test_client_id = 'test_client_id'
@@ -34,11 +103,21 @@ def patch_time_module(monkeypatch):
     monkeypatch.setattr(time, 'time', mock_time)
 
 
+@pytest.fixture
+def sleep(monkeypatch):
+    def mock_sleep(seconds):
+        time.time.return_value += seconds
+
+    mock_sleep = mock.MagicMock(side_effect=mock_sleep)
+    monkeypatch.setattr(time, 'sleep', mock_sleep)
+    return mock_sleep
+
+
 @pytest.fixture(autouse=True)
 def requests_get(monkeypatch):
     mock_get = mock.MagicMock()
     set_response(mock_get)
-    monkeypatch.setattr(requests, 'get', mock_get)
+    monkeypatch.setattr(requests.Session, 'get', mock_get)
     return mock_get
 
 
@@ -46,7 +125,7 @@ def requests_get(monkeypatch):
 def requests_post(monkeypatch):
     mock_post = mock.MagicMock()
     set_response(mock_post)
-    monkeypatch.setattr(requests, 'post', mock_post)
+    monkeypatch.setattr(requests.Session, 'post', mock_post)
     return mock_post
 
 
@@ -75,15 +154,24 @@ def build_url(path):
     return RestClient.endpoint_prefix + path
 
 
-def build_client(default_book=test_book):
+def build_client(default_book=test_book, **kwargs):
     return QuadrigaClient(
         api_key=test_key,
         api_secret=test_secret,
         client_id=test_client_id,
-        default_book=default_book
+        default_book=default_book,
+        **kwargs
     )
 
 
+def assert_logged(logger, message):
+    logged = [
+        args[0] % args[1] if len(args) > 1 else args[0]
+        for args, _ in logger.debug.call_args_list
+    ]
+    assert message in logged
+
+
 def test_client_init():
     with pytest.raises(InvalidOrderBookError):
         build_client('invalid_book')
@@ -107,6 +195,339 @@ def test_set_order_book():
         client.set_default_book('invalid_book')
 
 
+def test_client_session():
+    client = build_client()
+    assert isinstance(client.session, PooledSession)
+
+    shared = PooledSession(pool_connections=2, pool_maxsize=4)
+    client_1 = QuadrigaClient(session=shared)
+    client_2 = QuadrigaClient(session=shared)
+    assert client_1.session is client_2.session is shared
+    adapter = shared.get_adapter(test_url)
+    assert getattr(adapter, '_pool_connections') == 2
+    assert getattr(adapter, '_pool_maxsize') == 4
+
+
+def test_client_close(monkeypatch):
+    mock_close = mock.MagicMock()
+    monkeypatch.setattr(PooledSession, 'close', mock_close)
+
+    shared = PooledSession()
+    with QuadrigaClient(session=shared):
+        pass
+    assert mock_close.call_count == 0
+
+    with build_client():
+        pass
+    assert mock_close.call_count == 1
+
+
+def test_session_idle_timeout(monkeypatch):
+    mock_request = mock.MagicMock()
+    monkeypatch.setattr(requests.Session, 'request', mock_request)
+    mock_close = mock.MagicMock()
+    monkeypatch.setattr(PooledSession, 'close', mock_close)
+
+    session = PooledSession(idle_timeout=30)
+    session.request('GET', test_url)
+    session.request('GET', test_url)
+    assert mock_request.call_count == 2
+    assert mock_close.call_count == 0
+
+    time.time.return_value += 31
+    session.request('GET', test_url)
+    assert mock_close.call_count == 1
+
+
+def test_nonce_generator():
+    generator = NonceGenerator()
+    assert [generator.generate() for _ in range(3)] == [
+        test_nonce, test_nonce + 1, test_nonce + 2
+    ]
+    time.time.return_value += 1
+    assert generator.generate() == test_nonce + 1000
+
+
+def test_nonce_generator_threads():
+    from concurrent.futures import ThreadPoolExecutor
+
+    generator = NonceGenerator()
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        nonces = list(executor.map(lambda _: generator.generate(), range(500)))
+    assert sorted(nonces) == list(range(test_nonce, test_nonce + 500))
+
+
+def test_file_nonce_generator(tmpdir):
+    path = str(tmpdir.join('nonce'))
+    generator_1 = FileNonceGenerator(path)
+    generator_2 = FileNonceGenerator(path)
+    assert generator_1.generate() == test_nonce
+    assert generator_2.generate() == test_nonce + 1
+    assert generator_1.generate() == test_nonce + 2
+    assert FileNonceGenerator(path).generate() == test_nonce + 3
+
+    time.time.return_value += 1
+    assert generator_2.generate() == test_nonce + 1000
+
+
+def test_shared_nonce_generator(requests_post):
+    generator = NonceGenerator()
+    client_1 = QuadrigaClient(nonce_generator=generator)
+    client_2 = QuadrigaClient(nonce_generator=generator)
+    client_1.get_balance()
+    assert requests_post.call_args[1]['json']['nonce'] == test_nonce
+    client_2.get_balance()
+    assert requests_post.call_args[1]['json']['nonce'] == test_nonce + 1
+
+
+def test_token_bucket(sleep):
+    bucket = TokenBucket(rate=2, capacity=4)
+    assert bucket.rate == 2
+    assert bucket.capacity == 4
+    assert bucket.level == 4
+    assert [bucket.acquire() for _ in range(4)] == [0] * 4
+    assert bucket.level == 0
+    assert not bucket.try_acquire()
+
+    assert bucket.acquire() == 0.5
+    sleep.assert_called_once_with(0.5)
+    assert bucket.level == 0
+    assert bucket.reserve(2) == 1.0
+    assert bucket.level == -2
+
+    time.time.return_value += 10
+    assert bucket.level == 4
+    assert bucket.try_acquire(3)
+    assert bucket.level == 1
+
+    assert TokenBucket(rate=5).capacity == 5
+
+
+def test_rate_limiter(requests_get, requests_post, sleep):
+    limiter = RateLimiter(public=TokenBucket(rate=1, capacity=2))
+    client = QuadrigaClient(rate_limiter=limiter, coalesce=False)
+    client.get_summary()
+    client.get_summary()
+    assert sleep.call_count == 0
+    client.get_summary()
+    sleep.assert_called_once_with(1.0)
+    assert requests_get.call_count == 3
+
+    for _ in range(5):
+        client.get_balance()
+    assert sleep.call_count == 1
+    assert limiter.levels() == {'public': 0, 'private': None}
+
+    shared = TokenBucket(rate=10)
+    limiter = RateLimiter(public=shared, private=shared)
+    client = QuadrigaClient(rate_limiter=limiter)
+    client.get_summary()
+    client.get_balance()
+    assert limiter.levels() == {'public': 8, 'private': 8}
+
+
+def start_waiting(scheduler, priority, admitted):
+    import threading
+
+    def wait():
+        scheduler.acquire(priority)
+        admitted.append(priority)
+        scheduler.release()
+
+    queued = scheduler.stats()[priority_name(priority)]['queued']
+    thread = threading.Thread(target=wait)
+    thread.start()
+    while scheduler.stats()[priority_name(priority)]['queued'] == queued:
+        time.sleep(0.001)
+    return thread
+
+
+def priority_name(priority):
+    from quadriga.scheduler import priority_names
+    return priority_names[priority]
+
+
+def test_priority_scheduler():
+    scheduler = PriorityScheduler(max_in_flight=1)
+    scheduler.acquire(PRIORITY_PUBLIC)
+    admitted = []
+    threads = [
+        start_waiting(scheduler, priority, admitted)
+        for priority in (PRIORITY_PUBLIC, PRIORITY_PRIVATE,
+                         PRIORITY_PUBLIC, PRIORITY_ORDER, PRIORITY_CANCEL)
+    ]
+    time.time.return_value += 2
+    scheduler.release()
+    for thread in threads:
+        thread.join()
+    assert admitted == [
+        PRIORITY_CANCEL,
+        PRIORITY_ORDER,
+        PRIORITY_PRIVATE,
+        PRIORITY_PUBLIC,
+        PRIORITY_PUBLIC
+    ]
+    stats = scheduler.stats()
+    assert stats['public'] == {
+        'requests': 3, 'queued': 0, 'mean_wait': 4 / 3.0, 'max_wait': 2
+    }
+    assert stats['cancel'] == {
+        'requests': 1, 'queued': 0, 'mean_wait': 2, 'max_wait': 2
+    }
+
+
+def test_priority_scheduler_starvation():
+    scheduler = PriorityScheduler(
+        max_in_flight=1,
+        max_wait={PRIORITY_PUBLIC: 5}
+    )
+    scheduler.acquire(PRIORITY_PRIVATE)
+    admitted = []
+    threads = [start_waiting(scheduler, PRIORITY_PUBLIC, admitted)]
+    time.time.return_value += 6
+    threads.append(start_waiting(scheduler, PRIORITY_CANCEL, admitted))
+    scheduler.release()
+    for thread in threads:
+        thread.join()
+    assert admitted == [PRIORITY_PUBLIC, PRIORITY_CANCEL]
+
+
+def test_priority_scheduler_budget():
+    scheduler = PriorityScheduler(bucket=TokenBucket(rate=20, capacity=1))
+    scheduler.acquire(PRIORITY_PUBLIC)
+    scheduler.release()
+    admitted = []
+    thread = start_waiting(scheduler, PRIORITY_PUBLIC, admitted)
+    assert admitted == []
+    time.time.return_value += 1
+    thread.join()
+    assert admitted == [PRIORITY_PUBLIC]
+
+
+def test_client_scheduler(requests_post):
+    scheduler = mock.MagicMock()
+    client = QuadrigaClient(scheduler=scheduler)
+    client.cancel_order('foobar')
+    scheduler.acquire.assert_called_with(PRIORITY_CANCEL)
+    client.buy_limit_order(1, 2)
+    scheduler.acquire.assert_called_with(PRIORITY_ORDER)
+    client.sell_market_order(1)
+    scheduler.acquire.assert_called_with(PRIORITY_ORDER)
+    client.lookup_order('foobar')
+    scheduler.acquire.assert_called_with(PRIORITY_PRIVATE)
+    client.get_summary()
+    scheduler.acquire.assert_called_with(PRIORITY_PUBLIC)
+    assert scheduler.release.call_count == 5
+
+    set_response(requests_post, code=500)
+    with pytest.raises(RequestError):
+        client.cancel_order('foobar')
+    assert scheduler.release.call_count == 6
+
+
+def test_retry_policy(monkeypatch):
+    policy = RetryPolicy(
+        backoff=0.1, multiplier=3, max_backoff=1, jitter=False
+    )
+    assert [policy.backoff_delay(n) for n in range(1, 5)] == [
+        0.1, 0.1 * 3, 0.1 * 9, 1
+    ]
+    mock_uniform = mock.MagicMock(return_value=0.05)
+    monkeypatch.setattr('random.uniform', mock_uniform)
+    policy.jitter = True
+    assert policy.backoff_delay(2) == 0.05
+    mock_uniform.assert_called_with(0, 0.1 * 3)
+
+    assert policy.hedge_delay() is None
+    policy = RetryPolicy(hedge_percentile=90, hedge_min_samples=10)
+    for latency in range(1, 10):
+        policy.record_latency(latency / 10.0)
+    assert policy.hedge_delay() is None
+    policy.record_latency(1.0)
+    assert policy.hedge_delay() == 0.9
+
+
+def test_client_retry(requests_get, requests_post, sleep):
+    ok_response = requests_get.return_value
+    error_response = set_response(mock.MagicMock(), code=502)
+    requests_get.side_effect = [
+        error_response, requests.ConnectionError(), ok_response
+    ]
+    policy = RetryPolicy(max_attempts=3, backoff=1, jitter=False)
+    client = QuadrigaClient(retry_policy=policy)
+    assert client.get_summary() == test_body
+    assert requests_get.call_count == 3
+    assert sleep.call_args_list == [mock.call(1), mock.call(2)]
+
+    requests_get.side_effect = [error_response] * 3
+    with pytest.raises(RequestError):
+        client.get_summary()
+    assert requests_get.call_count == 6
+
+    requests_get.side_effect = [set_response(mock.MagicMock(), code=400)]
+    with pytest.raises(RequestError):
+        client.get_summary()
+    assert requests_get.call_count == 7
+
+    set_response(requests_post, code=503)
+    with pytest.raises(RequestError):
+        client.buy_limit_order(1, 1)
+    with pytest.raises(RequestError):
+        client.withdraw('bitcoin', 1, test_address)
+    assert requests_post.call_count == 2
+
+    requests_post.side_effect = [
+        set_response(mock.MagicMock(), code=503),
+        set_response(mock.MagicMock())
+    ]
+    assert client.lookup_order('foobar') == test_body
+    assert requests_post.call_count == 4
+    nonces = [c[1]['json']['nonce'] for c in requests_post.call_args_list]
+    assert nonces[-1] > nonces[-2]
+
+
+def test_client_hedge(requests_get):
+    release = threading.Event()
+    slow_response = set_response(mock.MagicMock(), body={'slow': True})
+
+    def get(url, params):
+        if requests_get.call_count == 1:
+            release.wait()
+            return slow_response
+        return requests_get.return_value
+
+    requests_get.side_effect = get
+    policy = RetryPolicy(hedge_percentile=50, hedge_min_samples=1)
+    policy.record_latency(0.05)
+    client = QuadrigaClient(retry_policy=policy)
+    assert client.get_summary() == test_body
+    assert requests_get.call_count == 2
+    release.set()
+    rest_client = client._rest_client
+    executor = rest_client._get_hedge_executor()
+    assert executor._max_workers == 8
+
+    client.close()
+    assert rest_client._hedge_executor is None
+
+    policy = RetryPolicy(hedge_workers=2)
+    rest_client = RestClient(retry_policy=policy)
+    executors = []
+    threads = [
+        threading.Thread(
+            target=lambda: executors.append(rest_client._get_hedge_executor())
+        )
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert executors == executors[:1] * 4
+    assert executors[0]._max_workers == 2
+    rest_client.close()
+
+
 def test_get_summary(requests_get, logger):
     client = build_client()
     output = client.get_summary()
@@ -115,7 +536,8 @@ def test_get_summary(requests_get, logger):
         url=build_url('/ticker'),
         params={'book': test_book}
     )
-    logger.debug.assert_called_with(
+    assert_logged(
+        logger,
         '[client: test_client_id] get trading summary for btc_usd')
     with pytest.raises(InvalidOrderBookError):
         client.get_summary(book='invalid_book')
@@ -125,7 +547,7 @@ def test_request_fail_1(monkeypatch):
     mock_get = mock.MagicMock()
     error_body = {'error': {'code': '123', 'message': 'failed'}}
     set_response(mock_get, code=200, body=error_body)
-    monkeypatch.setattr(requests, 'get', mock_get)
+    monkeypatch.setattr(requests.Session, 'get', mock_get)
 
     client = build_client()
     with pytest.raises(RequestError) as error:
@@ -140,7 +562,7 @@ def test_request_fail_1(monkeypatch):
 def test_request_fail_2(monkeypatch):
     mock_get = mock.MagicMock()
     set_response(mock_get, code=400)
-    monkeypatch.setattr(requests, 'get', mock_get)
+    monkeypatch.setattr(requests.Session, 'get', mock_get)
 
     client = build_client()
     with pytest.raises(RequestError) as error:
@@ -156,7 +578,7 @@ def test_request_fail_3(monkeypatch):
     mock_get = mock.MagicMock()
     mock_response = set_response(mock_get, code=200, body='foo')
     mock_response.json.side_effect = ValueError
-    monkeypatch.setattr(requests, 'get', mock_get)
+    monkeypatch.setattr(requests.Session, 'get', mock_get)
 
     client = build_client()
     with pytest.raises(RequestError) as error:
@@ -176,7 +598,8 @@ def test_get_public_orders(requests_get, logger):
         url=build_url('/order_book'),
         params={'book': test_book, 'group': 1}
     )
-    logger.debug.assert_called_with(
+    assert_logged(
+        logger,
         '[client: test_client_id] get public orders for btc_usd')
 
     output = client.get_public_orders(group=False, book='eth_cad')
@@ -185,7 +608,8 @@ def test_get_public_orders(requests_get, logger):
         url=build_url('/order_book'),
         params={'book': 'eth_cad', 'group': 0}
     )
-    logger.debug.assert_called_with(
+    assert_logged(
+        logger,
         '[client: test_client_id] get public orders for eth_cad')
 
     with pytest.raises(InvalidOrderBookError):
@@ -200,7 +624,8 @@ def test_get_public_trades(requests_get, logger):
         url=build_url('/transactions'),
         params={'book': test_book, 'time': 'hour'}
     )
-    logger.debug.assert_called_with(
+    assert_logged(
+        logger,
         '[client: test_client_id] get recent public trades for btc_usd')
 
     output = client.get_public_trades(time='minute', book='eth_cad')
@@ -209,13 +634,827 @@ def test_get_public_trades(requests_get, logger):
         url=build_url('/transactions'),
         params={'book': 'eth_cad', 'time': 'minute'}
     )
-    logger.debug.assert_called_with(
+    assert_logged(
+        logger,
         '[client: test_client_id] get recent public trades for eth_cad')
 
     with pytest.raises(InvalidOrderBookError):
         client.get_public_trades(book='invalid_book')
 
 
+def test_get_summaries(requests_get):
+    error_response = set_response(mock.MagicMock(), code=500)
+
+    def get(url, params):
+        if params['book'] == 'eth_cad':
+            return error_response
+        return set_response(mock.MagicMock(), body=params)
+
+    requests_get.side_effect = get
+    client = build_client()
+    output = client.get_summaries()
+    assert sorted(output) == sorted(QuadrigaClient.order_books)
+    for book, capture in output.items():
+        assert capture['timestamp'] == test_nonce / 1000
+        if book == 'eth_cad':
+            assert capture['result'] is None
+            assert isinstance(capture['error'], RequestError)
+        else:
+            assert capture['result'] == {'book': book}
+            assert capture['error'] is None
+
+    output = client.get_summaries(books=['btc_cad', 'btc_usd'])
+    assert sorted(output) == ['btc_cad', 'btc_usd']
+    with pytest.raises(InvalidOrderBookError):
+        client.get_summaries(books=['btc_cad', 'invalid_book'])
+    client.close()
+
+
+def test_client_executor(monkeypatch):
+    created = []
+
+    def create(max_workers):
+        # Widen the window between the check and the assignment
+        time.sleep(0.01)
+        created.append(mock.MagicMock())
+        return created[-1]
+
+    monkeypatch.setattr('quadriga.ThreadPoolExecutor', create)
+    client = build_client()
+    executors = []
+    threads = [
+        threading.Thread(
+            target=lambda: executors.append(client._get_executor())
+        )
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(created) == 1
+    assert executors == created * 4
+    client.close()
+    assert created[0].shutdown.called
+
+
+def test_get_all_public_orders(requests_get):
+    client = build_client()
+    output = client.get_all_public_orders(group=False, books=['ltc_cad'])
+    assert output == {
+        'ltc_cad': {
+            'timestamp': test_nonce / 1000,
+            'result': test_body,
+            'error': None
+        }
+    }
+    requests_get.assert_called_with(
+        url=build_url('/order_book'),
+        params={'book': 'ltc_cad', 'group': 0}
+    )
+
+
+def test_response_cache(requests_get):
+    cache = ResponseCache(ttls={'/ticker': 2}, maxsize=2)
+    client = QuadrigaClient(default_book=test_book, cache=cache)
+
+    assert client.get_summary() == test_body
+    assert client.get_summary() == test_body
+    assert requests_get.call_count == 1
+    assert client.get_summary(refresh=True) == test_body
+    assert requests_get.call_count == 2
+
+    time.time.return_value += 3
+    client.get_summary()
+    assert requests_get.call_count == 3
+
+    client.get_public_orders()
+    client.get_public_orders(group=False)
+    assert requests_get.call_count == 5
+    client.get_summary()
+    assert requests_get.call_count == 6
+    client.get_public_orders(group=False)
+    assert requests_get.call_count == 6
+
+    cache.invalidate('/order_book')
+    client.get_public_orders(group=False)
+    assert requests_get.call_count == 7
+    cache.invalidate()
+    client.get_public_orders(group=False)
+    assert requests_get.call_count == 8
+
+    assert cache.stats() == {
+        '/ticker': {
+            'hits': 1, 'misses': 3, 'evictions': 1, 'hit_ratio': 0.25
+        },
+        '/order_book': {
+            'hits': 1, 'misses': 4, 'evictions': 1, 'hit_ratio': 0.2
+        }
+    }
+
+
+def test_response_cache_disabled(requests_get):
+    cache = ResponseCache(ttls={'/transactions': 0})
+    client = QuadrigaClient(default_book=test_book, cache=cache)
+    client.get_public_trades()
+    client.get_public_trades()
+    assert requests_get.call_count == 2
+    assert cache.stats() == {}
+
+    client.get_public_orders()
+    client.get_public_orders()
+    assert requests_get.call_count == 3
+
+
+def test_request_coalescing(requests_get):
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+
+    release = threading.Event()
+    response = requests_get.return_value
+
+    def get(url, params):
+        release.wait()
+        return response
+
+    requests_get.side_effect = get
+    client = build_client()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(client.get_summary) for _ in range(4)]
+        futures.append(executor.submit(client.get_summary, 'eth_cad'))
+        time.sleep(0.2)
+        release.set()
+    assert [future.result() for future in futures] == [test_body] * 5
+    assert requests_get.call_count == 2
+
+    response.status_code = 500
+    release.clear()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(client.get_summary) for _ in range(4)]
+        time.sleep(0.2)
+        release.set()
+    errors = [future.exception() for future in futures]
+    assert all(isinstance(error, RequestError) for error in errors)
+    assert len(set(map(id, errors))) == 1
+    assert requests_get.call_count == 3
+
+
+def test_request_coalescing_disabled(requests_get):
+    client = QuadrigaClient(coalesce=False)
+    client.get_summary()
+    client.get_summary()
+    assert requests_get.call_count == 2
+
+
+def test_order_book():
+    order_book = OrderBook('btc_cad')
+    assert order_book.best_bid is None
+    assert order_book.best_ask is None
+    assert order_book.spread is None
+
+    changes = order_book.update({
+        'timestamp': '1491481256',
+        'bids': [['100.5', '1.0'], ['100.0', '2.5'], ['99.0', '3']],
+        'asks': [['101.0', '0.5'], ['102.5', '1.5']]
+    })
+    assert order_book.timestamp == 1491481256
+    assert sorted(changes['bids']) == [(99.0, 3), (100.0, 2.5), (100.5, 1)]
+    assert sorted(changes['asks']) == [(101.0, 0.5), (102.5, 1.5)]
+    assert order_book.best_bid == (100.5, 1.0)
+    assert order_book.best_ask == (101.0, 0.5)
+    assert order_book.spread == 0.5
+    assert order_book.bids() == [(100.5, 1), (100.0, 2.5), (99.0, 3)]
+    assert order_book.asks(depth=1) == [(101.0, 0.5)]
+    assert order_book.bid_amount('100.0') == 2.5
+    assert order_book.bid_amount(98) == 0
+    assert order_book.ask_amount(102.5) == 1.5
+    assert repr(order_book) == '<OrderBook btc_cad bids=3 asks=2>'
+
+    changes = order_book.update({
+        'timestamp': '1491481257',
+        'bids': [['100.5', '1.0'], ['100.0', '2.0'], ['99.5', '4']],
+        'asks': [['100.8', '0.1'], ['101.0', '0.5']]
+    })
+    assert sorted(changes['bids']) == [(99.0, 0), (99.5, 4), (100.0, 2)]
+    assert sorted(changes['asks']) == [(100.8, 0.1), (102.5, 0)]
+    assert order_book.bids() == [(100.5, 1), (100.0, 2), (99.5, 4)]
+    assert order_book.asks() == [(100.8, 0.1), (101.0, 0.5)]
+    assert order_book.ask_amount(102.5) == 0
+
+    assert order_book.update({'bids': [], 'asks': []}) == {
+        'bids': [(100.5, 0), (100.0, 0), (99.5, 0)],
+        'asks': [(100.8, 0), (101.0, 0)]
+    }
+    assert order_book.timestamp is None
+
+
+def test_order_book_refresh(requests_get):
+    set_response(requests_get, body={
+        'timestamp': '1491481256',
+        'bids': [['10', '1'], ['10', '2'], ['9', '1']],
+        'asks': [['11', '1'], ['12', '1'], ['11', '0.5']]
+    })
+    order_book = OrderBook('eth_cad')
+    order_book.refresh(build_client(), group=False)
+    requests_get.assert_called_with(
+        url=build_url('/order_book'),
+        params={'book': 'eth_cad', 'group': 0}
+    )
+    assert order_book.bids() == [(10, 3), (9, 1)]
+    assert order_book.asks() == [(11, 1.5), (12, 1)]
+
+
+def stream_body(body, size=7):
+    data = json.dumps(body, indent=1).encode('utf-8')
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+test_levels = {
+    'timestamp': '1491481256',
+    'bids': [['10.5', '1'], ['10', '2', 'x'], ['9', '1']],
+    'asks': [['11', '1'], ['12', '1']]
+}
+
+
+def test_order_book_parser():
+    for depth, size in ((1, 1), (2, 7), (3, 1000), (5, 3)):
+        parser = OrderBookParser(depth)
+        done = [parser.feed(chunk) for chunk in stream_body(test_levels, size)]
+        assert done[-1]
+        assert parser.result() == {
+            'timestamp': '1491481256',
+            'bids': [level[:2] for level in test_levels['bids'][:depth]],
+            'asks': test_levels['asks'][:depth]
+        }
+
+    parser = OrderBookParser(2)
+    for chunk in stream_body({'error': {'code': 101, 'message': 'x'}}):
+        assert not parser.feed(chunk)
+    assert parser.result() == {'error': {'code': 101, 'message': 'x'}}
+
+    parser = OrderBookParser(2)
+    parser.feed(b'{"bids": [["1", "2"]')
+    with pytest.raises(ValueError):
+        parser.result()
+
+    for depth in (0, -1):
+        with pytest.raises(ValueError):
+            OrderBookParser(depth)
+
+
+def test_get_public_orders_depth(requests_get):
+    client = build_client()
+    response = set_response(requests_get)
+    response.iter_content.return_value = iter(stream_body(test_levels))
+    assert client.get_public_orders(depth=1) == {
+        'timestamp': '1491481256',
+        'bids': [['10.5', '1']],
+        'asks': [['11', '1']]
+    }
+    requests_get.assert_called_with(
+        url=build_url('/order_book'),
+        params={'book': test_book, 'group': 1},
+        stream=True
+    )
+    assert response.close.called
+    assert not response.json.called
+
+    requests_get.reset_mock()
+    for depth in (0, -1):
+        with pytest.raises(ValueError):
+            client.get_public_orders(depth=depth)
+    assert not requests_get.called
+
+    client = QuadrigaClient(decoder=JsonDecoder(parse_number=Decimal))
+    response.iter_content.return_value = iter(stream_body(test_levels))
+    output = client.get_public_orders(depth=1)
+    assert output['bids'] == [[Decimal('10.5'), Decimal('1')]]
+
+    error = {'error': {'code': 101, 'message': 'invalid book'}}
+    response.iter_content.return_value = iter(stream_body(error))
+    with pytest.raises(RequestError) as err:
+        client.get_public_orders(depth=1)
+    assert err.value.error_code == 101
+    assert json.loads(err.value.body) == error
+
+    response.iter_content.return_value = iter(stream_body(test_levels)[:3])
+    with pytest.raises(RequestError):
+        client.get_public_orders(depth=1)
+
+    set_response(requests_get, code=500)
+    with pytest.raises(RequestError) as err:
+        client.get_public_orders(depth=1)
+    assert err.value.http_code == 500
+
+
+def test_protocol():
+    protocol = Protocol(test_key, test_secret, test_client_id)
+    request = protocol.build_get('/ticker', {'book': test_book})
+    assert (request.method, request.url, request.params, request.json) == (
+        'GET', build_url('/ticker'), {'book': test_book}, None
+    )
+    request = protocol.build_post('/balance', {'foo': 'bar'})
+    assert request.url == build_url('/balance')
+    assert request.json == {
+        'foo': 'bar',
+        'key': test_key,
+        'nonce': test_nonce,
+        'signature': protocol.compute_signature(test_nonce)
+    }
+
+    response = Response(200, 'OK', test_url, {}, content=b'{"a": 1}')
+    assert protocol.handle_response(response) == {'a': 1}
+    for code, body, error_code in (
+        (500, b'{"a": 1}', None),
+        (200, b'not json', None),
+        (200, b'{"error": {"code": 21, "message": "x"}}', 21),
+    ):
+        response = Response(code, 'reason', test_url, {}, content=body)
+        with pytest.raises(RequestError) as err:
+            protocol.handle_response(response)
+        assert err.value.error_code == error_code
+        assert err.value.body == body.decode('utf-8')
+
+
+def test_order_template():
+    protocol = Protocol(test_key, test_secret, test_client_id)
+    template = protocol.order_template('/buy', 'btc_cad')
+    trace = RequestTrace()
+    request = protocol.build_order(template, '0.5', Decimal('1234.50'), trace)
+    assert (request.method, request.endpoint, request.url, request.json) == (
+        'POST', '/buy', build_url('/buy'), None
+    )
+    assert request.headers == {'Content-Type': 'application/json'}
+    assert json.loads(request.body.decode('utf-8')) == {
+        'book': 'btc_cad',
+        'key': test_key,
+        'amount': '0.5',
+        'price': '1234.50',
+        'nonce': test_nonce,
+        'signature': protocol.compute_signature(test_nonce)
+    }
+    assert trace.phases['sign'] >= 0
+    assert protocol.compute_signature(test_nonce) == hmac.new(
+        key=test_secret.encode('utf-8'),
+        msg='{}{}{}'.format(test_nonce, test_client_id, test_key).encode(),
+        digestmod=hashlib.sha256
+    ).hexdigest()
+
+
+def test_order_template_numbers():
+    protocol = Protocol(test_key, test_secret, test_client_id)
+    template = protocol.order_template('/buy', 'btc_cad')
+    for amount, price in ((0.5, 1234.5), (1e-05, 100),
+                          (Decimal('1E-8'), Decimal('1234.50')),
+                          ('0.00000001', '1e3')):
+        fast = json.loads(
+            protocol.build_order(template, amount, price).body.decode('utf-8')
+        )
+        normal = protocol.build_post(
+            '/buy', {'book': 'btc_cad', 'amount': amount, 'price': price}
+        ).json
+        assert fast['signature'] == protocol.compute_signature(fast['nonce'])
+        for name in ('nonce', 'signature'):
+            del fast[name], normal[name]
+        assert 'e' not in fast['amount'] + fast['price']
+        assert fast == dict(
+            normal,
+            amount='{:f}'.format(Decimal(str(amount))),
+            price='{:f}'.format(Decimal(str(price)))
+        )
+    assert fast['amount'] == '0.00000001' and fast['price'] == '1000'
+
+    for value in ('1", "price": "0', None, float('nan'), 'abc'):
+        with pytest.raises(InvalidOrderError):
+            protocol.build_order(template, value, 1)
+        with pytest.raises(InvalidOrderError):
+            protocol.build_order(template, 1, value)
+
+
+def test_client_fast_orders():
+    transport = FakeTransport({
+        ('POST', '/buy'): {'id': '1'},
+        ('POST', '/sell'): {'id': '2'},
+    })
+    client = QuadrigaClient(
+        api_key=test_key,
+        api_secret=test_secret,
+        client_id=test_client_id,
+        transport=transport,
+        fast_orders=True,
+        round_prices=True
+    )
+    assert client.buy_limit_order('0.5', '1234.567') == {'id': '1'}
+    assert client.sell_limit_order(1, 100, book='eth_btc') == {'id': '2'}
+    buy, sell = [json.loads(request.body.decode('utf-8'))
+                 for request in transport.requests]
+    assert (buy['book'], buy['amount'], buy['price']) == (
+        'eth_cad', '0.5', '1234.56'
+    )
+    assert (sell['book'], sell['amount'], sell['price']) == (
+        'eth_btc', '1', '100.00000000'
+    )
+    assert sell['nonce'] == buy['nonce'] + 1
+    assert client.buy_market_order(1) == {'id': '1'}
+    assert transport.requests[-1].json['amount'] == 1
+    with pytest.raises(InvalidOrderError):
+        client.sell_limit_order('0.000000001', 100)
+    with pytest.raises(InvalidOrderBookError):
+        client.sell_limit_order(1, 100, book='invalid_book')
+
+    session = mock.MagicMock()
+    transport = RequestsTransport(session)
+    request = Protocol().build_order(
+        client._order_templates['/buy', 'btc_cad'], 1, 1
+    )
+    transport.send(request)
+    session.post.assert_called_with(
+        url=build_url('/buy'), data=request.body, headers=request.headers
+    )
+    pool_manager = mock.MagicMock()
+    Urllib3Transport(pool_manager).send(request)
+    args, kwargs = pool_manager.request.call_args
+    assert (kwargs['body'], kwargs['headers']) == (
+        request.body, request.headers
+    )
+
+
+def test_fake_transport():
+    transport = FakeTransport({('GET', '/ticker'): {'last': '1234.50'}})
+    transport.add('GET', '/order_book', json.dumps(test_levels, indent=1))
+    transport.add('POST', '/buy', {'error': {'code': 21}}, status_code=200)
+    client = QuadrigaClient(transport=transport, coalesce=False)
+    assert client.session is None
+    assert client.get_summary() == {'last': '1234.50'}
+    assert client.get_public_orders(depth=1)['asks'] == [['11', '1']]
+    request = transport.requests[-1]
+    assert request.stream and request.params == {'book': 'eth_cad', 'group': 1}
+    with pytest.raises(RequestError) as err:
+        client.buy_limit_order(1, 1)
+    assert err.value.error_code == 21
+    with pytest.raises(RequestError) as err:
+        client.get_public_trades()
+    assert err.value.http_code == 404
+
+    transport.add('GET', '/ticker', lambda request: Response(
+        200, 'OK', request.url, {}, chunks=lambda size: iter([b'{}'])
+    ))
+    assert client.get_summary() == {}
+
+
+def test_urllib3_transport():
+    pool_manager = mock.MagicMock()
+    response = pool_manager.request.return_value
+    response.status = 200
+    response.reason = 'OK'
+    response.read.return_value = b'{"last": "1"}'
+    transport = Urllib3Transport(pool_manager)
+    client = QuadrigaClient(transport=transport)
+    assert client.get_summary() == {'last': '1'}
+    pool_manager.request.assert_called_with(
+        'GET',
+        build_url('/ticker'),
+        fields={'book': 'eth_cad'},
+        retries=False,
+        preload_content=False
+    )
+    assert response.release_conn.call_count == 1
+
+    client.buy_market_order(1)
+    args, kwargs = pool_manager.request.call_args
+    assert args == ('POST', build_url('/buy'))
+    assert json.loads(kwargs['body'])['amount'] == 1
+
+    response.stream.return_value = iter(stream_body(test_levels))
+    assert client.get_public_orders(depth=1)['bids'] == [['10.5', '1']]
+    response.stream.assert_called_with(RestClient.stream_chunk_size)
+    assert response.release_conn.called
+    client.close()
+    assert not pool_manager.clear.called
+
+
+def test_httpx_transport():
+    http_client = mock.MagicMock()
+    response = http_client.send.return_value
+    response.status_code = 200
+    response.reason_phrase = 'OK'
+    response.content = b'{"last": "1"}'
+    client = QuadrigaClient(transport=HttpxTransport(http_client))
+    assert client.get_summary() == {'last': '1'}
+    http_client.build_request.assert_called_with(
+        'GET',
+        build_url('/ticker'),
+        params={'book': 'eth_cad'},
+        json=None,
+        content=None,
+        headers=None
+    )
+    http_client.send.assert_called_with(
+        http_client.build_request.return_value, stream=False
+    )
+
+
+def test_latency_histogram():
+    histogram = LatencyHistogram()
+    assert histogram.snapshot() == {
+        'p50': None, 'p99': None, 'max': None, 'mean': None
+    }
+    for micros in range(1, 10001):
+        histogram.record(micros / 1e6)
+    snapshot = histogram.snapshot()
+    assert snapshot['p50'] == pytest.approx(0.005, rel=0.04)
+    assert snapshot['p99'] == pytest.approx(0.0099, rel=0.04)
+    assert snapshot['max'] == 0.01
+    assert snapshot['mean'] == pytest.approx(0.0050005)
+
+
+def test_client_hooks():
+    hook = mock.MagicMock()
+    metrics = MetricsCollector()
+    transport = FakeTransport({('GET', '/ticker'): {'last': '1'}})
+    transport.add('POST', '/buy', {'error': {'code': 21, 'message': 'x'}})
+    client = QuadrigaClient(
+        transport=transport, coalesce=False, hooks=[hook, metrics]
+    )
+    client.get_summary()
+    client.get_summary()
+    event = hook.after_request.call_args[0][0]
+    assert hook.before_request.call_args[0][0] is event
+    assert (event.endpoint, event.method, event.status, event.bytes) == (
+        '/ticker', 'GET', 200, len('{"last": "1"}')
+    )
+    assert event.elapsed >= 0 and event.error is None
+
+    with pytest.raises(RequestError):
+        client.buy_market_order(1)
+    with pytest.raises(RequestError):
+        client.get_public_trades()
+    event = hook.after_request.call_args[0][0]
+    assert (event.status, event.error_code) == (404, None)
+
+    snapshot = metrics.snapshot(reset=True)
+    assert snapshot['/ticker']['count'] == 2
+    assert snapshot['/ticker']['errors'] == 0
+    assert snapshot['/ticker']['in_flight'] == 0
+    assert snapshot['/ticker']['latency']['max'] >= 0
+    assert snapshot['/buy']['error_codes'] == {21: 1}
+    assert snapshot['/transactions']['error_codes'] == {'HTTP 404': 1}
+    assert json.loads(json.dumps(snapshot)) is not None
+    assert metrics.snapshot()['/ticker']['count'] == 0
+
+    transport.add('GET', '/ticker', mock.MagicMock(side_effect=RuntimeError))
+    with pytest.raises(RuntimeError):
+        client.get_summary()
+    assert metrics.snapshot()['/ticker']['error_codes'] == {'RuntimeError': 1}
+
+
+def test_client_structured_logging(logger):
+    transport = FakeTransport({('POST', '/buy'): {'id': '1'}})
+    client = QuadrigaClient(
+        client_id=test_client_id, transport=transport
+    )
+    logger.isEnabledFor.return_value = False
+    client.buy_limit_order(1, 100)
+    assert not logger.debug.called
+
+    logger.isEnabledFor.return_value = True
+    client.buy_limit_order(1, 100)
+    order, request = [kwargs['extra'] for _, kwargs in
+                      logger.debug.call_args_list]
+    assert order == {
+        'client_id': test_client_id,
+        'endpoint': '/buy',
+        'book': 'eth_cad',
+        'amount': 1,
+        'price': 100,
+    }
+    assert (request['client_id'], request['endpoint'], request['method'],
+            request['status'], request['bytes']) == (
+        test_client_id, '/buy', 'POST', 200, len('{"id": "1"}')
+    )
+    assert request['latency'] >= 0 and request['error_code'] is None
+    assert_logged(
+        logger,
+        '[client: test_client_id] buy 1 at price of 100 for eth_cad')
+
+
+def test_client_trace():
+    hook = mock.MagicMock()
+    transport = FakeTransport({('GET', '/ticker'): {'last': '1'}})
+    transport.add('POST', '/buy', {'error': {'code': 21, 'message': 'x'}})
+    client = QuadrigaClient(
+        transport=transport, coalesce=False, hooks=[hook], trace=True
+    )
+    output = client.get_summary()
+    assert output == {'last': '1'}
+    assert set(output.trace.phases) == {'queue', 'first_byte', 'decode'}
+    assert output.trace.total >= 0
+    assert hook.after_request.call_args[0][0].trace is output.trace
+
+    with pytest.raises(RequestError) as err:
+        client.buy_market_order(1)
+    assert set(err.value.trace.phases) == {
+        'queue', 'sign', 'first_byte', 'decode'
+    }
+
+    transport.add('GET', '/ticker', lambda request: Response(
+        200, 'OK', request.url, {}, content=b'{"last": "1"}',
+        elapsed=datetime.timedelta(seconds=0)
+    ))
+    output = client.get_summary()
+    assert output.trace.phases['first_byte'] == 0
+    assert 'download' in output.trace.phases
+
+    client = QuadrigaClient(
+        transport=transport, coalesce=False, trace=True, fixed_point=True
+    )
+    assert client.get_summary().trace.phases['first_byte'] == 0
+    assert not hasattr(build_client().get_summary(), 'trace')
+
+
+def test_traced_connections():
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header('Content-Length', '2')
+            self.end_headers()
+            self.wfile.write(b'{}')
+
+        def log_message(self, *_):
+            pass
+
+    server = HTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.handle_request)
+    thread.start()
+    try:
+        client = QuadrigaClient(transport=Urllib3Transport(), trace=True)
+        getattr(client, '_rest_client')._protocol.endpoint_prefix = (
+            'http://127.0.0.1:{}'.format(server.server_port)
+        )
+        phases = client.get_summary().trace.phases
+    finally:
+        thread.join()
+        server.server_close()
+    assert {'connect', 'first_byte', 'download', 'decode'} <= set(phases)
+    assert 'tls' not in phases
+
+
+def build_public_trades(tids):
+    return [
+        {
+            'tid': tid,
+            'date': str(1491912500 + tid),
+            'price': '{}.50'.format(1000 + tid),
+            'amount': '0.25',
+            'side': 'sell' if tid % 2 else 'buy'
+        }
+        for tid in reversed(tids)
+    ]
+
+
+def test_trade_archiver(requests_get, tmpdir):
+    directory = str(tmpdir.join('archive'))
+    client = build_client()
+    set_response(requests_get, body=build_public_trades([1, 2, 3]))
+    archiver = TradeArchiver(client, directory, books=[test_book])
+    assert archiver.poll() == {test_book: 3}
+    requests_get.assert_called_with(
+        url=build_url('/transactions'),
+        params={'book': test_book, 'time': 'hour'}
+    )
+
+    set_response(requests_get, body=build_public_trades([2, 3, 4, 5]))
+    assert archiver.poll_book(test_book) == 2
+    assert archiver.poll_book(test_book) == 0
+
+    # Values of interrupted writes are dropped and the index is rebuilt
+    # from the trade ID column
+    path = archiver.path(test_book)
+    with open(column_path(path, 'tid'), 'ab') as column:
+        column.write(b'\x07' * 8)
+    with open(column_path(path, 'price'), 'ab') as column:
+        column.write(b'\x00' * 5)
+    archiver = TradeArchiver(client, directory, books=[test_book])
+    set_response(requests_get, body=build_public_trades([4, 5, 6]))
+    assert archiver.poll() == {test_book: 1}
+
+    with TradeArchive(path) as archive:
+        assert len(archive) == 6
+        assert archive[0] == (1, 1491912501, 1001.5, 0.25, -1)
+        assert archive[-1] == (6, 1491912506, 1006.5, 0.25, 1)
+        assert [r[0] for r in archive.scan()] == [1, 2, 3, 4, 5, 6]
+        assert [r[0] for r in archive.scan(1491912503, 1491912505)] == [3, 4]
+        assert archive.bisect(1491912600) == 6
+        with pytest.raises(IndexError):
+            archive[6]
+    with open(column_path(path, 'side'), 'rb') as column:
+        assert column.read() == b'\xff\x01\xff\x01\xff\x01'
+
+    with pytest.raises(InvalidOrderBookError):
+        TradeArchiver(client, directory, books=['invalid_book'])
+
+
+def test_recent_ids():
+    recent_ids = RecentIds(3)
+    for tid in (5, 3, 4, 6):
+        recent_ids.add(tid)
+    # 5 was evicted first, so 1 to 5 are treated as seen
+    assert [tid in recent_ids for tid in (1, 5, 6, 7)] == [
+        True, True, True, False
+    ]
+    recent_ids.add(6)
+    assert 4 in recent_ids and 3 in recent_ids
+
+
+@requires_numpy
+def test_trade_archive_columns(requests_get, tmpdir):
+    client = build_client()
+    set_response(requests_get, body=build_public_trades([1, 2, 3]))
+    archiver = TradeArchiver(client, str(tmpdir), books=[test_book])
+    archiver.poll()
+    path = archiver.path(test_book)
+    prices = numpy.memmap(
+        column_path(path, 'price'), dtype=column_dtypes['price'], mode='r'
+    )
+    assert prices.tolist() == [1001.5, 1002.5, 1003.5]
+
+
+def test_candle_aggregator():
+    candles = CandleAggregator(intervals=(60, 300))
+    trades = build_public_trades([1, 2, 3])
+    assert candles.add_trades(test_book, trades) == 3
+    assert candles.add_trades(test_book, trades) == 0
+    assert candles.candles(test_book, 60) == [
+        (1491912480, 1001.5, 1003.5, 1001.5, 1003.5, 0.75)
+    ]
+
+    # Late trades update the open, close, high and low of their own candle
+    assert candles.add(test_book, 0, 1491912481, 999.0, 1.0)
+    assert candles.add(test_book, 4, 1491912539, 1005.0, 1.0)
+    assert candles.add(test_book, 5, 1491912540, 1000.0, 2.0)
+    assert candles.candles(test_book, 60) == [
+        (1491912480, 999.0, 1005.0, 999.0, 1005.0, 2.75),
+        (1491912540, 1000.0, 1000.0, 1000.0, 1000.0, 2.0),
+    ]
+    assert candles.candles(test_book, 300) == [
+        (1491912300, 999.0, 1005.0, 999.0, 1000.0, 4.75),
+    ]
+    assert candles.candles('eth_cad', 60) == []
+    with pytest.raises(KeyError):
+        candles.candles(test_book, 3600)
+
+    assert candles.add_records('eth_cad', [
+        (1, 1491912501, 1001.5, 0.25, -1),
+        (1, 1491912501, 1001.5, 0.25, -1),
+    ]) == 1
+
+
+@requires_numpy
+def test_candle_aggregator_arrays():
+    candles = CandleAggregator()
+    candles.add_trades(test_book, build_public_trades([1, 2, 3, 100]))
+    arrays = candles.to_arrays(test_book, 60)
+    assert arrays['timestamp'].dtype == numpy.int64
+    assert arrays['timestamp'].tolist() == [1491912480, 1491912600]
+    assert arrays['open'].tolist() == [1001.5, 1100.5]
+    assert arrays['volume'].tolist() == [0.75, 0.25]
+    assert candles.to_arrays('eth_cad', 60)['close'].shape == (0,)
+
+
+@requires_numpy
+def test_order_arrays():
+    arrays = order_arrays({
+        'timestamp': '1491912523',
+        'bids': [['100.0', '1.0'], ['99.0', '2.0'], ['98.0', '3.0']],
+        'asks': [],
+    })
+    assert arrays['timestamp'] == 1491912523
+    bids = arrays['bids']
+    assert bids['price'].dtype == numpy.float64
+    assert bids['price'].tolist() == [100.0, 99.0, 98.0]
+    assert bids['amount'].tolist() == [1.0, 2.0, 3.0]
+    assert bids['depth'].tolist() == [1.0, 3.0, 6.0]
+    assert arrays['asks']['depth'].shape == (0,)
+
+    assert vwap(bids, 1.0) == 100.0
+    assert vwap(bids, 2.0) == 99.5
+    assert vwap(bids, 6.0) == 98.0 + 4.0 / 6
+    assert vwap(bids, 7.0) is None
+    assert vwap(arrays['asks'], 1.0) is None
+
+
+@requires_numpy
+def test_trade_arrays():
+    arrays = trade_arrays(build_public_trades([1, 2]))
+    assert arrays['tid'].dtype == numpy.int64
+    assert arrays['tid'].tolist() == [2, 1]
+    assert arrays['timestamp'].tolist() == [1491912502, 1491912501]
+    assert arrays['price'].tolist() == [1002.5, 1001.5]
+    assert arrays['amount'].tolist() == [0.25, 0.25]
+    assert arrays['side'].tolist() == [1, -1]
+    assert trade_arrays([])['price'].shape == (0,)
+
+
 def test_get_orders(requests_post, logger):
     client = build_client()
     output = client.get_orders()
@@ -229,7 +1468,8 @@ def test_get_orders(requests_post, logger):
             'signature': mock.ANY
         }
     )
-    logger.debug.assert_called_with(
+    assert_logged(
+        logger,
         "[client: test_client_id] get user's open orders for btc_usd")
 
     with pytest.raises(InvalidOrderBookError):
@@ -258,7 +1498,8 @@ def test_get_trades(requests_post, logger):
         sort='asc',
         book='eth_cad'
     )
-    logger.debug.assert_called_with(
+    assert_logged(
+        logger,
         "[client: test_client_id] get user's completed trades for eth_cad")
 
     assert output == test_body
@@ -270,17 +1511,132 @@ def test_get_trades(requests_post, logger):
             'offset': 10,
             'sort': 'asc',
             'key': test_key,
-            'nonce': test_nonce,
+            'nonce': test_nonce + 1,
             'signature': mock.ANY
         }
     )
-    logger.debug.assert_called_with(
+    assert_logged(
+        logger,
         "[client: test_client_id] get user's completed trades for eth_cad")
 
     with pytest.raises(InvalidOrderBookError):
         client.get_trades(book='invalid_book')
 
 
+def build_trades(ids):
+    return [
+        {'id': i, 'datetime': '2017-04-12 11:00:{:02d}'.format(i)}
+        for i in ids
+    ]
+
+
+def serve_trades(history):
+    def post(url, json):
+        offset, limit = json['offset'], json['limit']
+        body = build_trades(history[0][offset:offset + limit])
+        if history[1:]:
+            history.pop(0)
+        return set_response(mock.MagicMock(), body=body)
+    return post
+
+
+def test_iter_trades(requests_post):
+    from datetime import datetime
+
+    requests_post.side_effect = serve_trades([[7, 6, 5, 4, 3, 2, 1]])
+    client = build_client()
+    trades = client.iter_trades(page_size=3)
+    assert next(trades) == build_trades([7])[0]
+    assert [t['id'] for t in trades] == [6, 5, 4, 3, 2, 1]
+    assert requests_post.call_count == 3
+    assert requests_post.call_args[1]['json']['book'] == test_book
+
+    requests_post.reset_mock()
+    requests_post.side_effect = serve_trades([[7, 6, 5, 4, 3, 2, 1]])
+    trades = client.iter_trades(page_size=3, since_id='3', book='eth_cad')
+    assert [t['id'] for t in trades] == [7, 6, 5, 4]
+    client.close()
+    # No page is fetched past the one holding the stop point
+    assert requests_post.call_count == 2
+    assert requests_post.call_args[1]['json']['book'] == 'eth_cad'
+
+    requests_post.reset_mock()
+    requests_post.side_effect = serve_trades([[7, 6, 5, 4, 3, 2, 1]])
+    since = datetime(2017, 4, 12, 11, 0, 5)
+    trades = client.iter_trades(page_size=3, since=since)
+    assert [t['id'] for t in trades] == [7, 6]
+    client.close()
+    assert requests_post.call_count == 1
+
+    requests_post.side_effect = serve_trades([
+        [7, 6, 5, 4, 3, 2, 1],
+        [9, 8, 7, 6, 5, 4, 3, 2, 1]
+    ])
+    trades = client.iter_trades(page_size=3, since_id=2)
+    assert [t['id'] for t in trades] == [7, 6, 5, 4, 3]
+
+    requests_post.side_effect = serve_trades([[]])
+    assert list(client.iter_trades()) == []
+
+    with pytest.raises(InvalidOrderBookError):
+        client.iter_trades(book='invalid_book')
+    client.close()
+
+
+def test_trade_store(requests_post, tmpdir):
+    path = str(tmpdir.join('trades.db'))
+    client = build_client()
+    assert client.client_id == test_client_id
+
+    requests_post.side_effect = serve_trades([[3, 2, 1]])
+    with TradeStore(path) as store:
+        assert store.latest(test_client_id, test_book) is None
+        assert store.sync(client, books=[test_book]) == {test_book: 3}
+        assert store.latest(test_client_id, test_book)['id'] == 3
+    client.close()
+
+    requests_post.reset_mock()
+    requests_post.side_effect = serve_trades([[5, 4, 3, 2, 1]])
+    with TradeStore(path) as store:
+        assert store.sync(client, books=[test_book], page_size=2) == {
+            test_book: 2
+        }
+        assert requests_post.call_count == 2
+        trades = store.trades(test_client_id, test_book)
+        assert [t['id'] for t in trades] == [1, 2, 3, 4, 5]
+        trades = store.trades(
+            test_client_id,
+            test_book,
+            start='2017-04-12 11:00:02',
+            end='2017-04-12 11:00:04'
+        )
+        assert [t['id'] for t in trades] == [2, 3]
+        assert store.trades(test_client_id, 'eth_cad') == []
+
+        trade = dict(build_trades([6])[0], order_id='abc')
+        assert store.upsert(test_client_id, test_book, [trade, trade]) == 2
+        trades = store.trades(test_client_id, test_book, order_id='abc')
+        assert trades == [trade]
+    client.close()
+
+    with pytest.raises(InvalidOrderBookError):
+        TradeStore(path).sync(client, books=['invalid_book'])
+
+
+def test_trade_store_decimals(tmpdir):
+    trade = {'id': 1, 'datetime': '2017-04-12 11:00:01', 'order_id': 'abc',
+             'rate': '1234.50', 'btc': '0.00000001', 'fee': '0'}
+    client = QuadrigaClient(
+        client_id=test_client_id,
+        decoder=JsonDecoder(parse_number=Decimal),
+        transport=FakeTransport({('POST', '/user_transactions'): [trade]})
+    )
+    with TradeStore(str(tmpdir.join('trades.db'))) as store:
+        assert store.sync(client, books=['btc_cad']) == {'btc_cad': 1}
+        assert store.trades(test_client_id, 'btc_cad') == [trade]
+    client.close()
+
+
 def test_get_balance(requests_post, logger):
     client = build_client()
     output = client.get_balance()
@@ -293,7 +1649,8 @@ def test_get_balance(requests_post, logger):
             'signature': mock.ANY
         }
     )
-    logger.debug.assert_called_with(
+    assert_logged(
+        logger,
         "[client: test_client_id] get user's account balance")
 
 
@@ -311,7 +1668,8 @@ def test_buy_market_order(requests_post, logger):
             'signature': mock.ANY
         }
     )
-    logger.debug.assert_called_with(
+    assert_logged(
+        logger,
         "[client: test_client_id] buy 10 at market price for btc_usd")
 
     output = client.buy_market_order(20, 'eth_cad')
@@ -322,11 +1680,12 @@ def test_buy_market_order(requests_post, logger):
             'book': 'eth_cad',
             'amount': 20,
             'key': test_key,
-            'nonce': test_nonce,
+            'nonce': test_nonce + 1,
             'signature': mock.ANY
         }
     )
-    logger.debug.assert_called_with(
+    assert_logged(
+        logger,
         "[client: test_client_id] buy 20 at market price for eth_cad")
 
     with pytest.raises(InvalidOrderBookError):
@@ -348,7 +1707,8 @@ def test_buy_limit_order(requests_post, logger):
             'signature': mock.ANY
         }
     )
-    logger.debug.assert_called_with(
+    assert_logged(
+        logger,
         "[client: test_client_id] buy 10 at price of 5 for btc_usd")
 
     output = client.buy_limit_order(20, 1, 'eth_cad')
@@ -360,11 +1720,12 @@ def test_buy_limit_order(requests_post, logger):
             'amount': 20,
             'price': 1,
             'key': test_key,
-            'nonce': test_nonce,
+            'nonce': test_nonce + 1,
             'signature': mock.ANY
         }
     )
-    logger.debug.assert_called_with(
+    assert_logged(
+        logger,
         "[client: test_client_id] buy 20 at price of 1 for eth_cad")
 
     with pytest.raises(InvalidOrderBookError):
@@ -385,7 +1746,8 @@ def test_sell_market_order(requests_post, logger):
             'signature': mock.ANY
         }
     )
-    logger.debug.assert_called_with(
+    assert_logged(
+        logger,
         "[client: test_client_id] sell 10 at market price for btc_usd")
 
     output = client.sell_market_order(20, 'eth_cad')
@@ -396,11 +1758,12 @@ def test_sell_market_order(requests_post, logger):
             'book': 'eth_cad',
             'amount': 20,
             'key': test_key,
-            'nonce': test_nonce,
+            'nonce': test_nonce + 1,
             'signature': mock.ANY
         }
     )
-    logger.debug.assert_called_with(
+    assert_logged(
+        logger,
         "[client: test_client_id] sell 20 at market price for eth_cad")
 
     with pytest.raises(InvalidOrderBookError):
@@ -422,7 +1785,8 @@ def test_sell_limit_order(requests_post, logger):
             'signature': mock.ANY
         }
     )
-    logger.debug.assert_called_with(
+    assert_logged(
+        logger,
         "[client: test_client_id] sell 10 at price of 5 for btc_usd")
 
     output = client.sell_limit_order(20, 1, 'eth_cad')
@@ -434,11 +1798,12 @@ def test_sell_limit_order(requests_post, logger):
             'amount': 20,
             'price': 1,
             'key': test_key,
-            'nonce': test_nonce,
+            'nonce': test_nonce + 1,
             'signature': mock.ANY
         }
     )
-    logger.debug.assert_called_with(
+    assert_logged(
+        logger,
         "[client: test_client_id] sell 20 at price of 1 for eth_cad")
 
     with pytest.raises(InvalidOrderBookError):
@@ -458,8 +1823,49 @@ def test_lookup_order(requests_post, logger):
             'signature': mock.ANY
         }
     )
-    logger.debug.assert_called_with(
-        "[client: test_client_id] look up order foobar")
+    assert_logged(logger, "[client: test_client_id] look up order foobar")
+
+
+def test_book_rules():
+    rules = BookRules('0.01', 8, '0.001')
+    rules.check_order('0.001', '1234.50')
+    rules.check_order(1, 1234)
+    rules.check_order(0.5, 1234.5)
+    for amount in ('0.0009', '0.123456789', 'abc', 'nan', None):
+        with pytest.raises(InvalidOrderError):
+            rules.check_amount(amount)
+    for price in ('1234.505', '0', '-1', 'inf'):
+        with pytest.raises(InvalidOrderError):
+            rules.check_price(price)
+    assert rules.check_order(1, '1234.509', 'buy', True) == '1234.50'
+    assert rules.check_order(1, '1234.501', 'sell', True) == '1234.51'
+    assert rules.check_order(1, 1234.5, 'sell', True) == '1234.50'
+    assert rules.check_order(1, None, 'sell', True) is None
+    with pytest.raises(InvalidOrderError):
+        rules.round_price('0.001', 'buy')
+
+
+def test_order_rules(requests_post):
+    client = build_client()
+    for order in (
+        lambda: client.buy_limit_order('0.000000001', 100),
+        lambda: client.sell_limit_order(1, '100.001'),
+        lambda: client.buy_market_order(0),
+        lambda: client.sell_market_order('-1'),
+    ):
+        with pytest.raises(InvalidOrderError):
+            order()
+    assert not requests_post.called
+
+    client = build_client(round_prices=True)
+    client.sell_limit_order(1, '100.001')
+    assert requests_post.call_args[1]['json']['price'] == '100.01'
+    client.buy_limit_order(1, 100.019, book='eth_btc')
+    assert requests_post.call_args[1]['json']['price'] == '100.01900000'
+
+    client = build_client(fixed_point=True)
+    with pytest.raises(InvalidOrderError):
+        client.buy_limit_order(0, 100)
 
 
 def test_cancel_order(requests_post, logger):
@@ -475,8 +1881,7 @@ def test_cancel_order(requests_post, logger):
             'signature': mock.ANY
         }
     )
-    logger.debug.assert_called_with(
-        "[client: test_client_id] cancel order foobar")
+    assert_logged(logger, "[client: test_client_id] cancel order foobar")
 
 
 def test_get_deposit_address(requests_post, logger):
@@ -491,7 +1896,8 @@ def test_get_deposit_address(requests_post, logger):
             'signature': mock.ANY
         }
     )
-    logger.debug.assert_called_with(
+    assert_logged(
+        logger,
         "[client: test_client_id] get deposit address for ether")
 
     output = client.get_deposit_address('bitcoin')
@@ -500,11 +1906,12 @@ def test_get_deposit_address(requests_post, logger):
         url=build_url('/bitcoin_deposit_address'),
         json={
             'key': test_key,
-            'nonce': test_nonce,
+            'nonce': test_nonce + 1,
             'signature': mock.ANY
         }
     )
-    logger.debug.assert_called_with(
+    assert_logged(
+        logger,
         "[client: test_client_id] get deposit address for bitcoin")
 
     output = client.get_deposit_address('litecoin')
@@ -513,11 +1920,12 @@ def test_get_deposit_address(requests_post, logger):
         url=build_url('/litecoin_deposit_address'),
         json={
             'key': test_key,
-            'nonce': test_nonce,
+            'nonce': test_nonce + 2,
             'signature': mock.ANY
         }
     )
-    logger.debug.assert_called_with(
+    assert_logged(
+        logger,
         "[client: test_client_id] get deposit address for litecoin")
 
     with pytest.raises(InvalidCurrencyError):
@@ -538,7 +1946,8 @@ def test_withdraw(requests_post, logger):
             'signature': mock.ANY
         }
     )
-    logger.debug.assert_called_with(
+    assert_logged(
+        logger,
         "[client: test_client_id] withdraw 1000 ethers to test_address")
 
     output = client.withdraw('bitcoin', 1000, test_address)
@@ -549,11 +1958,12 @@ def test_withdraw(requests_post, logger):
             'address': test_address,
             'amount': 1000,
             'key': test_key,
-            'nonce': test_nonce,
+            'nonce': test_nonce + 1,
             'signature': mock.ANY
         }
     )
-    logger.debug.assert_called_with(
+    assert_logged(
+        logger,
         "[client: test_client_id] withdraw 1000 bitcoins to test_address")
 
     output = client.withdraw('litecoin', 1000, test_address)
@@ -564,12 +1974,710 @@ def test_withdraw(requests_post, logger):
             'address': test_address,
             'amount': 1000,
             'key': test_key,
-            'nonce': test_nonce,
+            'nonce': test_nonce + 2,
             'signature': mock.ANY
         }
     )
-    logger.debug.assert_called_with(
+    assert_logged(
+        logger,
         "[client: test_client_id] withdraw 1000 litecoins to test_address")
 
     with pytest.raises(InvalidCurrencyError):
         client.withdraw('invalid_currency', 1000, test_address)
+
+
+def test_models():
+    ticker = Ticker.from_json({'last': '1234.50', 'timestamp': '1491912523'})
+    assert not hasattr(ticker, '__dict__')
+    assert ticker.last == Decimal('1234.50')
+    assert ticker['timestamp'] == 1491912523
+    assert ticker.bid is None
+    assert ticker.get('bid', 0) == 0
+    assert 'last' in ticker and 'foo' not in ticker
+    with pytest.raises(KeyError):
+        ticker['foo']
+    assert ticker.as_dict() == {'last': '1234.50', 'timestamp': 1491912523}
+    assert repr(ticker) == '<Ticker last=1234.50 timestamp=1491912523>'
+    assert ticker == Ticker.from_json(ticker.as_dict())
+
+    trade = PublicTrade.from_json({'tid': 5, 'price': 1.1, 'side': 'buy'})
+    assert trade.price == Decimal('1.1')
+    assert trade.side == 'buy'
+
+    trade = UserTrade.from_json(
+        {'id': '7', 'datetime': '2017-04-12 11:00:07', 'btc': '-0.5',
+         'cad': '600.25', 'type': 2},
+        'btc_cad'
+    )
+    assert trade.id == 7
+    assert trade.major == Decimal('-0.5')
+    assert trade['cad'] == Decimal('600.25')
+    assert trade.get('btc') == Decimal('-0.5')
+    assert 'cad' in trade
+    assert trade.as_dict() == {
+        'id': 7, 'datetime': '2017-04-12 11:00:07', 'btc': '-0.5',
+        'cad': '600.25', 'type': 2
+    }
+
+    order = OpenOrder.from_json({'id': 'abc', 'type': '1', 'status': '0'})
+    assert (order.id, order.type, order.status) == ('abc', 1, 0)
+
+    balance = Balance.from_json({'btc_available': '1.5', 'fee': '0.5'})
+    assert balance.btc_available == Decimal('1.5')
+    assert balance.cad_balance is None
+
+
+def test_client_models(requests_get, requests_post, tmpdir):
+    client = QuadrigaClient(
+        api_key=test_key,
+        api_secret=test_secret,
+        client_id=test_client_id,
+        default_book='btc_cad',
+        models=True
+    )
+    set_response(requests_get, body={'last': '1234.50'})
+    assert client.get_summary() == Ticker.from_json({'last': '1234.50'})
+
+    set_response(requests_get, body=build_public_trades([1, 2]))
+    trades = client.get_public_trades()
+    assert [type(t) for t in trades] == [PublicTrade, PublicTrade]
+    assert trades[0].tid == 2
+
+    set_response(requests_post, body=[{'id': 'abc', 'price': '10'}])
+    assert client.get_orders()[0].price == Decimal('10')
+
+    set_response(requests_post, body={'cad_balance': '100'})
+    assert client.get_balance().cad_balance == Decimal('100')
+
+    set_response(requests_post, body=[{'id': 1, 'btc': '0.5'}])
+    assert client.get_trades()[0].major == Decimal('0.5')
+
+    requests_post.side_effect = serve_trades([[3, 2, 1]])
+    with TradeStore(str(tmpdir.join('trades.db'))) as store:
+        assert store.sync(client, books=['btc_cad']) == {'btc_cad': 3}
+        assert store.trades(test_client_id, 'btc_cad')[0] == {
+            'id': 1, 'datetime': '2017-04-12 11:00:01'
+        }
+    client.close()
+
+
+def test_json_decoder():
+    body = (
+        '{"bids": [["1234.50", "0.00000001"]], "timestamp": "1491912523", '
+        '"tid": 5, "vwap": 1.25, "note": "say \\"1.5\\""}'
+    )
+    for backend in ('json', None):
+        assert JsonDecoder(backend=backend).decode(body) == json.loads(body)
+
+    decoder = JsonDecoder(parse_number=Decimal)
+    for data in (body, body.encode('utf-8')):
+        assert decoder.decode(data) == {
+            'bids': [[Decimal('1234.50'), Decimal('0.00000001')]],
+            'timestamp': '1491912523',
+            'tid': 5,
+            'vwap': Decimal('1.25'),
+            'note': 'say "1.5"',
+        }
+    decoder = JsonDecoder(parse_number=scaled_int(8))
+    assert decoder.decode(body)['bids'] == [[123450000000, 1]]
+
+    body = (
+        '[{"tid": 7, "date": "1491912523", "price": "1234", "amount": "1", '
+        '"side": "buy"}, {"tid": 8, "date": "1491912524", "price": 1234.5, '
+        '"amount": 2}]'
+    )
+    assert decoder.decode(body) == [
+        {'tid': 7, 'date': '1491912523', 'price': 123400000000,
+         'amount': 100000000, 'side': 'buy'},
+        {'tid': 8, 'date': '1491912524', 'price': 123450000000,
+         'amount': 200000000},
+    ]
+    body = (
+        '{"btc_balance": "2", "fee": "0.5", "bids": [["1234", "1"]], '
+        '"asks": [[1235, 1.5]], "id": "1", "status": "1"}'
+    )
+    assert JsonDecoder(parse_number=Decimal).decode(body) == {
+        'btc_balance': Decimal('2'),
+        'fee': Decimal('0.5'),
+        'bids': [[Decimal('1234'), Decimal('1')]],
+        'asks': [[Decimal('1235'), Decimal('1.5')]],
+        'id': '1',
+        'status': '1',
+    }
+
+    with pytest.raises(ValueError):
+        decoder.decode('{"foo": ')
+    with pytest.raises(ValueError):
+        JsonDecoder(backend='foo')
+
+
+def test_client_decoder(requests_get):
+    client = QuadrigaClient(decoder=JsonDecoder(parse_number=Decimal))
+    response = set_response(requests_get)
+    response.content = b'{"bids": [["1234.50", "1.5"]], "asks": []}'
+    assert client.get_public_orders() == {
+        'bids': [[Decimal('1234.50'), Decimal('1.5')]],
+        'asks': []
+    }
+    assert not response.json.called
+
+    response.content = b'<html>'
+    with pytest.raises(RequestError):
+        client.get_public_orders()
+
+
+def test_fixed_point():
+    assert to_units('1234.50', 2) == 123450
+    assert to_units('-0.00000001', 8) == -1
+    assert to_units('1.005', 2) == 100
+    assert to_units('1.015', 2) == 102
+    assert to_units(3, 8) == 300000000
+    assert to_units(0.1, 8) == 10000000
+    assert to_units(Decimal('1e-2'), 2) == 1
+    assert from_units(123450, 2) == '1234.50'
+    assert from_units(-1, 8) == '-0.00000001'
+    assert from_units(7, 0) == '7'
+
+    fixed_point = FixedPoint('eth_cad')
+    assert fixed_point.amount('1.5') == 150000000
+    assert fixed_point.format_price(1) == '0.01'
+    assert fixed_point.ticker({'last': '10.5', 'volume': '2', 'ask': None}) \
+        == {'last': 1050, 'volume': 200000000, 'ask': None}
+    levels = {'timestamp': '1', 'bids': [['10.5', '1', 'x']], 'asks': []}
+    assert fixed_point.levels(levels) == {
+        'timestamp': '1', 'bids': [[1050, 100000000, 'x']], 'asks': []
+    }
+    assert levels['bids'] == [['10.5', '1', 'x']]
+    assert fixed_point.trades([{'tid': 1, 'price': '2', 'amount': '0.1'}]) \
+        == [{'tid': 1, 'price': 200, 'amount': 10000000}]
+    assert fixed_point.user_trades([{'eth': '-1', 'cad': '2', 'rate': '2'}]) \
+        == [{'eth': -100000000, 'cad': 200, 'rate': 200}]
+
+
+def test_client_fixed_point(requests_get, requests_post):
+    client = build_client(fixed_point=True)
+    set_response(requests_get, body={'last': '1234.50'})
+    assert client.get_summary() == {'last': 123450}
+
+    set_response(requests_get, body={'bids': [['10.5', '1']], 'asks': []})
+    assert client.get_public_orders() == {
+        'bids': [[1050, 100000000]], 'asks': []
+    }
+
+    set_response(requests_post, body={'btc_balance': '0.5', 'fee': '0.5'})
+    assert client.get_balance() == {'btc_balance': 50000000, 'fee': '0.5'}
+
+    set_response(requests_post, body=test_body)
+    client.buy_limit_order(50000000, 123450)
+    requests_post.assert_called_with(
+        url=build_url('/buy'),
+        json={
+            'book': test_book,
+            'amount': '0.50000000',
+            'price': '1234.50',
+            'key': test_key,
+            'nonce': test_nonce + 1,
+            'signature': mock.ANY
+        }
+    )
+    client.sell_market_order('0.5')
+    assert requests_post.call_args[1]['json']['amount'] == '0.5'
+
+    client = build_client(fixed_point=True, models=True)
+    set_response(requests_get, body={'last': '1234.50'})
+    assert client.get_summary().last == 123450
+
+    client = QuadrigaClient(
+        fixed_point=True,
+        decoder=JsonDecoder(parse_number=Decimal),
+        transport=FakeTransport({('GET', '/ticker'): {'last': '1234.50'}})
+    )
+    assert client.get_summary() == {'last': 123450}
+    with pytest.raises(ValueError):
+        build_client(
+            fixed_point=True, decoder=JsonDecoder(parse_number=scaled_int(8))
+        )
+
+
+def test_fixed_point_consumers(requests_get, requests_post, tmpdir):
+    client = build_client(fixed_point=True, models=True)
+    trades = build_public_trades([1, 2])
+    set_response(requests_get, body=trades)
+    archiver = TradeArchiver(client, str(tmpdir), books=[test_book])
+    assert archiver.poll() == {test_book: 2}
+    with TradeArchive(archiver.path(test_book)) as archive:
+        assert archive[0] == (1, 1491912501, 1001.5, 0.25, -1)
+
+    candles = CandleAggregator(intervals=(60,))
+    trades = client.get_public_trades()
+    with pytest.raises(ValueError):
+        candles.add_trades(test_book, trades)
+    assert candles.add_trades(
+        test_book, trades, fixed_point=FixedPoint(test_book)
+    ) == 2
+    assert candles.candles(test_book, 60) == [
+        (1491912480, 1001.5, 1002.5, 1001.5, 1002.5, 0.5)
+    ]
+
+    set_response(requests_get, body={
+        'timestamp': '1491481256',
+        'bids': [['1234.50', '0.5']],
+        'asks': [['1235', '1']]
+    })
+    order_book = OrderBook(test_book)
+    order_book.refresh(client)
+    assert order_book.bids() == [(1234.5, 0.5)]
+    assert order_book.asks() == [(1235, 1)]
+
+    trade = {'id': 1, 'datetime': '2017-04-12 11:00:01', 'rate': '1234.50',
+             'btc': '0.5', 'usd': '617.25', 'fee': '0.5'}
+    set_response(requests_post, body=[trade])
+    with TradeStore(str(tmpdir.join('trades.db'))) as store:
+        assert store.sync(client, books=[test_book]) == {test_book: 1}
+        assert store.trades(test_client_id, test_book) == [trade]
+    client.close()
+
+
+def build_async_session(code=200, body=test_body):
+    mock_response = mock.MagicMock()
+    mock_response.url = test_url
+    mock_response.headers = test_headers
+    mock_response.status = code
+    mock_response.reason = test_reason
+    mock_response.read = mock.AsyncMock(
+        return_value=json.dumps(body).encode('utf-8')
+    )
+    mock_session = mock.MagicMock()
+    mock_session.request.return_value.__aenter__.return_value = mock_response
+    mock_session.close = mock.AsyncMock()
+    return mock_session
+
+
+def run_async(*awaitables):
+    loop = asyncio.new_event_loop()
+    try:
+        tasks = [loop.create_task(awaitable) for awaitable in awaitables]
+        loop.run_until_complete(asyncio.wait(tasks))
+        results = [task.result() for task in tasks]
+        return results[0] if len(results) == 1 else results
+    finally:
+        loop.close()
+
+
+@requires_aiohttp
+def test_async_client_public():
+    session = build_async_session()
+    client = AsyncQuadrigaClient(session=session, default_book=test_book)
+
+    assert run_async(client.get_summary()) == test_body
+    session.request.assert_called_with(
+        'GET', build_url('/ticker'), params={'book': test_book}
+    )
+    assert run_async(client.get_public_orders(group=False)) == test_body
+    session.request.assert_called_with(
+        'GET', build_url('/order_book'), params={'book': test_book, 'group': 0}
+    )
+    with pytest.raises(InvalidOrderBookError):
+        client.get_summary(book='invalid_book')
+
+
+@requires_aiohttp
+def test_async_client_private():
+    session = build_async_session()
+    client = AsyncQuadrigaClient(
+        api_key=test_key,
+        api_secret=test_secret,
+        client_id=test_client_id,
+        default_book=test_book,
+        session=session
+    )
+    assert run_async(client.buy_limit_order(10, 5)) == test_body
+    sign = getattr(build_client(), '_rest_client')._protocol.compute_signature
+    session.request.assert_called_with(
+        'POST',
+        build_url('/buy'),
+        json={
+            'book': test_book,
+            'amount': 10,
+            'price': 5,
+            'key': test_key,
+            'nonce': test_nonce,
+            'signature': sign(test_nonce)
+        }
+    )
+    assert run_async(client.cancel_order('foobar')) == test_body
+    session.request.assert_called_with(
+        'POST',
+        build_url('/cancel_order'),
+        json={
+            'id': 'foobar',
+            'key': test_key,
+            'nonce': test_nonce + 1,
+            'signature': sign(test_nonce + 1)
+        }
+    )
+
+
+@requires_aiohttp
+def test_async_client_models():
+    session = build_async_session(body={'last': '1234.50'})
+    client = AsyncQuadrigaClient(session=session, models=True)
+    assert run_async(client.get_summary()).last == Decimal('1234.50')
+
+
+@requires_aiohttp
+def test_async_client_decoder():
+    session = build_async_session(body={'last': '1234.50'})
+    client = AsyncQuadrigaClient(
+        session=session, decoder=JsonDecoder(parse_number=Decimal)
+    )
+    assert run_async(client.get_summary()) == {'last': Decimal('1234.50')}
+
+
+@requires_aiohttp
+def test_async_client_hooks():
+    metrics = MetricsCollector()
+    session = build_async_session(body={'last': '1'})
+    client = AsyncQuadrigaClient(session=session, hooks=[metrics])
+    run_async(client.get_summary())
+    snapshot = metrics.snapshot()['/ticker']
+    assert (snapshot['count'], snapshot['errors'], snapshot['bytes']) == (
+        1, 0, len(json.dumps({'last': '1'}))
+    )
+
+    body = '{"last": "1", "name": "caf\u00e9"}'.encode('utf-8')
+    response = session.request.return_value.__aenter__.return_value
+    response.read.return_value = body
+    run_async(client.get_summary(refresh=True))
+    assert metrics.snapshot()['/ticker']['bytes'] == len(body) + 13
+
+
+@requires_aiohttp
+def test_async_client_trace():
+    session = build_async_session(body={'last': '1'})
+    client = AsyncQuadrigaClient(session=session, trace=True)
+    output = run_async(client.get_summary())
+    assert set(output.trace.phases) == {
+        'queue', 'first_byte', 'download', 'decode'
+    }
+    output = run_async(client.buy_market_order(1))
+    assert 'sign' in output.trace.phases
+
+
+@requires_aiohttp
+def test_async_client_fixed_point():
+    session = build_async_session(body={'last': '1234.50'})
+    client = AsyncQuadrigaClient(session=session, fixed_point=True)
+    assert run_async(client.get_summary()) == {'last': 123450}
+    with pytest.raises(ValueError):
+        AsyncQuadrigaClient(
+            fixed_point=True, decoder=JsonDecoder(parse_number=scaled_int(2))
+        )
+
+
+@requires_aiohttp
+def test_async_client_fast_orders():
+    session = build_async_session(body={'id': '1'})
+    client = AsyncQuadrigaClient(session=session, fast_orders=True)
+    assert run_async(client.buy_limit_order(1, 100)) == {'id': '1'}
+    args, kwargs = session.request.call_args
+    assert args == ('POST', build_url('/buy'))
+    assert kwargs['headers'] == {'Content-Type': 'application/json'}
+    assert json.loads(kwargs['data'].decode('utf-8'))['price'] == '100'
+
+
+@requires_aiohttp
+def test_async_client_depth():
+    session = build_async_session()
+    response = session.request.return_value.__aenter__.return_value
+    chunks = response.content.iter_chunked.return_value
+    chunks.__aiter__.return_value = stream_body(test_levels)
+    client = AsyncQuadrigaClient(session=session, default_book=test_book)
+    assert run_async(client.get_public_orders(depth=2)) == {
+        'timestamp': '1491481256',
+        'bids': [['10.5', '1'], ['10', '2']],
+        'asks': [['11', '1'], ['12', '1']]
+    }
+    session.request.assert_called_with(
+        'GET', build_url('/order_book'), params={'book': test_book, 'group': 1}
+    )
+    assert not response.text.called
+
+
+@requires_aiohttp
+def test_async_client_fan_out():
+    error_body = {'error': {'code': '123', 'message': 'failed'}}
+    session = build_async_session(body=error_body)
+    client = AsyncQuadrigaClient(session=session)
+    output = run_async(client.get_all_public_orders(books=['btc_cad']))
+    assert output['btc_cad']['result'] is None
+    assert output['btc_cad']['error'].error_code == '123'
+
+    client = AsyncQuadrigaClient(session=build_async_session())
+    output = run_async(client.get_summaries())
+    assert sorted(output) == sorted(QuadrigaClient.order_books)
+    for capture in output.values():
+        assert capture == {
+            'timestamp': test_nonce / 1000,
+            'result': test_body,
+            'error': None
+        }
+    with pytest.raises(InvalidOrderBookError):
+        client.get_summaries(books=['invalid_book'])
+
+
+@requires_aiohttp
+def test_async_client_cache():
+    session = build_async_session()
+    cache = ResponseCache()
+    client = AsyncQuadrigaClient(session=session, cache=cache)
+    assert run_async(client.get_public_trades()) == test_body
+    assert run_async(client.get_public_trades()) == test_body
+    assert session.request.call_count == 1
+    assert run_async(client.get_public_trades(refresh=True)) == test_body
+    assert session.request.call_count == 2
+    assert cache.stats()['/transactions']['hits'] == 1
+
+
+@requires_aiohttp
+def test_async_client_coalescing():
+    session = build_async_session()
+    client = AsyncQuadrigaClient(session=session)
+    output = run_async(
+        client.get_summary(),
+        client.get_summary(),
+        client.get_summary(book='btc_cad')
+    )
+    assert output == [test_body] * 3
+    assert session.request.call_count == 2
+
+    session = build_async_session()
+    client = AsyncQuadrigaClient(session=session, coalesce=False)
+    run_async(client.get_summary(), client.get_summary())
+    assert session.request.call_count == 2
+
+
+@requires_aiohttp
+def test_async_client_rate_limiter(monkeypatch):
+    mock_sleep = mock.AsyncMock()
+    monkeypatch.setattr(asyncio, 'sleep', mock_sleep)
+    limiter = RateLimiter(
+        public=TokenBucket(rate=1),
+        private=TokenBucket(rate=2)
+    )
+    client = AsyncQuadrigaClient(
+        session=build_async_session(), rate_limiter=limiter
+    )
+    run_async(client.get_summary())
+    run_async(client.get_summary())
+    mock_sleep.assert_called_once_with(1.0)
+    run_async(client.get_balance())
+    run_async(client.get_balance())
+    run_async(client.get_balance())
+    mock_sleep.assert_called_with(0.5)
+    assert mock_sleep.call_count == 2
+
+
+@requires_aiohttp
+def test_async_priority_scheduler():
+    loop = asyncio.new_event_loop()
+    try:
+        scheduler = AsyncPriorityScheduler(max_in_flight=1)
+        loop.run_until_complete(scheduler.acquire(PRIORITY_PUBLIC))
+        public = loop.create_task(scheduler.acquire(PRIORITY_PUBLIC))
+        cancel = loop.create_task(scheduler.acquire(PRIORITY_CANCEL))
+        loop.run_until_complete(asyncio.sleep(0))
+        assert not public.done() and not cancel.done()
+
+        loop.run_until_complete(scheduler.release())
+        loop.run_until_complete(cancel)
+        assert not public.done()
+        loop.run_until_complete(scheduler.release())
+        loop.run_until_complete(public)
+        assert scheduler.stats()['public']['requests'] == 2
+
+        # Cancelled waiters give up their ticket instead of holding the
+        # capacity once admitted
+        waiting = loop.create_task(scheduler.acquire(PRIORITY_CANCEL))
+        loop.run_until_complete(asyncio.sleep(0))
+        waiting.cancel()
+        loop.run_until_complete(asyncio.wait([waiting]))
+        assert scheduler.stats()['cancel']['queued'] == 0
+        loop.run_until_complete(scheduler.release())
+        loop.run_until_complete(asyncio.wait_for(
+            scheduler.acquire(PRIORITY_PUBLIC), 1
+        ))
+        assert scheduler.stats()['cancel']['requests'] == 1
+    finally:
+        loop.close()
+
+    session = build_async_session()
+    client = AsyncQuadrigaClient(
+        session=session,
+        scheduler=AsyncPriorityScheduler(max_in_flight=1)
+    )
+    assert run_async(
+        client.get_summary(),
+        client.cancel_order('foobar'),
+        client.get_balance()
+    ) == [test_body] * 3
+
+
+@requires_aiohttp
+def test_async_client_retry(monkeypatch):
+    mock_sleep = mock.AsyncMock()
+    monkeypatch.setattr(asyncio, 'sleep', mock_sleep)
+    session = build_async_session()
+    ok_response = session.request.return_value.__aenter__.return_value
+    error_response = build_async_session(code=500).request.return_value
+    session.request.side_effect = [
+        error_response,
+        aiohttp.ClientConnectionError(),
+        session.request.return_value
+    ]
+    policy = RetryPolicy(backoff=1, jitter=False)
+    client = AsyncQuadrigaClient(session=session, retry_policy=policy)
+    assert run_async(client.get_summary()) == test_body
+    assert session.request.call_count == 3
+    assert mock_sleep.call_args_list == [mock.call(1), mock.call(2)]
+    assert ok_response.read.call_count == 1
+
+    session.request.side_effect = [error_response]
+    with pytest.raises(RequestError):
+        run_async(client.cancel_order('foobar'))
+    assert session.request.call_count == 4
+
+
+@requires_aiohttp
+def test_async_client_hedge():
+    session = build_async_session()
+    responses = []
+
+    def request(method, url, **kwargs):
+        context = mock.MagicMock()
+        response = build_async_session(body={'n': len(responses)})\
+            .request.return_value.__aenter__.return_value
+        if not responses:
+            response.read = mock.MagicMock(
+                side_effect=lambda: asyncio.sleep(10, b'{}')
+            )
+        responses.append(response)
+        context.__aenter__.return_value = response
+        return context
+
+    session.request.side_effect = request
+    policy = RetryPolicy(hedge_percentile=50, hedge_min_samples=1)
+    policy.record_latency(0.01)
+    client = AsyncQuadrigaClient(session=session, retry_policy=policy)
+    assert run_async(client.get_summary()) == {'n': 1}
+    assert session.request.call_count == 2
+
+
+@requires_aiohttp
+def test_async_client_iter_trades():
+    def collect(trades):
+        items = []
+        while True:
+            try:
+                items.append(run_async(trades.__anext__())['id'])
+            except StopAsyncIteration:
+                return items
+
+    def serve(history):
+        post = serve_trades(history)
+
+        def request(method, url, json):
+            body = post(url, json).json.return_value
+            return build_async_session(body=body).request.return_value
+
+        return request
+
+    session = build_async_session()
+    client = AsyncQuadrigaClient(session=session)
+    session.request.side_effect = serve([[7, 6, 5, 4, 3, 2, 1]])
+    assert collect(client.iter_trades(page_size=3)) == [7, 6, 5, 4, 3, 2, 1]
+    assert session.request.call_count == 3
+
+    session.request.side_effect = serve([
+        [7, 6, 5, 4, 3, 2, 1],
+        [9, 8, 7, 6, 5, 4, 3, 2, 1]
+    ])
+    trades = client.iter_trades(page_size=3, since='2017-04-12 11:00:02')
+    assert collect(trades) == [7, 6, 5, 4, 3]
+    assert session.request.call_count == 6
+
+    session.request.side_effect = serve([[7, 6, 5, 4, 3, 2, 1]])
+    trades = client.iter_trades(page_size=3, since_id=6)
+    assert collect(trades) == [7]
+    assert session.request.call_count == 7
+
+    session.request.side_effect = serve([[]])
+    assert collect(client.iter_trades()) == []
+
+
+@requires_aiohttp
+def test_async_client_request_fail():
+    error_body = {'error': {'code': '123', 'message': 'failed'}}
+    client = AsyncQuadrigaClient(session=build_async_session(body=error_body))
+    with pytest.raises(RequestError) as error:
+        run_async(client.get_summary())
+    assert error.value.url == test_url
+    assert error.value.http_code == 200
+    assert error.value.error_code == '123'
+    assert str(error.value) == '[HTTP 200][ERR 123] failed'
+
+    client = AsyncQuadrigaClient(session=build_async_session(code=502))
+    with pytest.raises(RequestError) as error:
+        run_async(client.get_summary())
+    assert str(error.value) == '[HTTP 502] {}'.format(test_reason)
+
+
+@requires_aiohttp
+def test_async_client_session(monkeypatch):
+    session = build_async_session()
+    mock_session_class = mock.MagicMock(return_value=session)
+    monkeypatch.setattr(aiohttp, 'ClientSession', mock_session_class)
+    monkeypatch.setattr(aiohttp, 'TCPConnector', mock.MagicMock())
+
+    client = AsyncQuadrigaClient(limit=500, limit_per_host=50)
+    assert client.session is None
+    run_async(client.get_summary())
+    run_async(client.get_summary())
+    assert client.session is session
+    assert mock_session_class.call_count == 1
+    aiohttp.TCPConnector.assert_called_with(
+        limit=500, limit_per_host=50, keepalive_timeout=15
+    )
+    run_async(client.__aexit__(None, None, None))
+    assert session.close.call_count == 1
+    assert client.session is None
+
+    shared = build_async_session()
+    client = AsyncQuadrigaClient(session=shared)
+    assert run_async(client.__aenter__()) is client
+    run_async(client.close())
+    assert shared.close.call_count == 0
+    with pytest.raises(TypeError):
+        with client:
+            pass
+
+
+@requires_aiohttp
+def test_async_client_options():
+    import inspect
+
+    sync_params = inspect.signature(QuadrigaClient).parameters
+    async_params = inspect.signature(AsyncQuadrigaClient).parameters
+    # Only the thread pool and the transport are specific to the sync client
+    assert set(sync_params) - set(async_params) == {'max_workers', 'transport'}
+    for name in set(sync_params) & set(async_params):
+        assert sync_params[name].default == async_params[name].default
+
+    policy = RetryPolicy()
+    client = AsyncQuadrigaClient(
+        client_id=test_client_id, retry_policy=policy, models=True, trace=True
+    )
+    assert isinstance(client._rest_client, AsyncRestClient)
+    assert client._rest_client._retry_policy is policy
+    assert client._rest_client._trace
+    assert client.client_id == test_client_id and client._models